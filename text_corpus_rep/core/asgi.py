@@ -13,4 +13,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from db.api.asyncNeo4jRepository import close_loop_drivers, share_drivers_in_loop  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Django + протокол lifespan: event loop сервера долгоживущий, поэтому асинхронные драйверы Neo4j
+    в нём общие для запросов и закрываются при остановке сервера.
+    """
+    share_drivers_in_loop()
+    if scope["type"] != "lifespan":
+        await django_application(scope, receive, send)
+        return
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_loop_drivers()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -16,10 +16,73 @@ import dj_database_url
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-DB_URI = "neo4j://127.0.0.1:7687"
+DB_URI = os.environ.get("NEO4J_URI", "neo4j://127.0.0.1:7687")
 DB_USER = "neo4j"
 DB_PASSWORD = "78907890"
-
+# Имя базы Neo4j (None — база по умолчанию сервера). Схема neo4j:// в DB_URI включает маршрутизацию
+# по кластеру: чтения уходят на реплики, записи — на лидера
+NEO4J_DATABASE = os.environ.get("NEO4J_DATABASE") or None
+# Сколько секунд драйвер повторяет управляемую транзакцию при временных ошибках
+NEO4J_MAX_RETRY_TIME = 15.0
+# Запросы к Neo4j дольше порога (мс) попадают в журнал медленных запросов
+NEO4J_SLOW_QUERY_MS = 200
+# Захват планов: None — выключен, "profile" — все запросы выполняются с PROFILE (db hits),
+# "explain" — для медленных запросов дополнительно сохраняется план EXPLAIN
+NEO4J_QUERY_PROFILE = os.environ.get("NEO4J_QUERY_PROFILE") or None
+# Отдельный экземпляр Neo4j для бенчмарков (сценарии создают и удаляют классы); не рабочая база
+BENCHMARK_NEO4J_URI = os.environ.get("BENCHMARK_NEO4J_URI") or None
+# Адреса, с которых доступны эндпоинты метрик
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+# Добавлять к ответам заголовок Server-Timing (разбивка времени запроса по стадиям)
+SERVER_TIMING_HEADERS = os.environ.get("SERVER_TIMING_HEADERS") == "1"
+
+# Модель эмбеддингов
+EMBEDDING_MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2'
+# Бэкенд инференса: "torch", "torch-int8", "onnx", "onnx-int8"
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+# Каталог для экспортированной (и квантованной) ONNX-модели
+EMBEDDING_ONNX_DIR = os.path.join(BASE_DIR, 'models', 'onnx')
+# Набор инструкций для динамической int8-квантизации ONNX: "arm64", "avx2", "avx512", "avx512_vnni"
+EMBEDDING_QUANTIZATION_CONFIG = os.environ.get("EMBEDDING_QUANTIZATION_CONFIG", "avx2")
+# Имя версии эмбеддингов, создаваемой из этих настроек в пустой базе (см. EmbeddingVersion)
+DEFAULT_EMBEDDING_VERSION = "default"
+# Каталог артефактов понижения размерности (PCA) и во сколько раз больше кандидатов
+# отбирается по пониженным векторам для переранжирования полными
+EMBEDDING_REDUCTION_DIR = os.path.join(BASE_DIR, 'models', 'reduction')
+REDUCTION_OVERSAMPLE = 4
+# Квантованное хранилище векторов для семантического поиска (команда build_vector_store):
+# каталог, метод отбора кандидатов (sq — int8 по измерениям, pq — product quantization),
+# сколько кандидатов переранжируется точными float-векторами и число подпространств PQ
+VECTOR_STORE_DIR = os.path.join(BASE_DIR, 'models', 'vector_store')
+VECTOR_STORE_QUANTIZATION = os.environ.get("VECTOR_STORE_QUANTIZATION", "sq")
+VECTOR_STORE_RERANK = 200
+# Сколько последних поколений хранилища хранится на диске (воркеры дочитывают предыдущее до переоткрытия)
+VECTOR_STORE_KEEP_GENERATIONS = 2
+PQ_SUBVECTORS = 48
+# Максимальная длина входа модели в токенах (всё, что длиннее, модель обрезает)
+EMBEDDING_MAX_SEQ_LENGTH = 128
+# Сервер эмбеддингов (команда embedding_server): адрес (если задан, веб-воркеры не загружают модель),
+# таймаут запроса, максимальный размер общего батча и сколько ждать попутных запросов после первого (мс)
+EMBEDDING_SERVER_URL = os.environ.get("EMBEDDING_SERVER_URL")
+EMBEDDING_SERVER_TIMEOUT = 60
+EMBEDDING_SERVER_MAX_BATCH = 64
+EMBEDDING_SERVER_MAX_WAIT_MS = 5
+
+# Чанкинг: бюджет токенов на чанк (None — вся длина входа модели) и перекрытие соседних чанков
+CHUNK_MAX_TOKENS = None
+CHUNK_OVERLAP_TOKENS = 16
+
+# Entity linking: минимальное косинусное сходство чанка и объекта и максимум предложенных объектов на чанк
+ENTITY_LINK_THRESHOLD = 0.5
+ENTITY_LINK_TOP_K = 3
+
+# Кеш схемы онтологии в памяти процесса: как часто (в секундах) сверять версию схемы с Neo4j
+ONTOLOGY_CACHE_TTL = 5.0
+# Загружать схему в фоновом потоке по первому запросу процесса (не в командах управления).
+# Включается явно (ONTOLOGY_CACHE_WARMUP=1), чтобы тесты и dev-окружение без Neo4j не обращались к DB_URI
+ONTOLOGY_CACHE_WARMUP = os.environ.get("ONTOLOGY_CACHE_WARMUP") == "1"
+# Максимум uri в одном запросе ontology/nodes/batch/
+NODES_BATCH_MAX_URIS = 1000
 
 
 # Quick-start development settings - unsuitable for production
@@ -62,6 +125,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'db.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
@@ -73,6 +137,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise Middleware
+
+    'db.middleware.QueryStatsMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
 # CORS_ALLOWED_ORIGINS = [
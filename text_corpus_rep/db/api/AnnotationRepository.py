@@ -0,0 +1,155 @@
+from typing import Any, Dict, List
+
+from db.models import Text, TextAnnotation
+from db.api.ontologyRepository import OntologyRepository
+
+# Связи, которые считаются подтверждёнными: ручные и принятые после проверки (не proposed и не rejected)
+CONFIRMED_STATUSES = ("manual", "accepted")
+
+
+class AnnotationRepository:
+    """
+    Связи «фрагмент текста — объект онтологии».
+    Таблица TextAnnotation проиндексирована в обе стороны (текст → объекты, объект → тексты)
+    и хранит копию названия и класса объекта, поэтому чтение не обращается к Neo4j.
+    """
+    def __init__(self):
+        pass
+
+    def collect_annotation(self, annotation: TextAnnotation):
+        return {
+            "id": annotation.id,
+            "text_id": annotation.text_id,
+            "start": annotation.start,
+            "end": annotation.end,
+            "fragment": annotation.fragment,
+            "object_uri": annotation.object_uri,
+            "object_title": annotation.object_title,
+            "class_uri": annotation.class_uri,
+            "relation_uri": annotation.relation_uri,
+            "status": annotation.status,
+            "confidence": annotation.confidence,
+        }
+
+    # -----------------------
+    # Создание / удаление
+    # -----------------------
+    def create_annotations(self, text_id, annotations: List[Dict[str, Any]], ontology: OntologyRepository):
+        """
+        Создаёт аннотации текста. Объекты онтологии запрашиваются из Neo4j одним запросом.
+        Аннотации с несуществующими объектами или неверными смещениями пропускаются.
+        """
+        text = Text.objects.only("id", "text").get(id=text_id)
+        objects = ontology.get_objects([a.get("object_uri") for a in annotations])
+        created, missing, invalid = [], [], []
+        for a in annotations:
+            start, end, object_uri = a.get("start"), a.get("end"), a.get("object_uri")
+            obj = objects.get(object_uri)
+            if obj is None:
+                missing.append(object_uri)
+                continue
+            if not isinstance(start, int) or not isinstance(end, int) or not 0 <= start < end <= len(text.text):
+                invalid.append(a)
+                continue
+            created.append(TextAnnotation(
+                text=text,
+                start=start,
+                end=end,
+                fragment=text.text[start:end],
+                object_uri=object_uri,
+                object_title=obj["title"] or "",
+                class_uri=obj["class_uri"] or "",
+            ))
+        created = TextAnnotation.objects.bulk_create(created)
+        return {
+            "created": [self.collect_annotation(a) for a in created],
+            "missing": missing,
+            "invalid": invalid,
+        }
+
+    def delete_annotation(self, annotation_id):
+        TextAnnotation.objects.filter(id=annotation_id).delete()
+        return {"deleted": True}
+
+    # -----------------------
+    # Проверка предложенных связей
+    # -----------------------
+    def get_proposals(self, corpus_id=None, min_confidence=None, limit=100):
+        """
+        Предложенные entity linking связи, ожидающие проверки (по убыванию уверенности).
+        """
+        proposals = TextAnnotation.objects.filter(status="proposed")
+        if corpus_id:
+            proposals = proposals.filter(text__corpus_id=corpus_id)
+        if min_confidence is not None:
+            proposals = proposals.filter(confidence__gte=min_confidence)
+        return [self.collect_annotation(a) for a in proposals.order_by("-confidence")[:limit]]
+
+    def review_annotation(self, annotation_id, status, start=None, end=None):
+        """
+        Принимает или отклоняет предложенную связь; при принятии можно уточнить границы фрагмента.
+        Неверные границы — ValueError, статус при этом не меняется.
+        """
+        annotation = TextAnnotation.objects.select_related("text").get(id=annotation_id)
+        if start is not None or end is not None:
+            if not isinstance(start, int) or not isinstance(end, int) or not 0 <= start < end <= len(annotation.text.text):
+                raise ValueError(f"Invalid span: start={start}, end={end}")
+            annotation.start, annotation.end = start, end
+            annotation.fragment = annotation.text.text[start:end]
+        annotation.status = status
+        annotation.save()
+        return self.collect_annotation(annotation)
+
+    # -----------------------
+    # Поиск в обе стороны
+    # -----------------------
+    def get_text_objects(self, text_id, statuses=CONFIRMED_STATUSES):
+        """
+        Все объекты онтологии, упомянутые в тексте, с позициями упоминаний.
+        statuses — учитываемые статусы связей (по умолчанию только подтверждённые).
+        """
+        objects: Dict[str, Dict[str, Any]] = {}
+        annotations = TextAnnotation.objects.filter(text_id=text_id, status__in=statuses)
+        for a in annotations.order_by("start"):
+            obj = objects.setdefault(a.object_uri, {
+                "object_uri": a.object_uri,
+                "object_title": a.object_title,
+                "class_uri": a.class_uri,
+                "mentions": [],
+            })
+            obj["mentions"].append({"id": a.id, "start": a.start, "end": a.end, "fragment": a.fragment})
+        return list(objects.values())
+
+    def get_object_texts(self, object_uri, corpus_id=None, statuses=CONFIRMED_STATUSES):
+        """
+        Все тексты, в которых упоминается объект онтологии (без загрузки самих текстов).
+        statuses — учитываемые статусы связей (по умолчанию только подтверждённые).
+        """
+        annotations = TextAnnotation.objects.filter(object_uri=object_uri, status__in=statuses)
+        if corpus_id:
+            annotations = annotations.filter(text__corpus_id=corpus_id)
+        rows = annotations.order_by("text_id", "start").values_list(
+            "id", "text_id", "text__title", "text__corpus_id", "start", "end", "fragment"
+        )
+        texts: Dict[int, Dict[str, Any]] = {}
+        for annotation_id, text_id, title, text_corpus_id, start, end, fragment in rows:
+            text = texts.setdefault(text_id, {
+                "text_id": text_id,
+                "title": title,
+                "corpus_id": text_corpus_id,
+                "mentions": [],
+            })
+            text["mentions"].append({"id": annotation_id, "start": start, "end": end, "fragment": fragment})
+        return list(texts.values())
+
+    # -----------------------
+    # Синхронизация кеша с онтологией
+    # -----------------------
+    def refresh_object(self, object_uri, title):
+        TextAnnotation.objects.filter(object_uri=object_uri).update(object_title=title or "")
+
+    def remove_object(self, object_uri):
+        TextAnnotation.objects.filter(object_uri=object_uri).delete()
+
+    def remove_classes(self, class_uris: List[str]):
+        TextAnnotation.objects.filter(class_uri__in=class_uris).delete()
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.db.models import Sum
+
+from db.models import CorpusWordCount, Text, TextProfile, Word, WordPosting
+from db.api.chunk_utils import tokenize_words
+from db.api.postings import decode_offsets, decode_positions
+
+# Конкорданс (KWIC) по позиционному индексу WordPosting. Фраза ищется так:
+#  1. словоформы запроса -> id по словарю Word (нет слова в словаре — нет вхождений);
+#  2. тексты перебираются по постингам самого редкого слова фразы (по CorpusWordCount.texts) по возрастанию id,
+#     пачками по POSTINGS_BATCH_SIZE; постинги остальных слов читаются только для текстов пачки;
+#  3. в тексте вхождение фразы — позиция p первого слова, для которой слово i стоит на позиции p + i;
+#  4. контекст вырезается из текста по символьным границам слов (TextProfile.offsets).
+# Время ответа зависит от числа текстов с самым редким словом фразы, а не от размера корпуса.
+# Страницы — по курсору "<id текста>:<позиция>" последнего выданного вхождения.
+
+POSTINGS_BATCH_SIZE = 256
+MAX_WINDOW = 50
+MAX_LIMIT = 500
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """
+    "<id текста>:<позиция>" -> (id, позиция); без курсора — с начала. Неверный курсор — ValueError.
+    """
+    if not cursor:
+        return 0, -1
+    text_id, position = cursor.split(":")
+    return int(text_id), int(position)
+
+
+class ConcordanceRepository:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def document_frequency(word_ids: List[int], corpus_id=None) -> Dict[int, int]:
+        """
+        Число текстов с каждым словом (по частотам корпусов, без чтения постингов).
+        """
+        rows = CorpusWordCount.objects.filter(word_id__in=word_ids)
+        if corpus_id:
+            rows = rows.filter(corpus_id=corpus_id)
+        frequency = dict(rows.values("word_id").annotate(texts=Sum("texts")).values_list("word_id", "texts"))
+        return {word_id: frequency.get(word_id, 0) for word_id in word_ids}
+
+    @staticmethod
+    def match(positions: List[np.ndarray]) -> np.ndarray:
+        """
+        Позиции начала фразы: p из positions[0], такие что p + i есть в positions[i].
+        """
+        starts = positions[0]
+        for i, following in enumerate(positions[1:], start=1):
+            starts = np.intersect1d(starts, following - i, assume_unique=True)
+        return starts
+
+    def find(self, word_ids: List[int], corpus_id=None, after: Tuple[int, int] = (0, -1),
+             limit: int = 50) -> List[Tuple[int, int]]:
+        """
+        Вхождения фразы из слов word_ids после курсора after: [(id текста, позиция)], не больше limit.
+        """
+        frequency = self.document_frequency(sorted(set(word_ids)), corpus_id)
+        rarest = min(frequency, key=frequency.get)
+        if frequency[rarest] == 0:
+            return []
+        others = sorted(set(word_ids) - {rarest})
+
+        postings = WordPosting.objects.filter(word_id=rarest)
+        if corpus_id:
+            postings = postings.filter(corpus_id=corpus_id)
+        after_text, after_position = after
+        hits: List[Tuple[int, int]] = []
+        last_text = after_text - 1
+        while len(hits) < limit:
+            batch = list(postings.filter(text_id__gt=last_text).order_by("text_id")
+                         .values_list("text_id", "positions")[:POSTINGS_BATCH_SIZE])
+            if not batch:
+                break
+            last_text = batch[-1][0]
+            by_text = {text_id: {rarest: decode_positions(blob)} for text_id, blob in batch}
+            if others:
+                rows = WordPosting.objects.filter(word_id__in=others, text_id__in=list(by_text))
+                for text_id, word_id, blob in rows.values_list("text_id", "word_id", "positions"):
+                    by_text[text_id][word_id] = decode_positions(blob)
+
+            for text_id, _ in batch:
+                found = by_text[text_id]
+                if len(found) < len(others) + 1:
+                    continue
+                starts = self.match([found[word_id] for word_id in word_ids])
+                if text_id == after_text:
+                    starts = starts[starts > after_position]
+                hits.extend((text_id, int(position)) for position in starts[:limit - len(hits)])
+                if len(hits) == limit:
+                    break
+        return hits
+
+    def search(self, query: str, corpus_id=None, window: int = 5, limit: int = 50,
+               cursor: str = None) -> Dict[str, Any]:
+        """
+        KWIC-строки фразы query: window слов контекста слева и справа, limit строк на страницу.
+        next_cursor — курсор следующей страницы (None, если вхождений больше нет).
+        total — число вхождений (только для запроса из одного слова, по частотам корпусов).
+        """
+        window = max(0, min(window, MAX_WINDOW))
+        limit = max(1, min(limit, MAX_LIMIT))
+        after = parse_cursor(cursor)
+        terms = [form for _, _, _, form in tokenize_words(query)]
+        if not terms:
+            raise ValueError("Query has no words")
+        result = {"query": query, "terms": terms, "corpus_id": corpus_id, "window": window,
+                  "total": None, "lines": [], "next_cursor": None}
+
+        ids = dict(Word.objects.filter(form__in=terms).values_list("form", "id"))
+        if len(terms) == 1:
+            counts = CorpusWordCount.objects.filter(word_id=ids.get(terms[0]))
+            if corpus_id:
+                counts = counts.filter(corpus_id=corpus_id)
+            result["total"] = counts.aggregate(total=Sum("count"))["total"] or 0
+        if any(term not in ids for term in terms):
+            return result
+
+        hits = self.find([ids[term] for term in terms], corpus_id, after, limit + 1)
+        if len(hits) > limit:
+            hits = hits[:limit]
+            result["next_cursor"] = f"{hits[-1][0]}:{hits[-1][1]}"
+        result["lines"] = self.lines(hits, len(terms), window)
+        return result
+
+    @staticmethod
+    def lines(hits: List[Tuple[int, int]], length: int, window: int) -> List[Dict[str, Any]]:
+        """
+        Контекст вхождений: фрагменты текста от слова p - window до слова p + length - 1 + window.
+        """
+        text_ids = sorted({text_id for text_id, _ in hits})
+        texts = {text.id: text for text in Text.objects.filter(id__in=text_ids).only("id", "title", "text")}
+        offsets = {
+            text_id: decode_offsets(blob)
+            for text_id, blob in TextProfile.objects.filter(text_id__in=text_ids).values_list("text_id", "offsets")
+        }
+        lines = []
+        for text_id, position in hits:
+            text = texts[text_id]
+            starts, ends = offsets[text_id]
+            last = position + length - 1
+            start, end = int(starts[position]), int(ends[last])
+            left = int(starts[max(position - window, 0)])
+            right = int(ends[min(last + window, len(ends) - 1)])
+            lines.append({
+                "text_id": text_id,
+                "title": text.title,
+                "position": position,
+                "start": start,
+                "end": end,
+                "left": text.text[left:start].strip(),
+                "keyword": text.text[start:end],
+                "right": text.text[end:right].strip(),
+            })
+        return lines
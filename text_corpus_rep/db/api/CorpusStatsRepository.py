@@ -0,0 +1,134 @@
+from typing import Any, Dict, List
+
+import numpy as np
+from django.db.models import Q, Sum
+
+from db.models import Corpus, CorpusNgramCount, CorpusWordCount, TextProfile, Word
+from db.api.ConcordanceRepository import ConcordanceRepository
+from db.api.corpus_stats import NGRAM_ORDERS
+from db.api.TextSearchRepository import fold_yo
+
+# Квантили длины текстов (в словах) в сводке корпуса
+LENGTH_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Наибольшее число интервалов гистограммы длины текстов
+MAX_HISTOGRAM_BINS = 1000
+
+
+class CorpusStatsRepository:
+    """
+    Запросы к статистике корпуса по предрассчитанным профилям текстов (без чтения самих текстов).
+    """
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def corpus_tokens(corpus_id) -> int:
+        return TextProfile.objects.filter(corpus_id=corpus_id).aggregate(total=Sum("tokens"))["total"] or 0
+
+    def summary(self, corpus_id, bins: int = 10) -> Dict[str, Any]:
+        """
+        Размер корпуса, type/token ratio (по корпусу и средний по текстам) и распределение длины текстов в словах.
+        """
+        if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+            raise ValueError(f"bins must be between 1 and {MAX_HISTOGRAM_BINS}, got {bins}")
+        corpus = Corpus.objects.get(id=corpus_id)
+        rows = list(TextProfile.objects.filter(corpus=corpus).values_list("tokens", "types", "sentences", "characters"))
+        lengths = np.array([row[0] for row in rows], dtype=np.int64)
+        tokens = int(lengths.sum())
+        types = CorpusWordCount.objects.filter(corpus=corpus).count()
+        text_ttr = [row[1] / row[0] for row in rows if row[0]]
+
+        distribution = {}
+        if len(lengths):
+            counts, edges = np.histogram(lengths, bins=bins)
+            distribution = {
+                "min": int(lengths.min()),
+                "max": int(lengths.max()),
+                "mean": round(float(lengths.mean()), 2),
+                "quantiles": {str(q): float(np.quantile(lengths, q)) for q in LENGTH_QUANTILES},
+                "histogram": [
+                    {"from": round(float(edges[i]), 2), "to": round(float(edges[i + 1]), 2), "texts": int(count)}
+                    for i, count in enumerate(counts)
+                ],
+            }
+        return {
+            "id": corpus.id,
+            "title": corpus.title,
+            "texts": corpus.texts.count(),
+            "profiled_texts": len(rows),
+            "tokens": tokens,
+            "types": types,
+            "sentences": sum(row[2] for row in rows),
+            "characters": sum(row[3] for row in rows),
+            "type_token_ratio": round(types / tokens, 4) if tokens else None,
+            "mean_text_type_token_ratio": round(float(np.mean(text_ttr)), 4) if text_ttr else None,
+            "length_distribution": distribution,
+        }
+
+    def frequency(self, corpus_id, words: List[str] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """
+        Частоты слов корпуса: самые частые (limit, offset) или заданные словоформы.
+        ipm — частота на миллион слов, texts — в скольких текстах встречается.
+        """
+        if limit < 1 or offset < 0:
+            raise ValueError(f"Invalid page: limit={limit}, offset={offset}")
+        tokens = self.corpus_tokens(corpus_id)
+        rows = CorpusWordCount.objects.filter(corpus_id=corpus_id).select_related("word")
+        if words:
+            rows = rows.filter(word__form__in=[fold_yo(word.lower()) for word in words])
+        rows = rows.order_by("-count", "word__form")[offset:offset + limit]
+        return {
+            "corpus_id": int(corpus_id),
+            "tokens": tokens,
+            "words": [
+                {
+                    "word": row.word.form,
+                    "count": row.count,
+                    "ipm": round(row.count / tokens * 1_000_000, 2) if tokens else 0.0,
+                    "texts": row.texts,
+                }
+                for row in rows
+            ],
+        }
+
+    def ngrams(self, corpus_id, n: int = 2, contains: str = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Самые частые n-граммы корпуса (по частотам корпуса CorpusWordCount / CorpusNgramCount);
+        contains — только n-граммы со словом.
+        """
+        if n not in NGRAM_ORDERS:
+            raise ValueError(f"Unsupported n-gram order: {n}. Expected one of {NGRAM_ORDERS}")
+        if limit < 1:
+            raise ValueError(f"Invalid limit: {limit}")
+        word_id = None
+        if contains:
+            word_id = Word.objects.filter(form=fold_yo(contains.lower())).values_list("id", flat=True).first()
+            if word_id is None:
+                return {"corpus_id": int(corpus_id), "n": n, "ngrams": []}
+
+        if n == 1:
+            rows = CorpusWordCount.objects.filter(corpus_id=corpus_id)
+            if word_id is not None:
+                rows = rows.filter(word_id=word_id)
+            rows = rows.order_by("-count", "word_id").values_list("word_id", "count")
+            top = [((word,), count) for word, count in rows[:limit]]
+        else:
+            rows = CorpusNgramCount.objects.filter(corpus_id=corpus_id, n=n)
+            if word_id is not None:
+                rows = rows.filter(Q(word1=word_id) | Q(word2=word_id) | Q(word3=word_id))
+            rows = rows.order_by("-count", "word1", "word2", "word3").values_list("word1", "word2", "word3", "count")
+            top = [(row[:n], row[3]) for row in rows[:limit]]
+        forms = dict(Word.objects.filter(id__in={word for words, _ in top for word in words}).values_list("id", "form"))
+        return {
+            "corpus_id": int(corpus_id),
+            "n": n,
+            "ngrams": [{"ngram": " ".join(forms[word] for word in words), "count": count} for words, count in top],
+        }
+
+    def concordance(self, corpus_id, word: str, width: int = 5, limit: int = 50) -> Dict[str, Any]:
+        """
+        Конкорданс (KWIC) словоформы с width словами контекста слева и справа (по позиционному индексу).
+        """
+        result = ConcordanceRepository().search(word, corpus_id=corpus_id, window=width, limit=limit)
+        lines = [{key: value for key, value in line.items() if key != "position"} for line in result["lines"]]
+        return {"corpus_id": int(corpus_id), "word": " ".join(result["terms"]), "lines": lines}
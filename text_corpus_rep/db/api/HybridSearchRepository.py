@@ -0,0 +1,222 @@
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from db.models import EmbeddingReduction, EmbeddingVersion, Text, TextChunk, TextEmbedding
+from db.api.embedding_utils import get_embeddings, normalize_rows
+from db.api.TextSearchRepository import TextSearchRepository
+from db.api.vector_store import get_store
+from core.settings import REDUCTION_OVERSAMPLE
+
+FUSION_METHODS = ("rrf", "weighted")
+# Константа reciprocal rank fusion: 1 / (RRF_K + rank)
+RRF_K = 60
+# Сколько кандидатов берётся из каждого источника до слияния
+CANDIDATES = 100
+# Сколько лучших кандидатов переранжируется по чанкам
+RERANK_TOP = 20
+
+
+def _min_max(scores: Dict[int, float]) -> Dict[int, float]:
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    span = high - low
+    return {key: (value - low) / span if span else 1.0 for key, value in scores.items()}
+
+
+class HybridSearchRepository:
+    """
+    Гибридный поиск по текстам корпусов: bm25 из полнотекстового индекса
+    + косинусное сходство с сохранёнными эмбеддингами текстов.
+    """
+    def __init__(self):
+        self.lexical = TextSearchRepository()
+
+    # -----------------------
+    # Источники кандидатов
+    # -----------------------
+    @staticmethod
+    def semantic_search(query_embedding: np.ndarray, version: EmbeddingVersion, corpus_id=None,
+                        limit: int = CANDIDATES) -> List[Dict[str, Any]]:
+        """
+        Ищет тексты, ближайшие к эмбеддингу запроса по косинусному сходству среди векторов той же версии.
+        Если для версии построено квантованное хранилище, поиск идёт по нему (см. store_search).
+        Если у версии включено понижение размерности, кандидаты отбираются по пониженным векторам
+        (limit * REDUCTION_OVERSAMPLE), а их порядок и оценки считаются по полным.
+        """
+        texts = TextEmbedding.objects.filter(version=version)
+        if corpus_id:
+            texts = texts.filter(text__corpus_id=corpus_id)
+        store = get_store(version.name)
+        if store is not None:
+            return HybridSearchRepository.store_search(query_embedding, texts, store, corpus_id, limit)
+        reduction = version.get_reduction()
+        if reduction is not None:
+            texts = texts.filter(text_id__in=HybridSearchRepository.reduced_candidates(
+                query_embedding, texts, reduction, limit * REDUCTION_OVERSAMPLE))
+        rows = list(texts.values_list("text_id", "embedding"))
+        if not rows:
+            return []
+        ids = np.array([row[0] for row in rows])
+        matrix = normalize_rows(np.asarray([row[1] for row in rows], dtype=np.float32))
+        scores = matrix @ normalize_rows(query_embedding.astype(np.float32))
+        top = np.argsort(-scores)[:limit]
+        return [{"id": int(ids[i]), "score": float(scores[i])} for i in top]
+
+    @staticmethod
+    def store_search(query_embedding: np.ndarray, texts, store, corpus_id=None, limit: int = CANDIDATES) -> List[Dict[str, Any]]:
+        """
+        Поиск по квантованному хранилищу с точными оценками кандидатов. Векторы, записанные после
+        построения хранилища, сравниваются напрямую; удалённые после построения тексты отбрасываются.
+        Тексты корпуса берутся из БД: перенос текста в другой корпус не меняет его вектор и не виден в снимке.
+        """
+        query = normalize_rows(query_embedding.astype(np.float32))
+        fresh = list(texts.filter(updated_at__gt=store.built_at).values_list("text_id", "embedding"))
+        fresh_ids = {row[0] for row in fresh}
+        text_ids = texts.values_list("text_id", flat=True) if corpus_id else None
+        hits = store.search(query, limit, text_ids=text_ids, exclude_ids=fresh_ids)
+        existing = set(texts.filter(text_id__in=[text_id for text_id, _ in hits]).values_list("text_id", flat=True))
+        results = [{"id": text_id, "score": score} for text_id, score in hits if text_id in existing]
+        if fresh:
+            scores = normalize_rows(np.asarray([row[1] for row in fresh], dtype=np.float32)) @ query
+            results.extend({"id": row[0], "score": float(score)} for row, score in zip(fresh, scores))
+            results.sort(key=lambda hit: -hit["score"])
+        return results[:limit]
+
+    @staticmethod
+    def reduced_candidates(query_embedding: np.ndarray, texts, reduction: EmbeddingReduction, limit: int) -> List[int]:
+        """
+        id текстов, ближайших к запросу по пониженным векторам. Векторы, ещё не пересчитанные
+        текущим понижением (сохранены во время его построения), проецируются на лету.
+        """
+        rows = list(texts.filter(reduction=reduction).values_list("text_id", "reduced"))
+        stale = list(texts.exclude(reduction=reduction).values_list("text_id", "embedding"))
+        ids = [row[0] for row in rows] + [row[0] for row in stale]
+        if not ids:
+            return []
+        parts = []
+        if rows:
+            parts.append(reduction.unpack(row[1] for row in rows))
+        if stale:
+            parts.append(reduction.project([row[1] for row in stale]))
+        scores = np.concatenate(parts) @ reduction.project([query_embedding])[0]
+        top = np.argsort(-scores)[:limit]
+        return [ids[i] for i in top]
+
+    # -----------------------
+    # Слияние и переранжирование
+    # -----------------------
+    @staticmethod
+    def fuse(lexical: List[Dict[str, Any]], semantic: List[Dict[str, Any]], method: str = "rrf",
+             alpha: float = 0.5) -> Dict[int, float]:
+        """
+        Сливает два ранжированных списка.
+        rrf — reciprocal rank fusion по позициям;
+        weighted — alpha * semantic + (1 - alpha) * lexical по min-max нормированным оценкам.
+        """
+        if method == "rrf":
+            fused: Dict[int, float] = {}
+            for hits in (lexical, semantic):
+                for rank, hit in enumerate(hits, start=1):
+                    fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (RRF_K + rank)
+            return fused
+        if method == "weighted":
+            lexical_scores = _min_max({hit["id"]: hit["score"] for hit in lexical})
+            semantic_scores = _min_max({hit["id"]: hit["score"] for hit in semantic})
+            return {
+                key: alpha * semantic_scores.get(key, 0.0) + (1 - alpha) * lexical_scores.get(key, 0.0)
+                for key in set(lexical_scores) | set(semantic_scores)
+            }
+        raise ValueError(f"Unknown fusion method: {method}. Expected one of {FUSION_METHODS}")
+
+    @staticmethod
+    def rerank(query_embedding: np.ndarray, text_ids: List[int], version: EmbeddingVersion) -> Dict[int, float]:
+        """
+        Переранжирует кандидатов по максимальному сходству запроса с чанками текста
+        (точнее среднего эмбеддинга для длинных текстов, где совпадает только фрагмент).
+        Используются сохранённые эмбеддинги чанков версии (TextChunk); тексты без чанков оценки не получают.
+        """
+        rows = list(TextChunk.objects.filter(text_id__in=text_ids, version=version).values_list("text_id", "embedding"))
+        if not rows:
+            return {}
+        matrix = normalize_rows(np.asarray([row[1] for row in rows], dtype=np.float32))
+        scores = matrix @ normalize_rows(query_embedding.astype(np.float32))
+        best: Dict[int, float] = {}
+        for (text_id, _), score in zip(rows, scores):
+            best[text_id] = max(best.get(text_id, -1.0), float(score))
+        return best
+
+    # -----------------------
+    # Поиск
+    # -----------------------
+    def search(self, query: str, corpus_id=None, limit: int = 20, fusion: str = "rrf", alpha: float = 0.5,
+               rerank: bool = False, version: str = None) -> Dict[str, Any]:
+        """
+        Гибридный поиск. Возвращает {results, meta}, в meta — версия эмбеддингов и время каждого этапа в мс.
+        version — имя закреплённой версии эмбеддингов (по умолчанию активная).
+        """
+        timings = {}
+        embedding_version = EmbeddingVersion.resolve(version)
+
+        started = time.perf_counter()
+        lexical = self.lexical.search(query, corpus_id=corpus_id, limit=CANDIDATES)
+        timings["lexical"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        query_embedding = get_embeddings([query], version=embedding_version)[0]
+        timings["encode"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        semantic = self.semantic_search(query_embedding, embedding_version, corpus_id=corpus_id, limit=CANDIDATES)
+        timings["semantic"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        fused = self.fuse(lexical, semantic, fusion, alpha)
+        ranked = sorted(fused, key=fused.get, reverse=True)
+        timings["fusion"] = (time.perf_counter() - started) * 1000
+
+        rerank_scores = {}
+        if rerank and ranked:
+            started = time.perf_counter()
+            head = ranked[:RERANK_TOP]
+            rerank_scores = self.rerank(query_embedding, head, embedding_version)
+            head.sort(key=lambda key: rerank_scores.get(key, -1.0), reverse=True)
+            ranked = head + ranked[RERANK_TOP:]
+            timings["rerank"] = (time.perf_counter() - started) * 1000
+
+        ranked = ranked[:limit]
+        lexical_hits = {hit["id"]: hit for hit in lexical}
+        semantic_scores = {hit["id"]: hit["score"] for hit in semantic}
+        titles = {
+            row[0]: row[1:]
+            for row in Text.objects.filter(id__in=ranked).values_list("id", "title", "corpus_id")
+        }
+        results = []
+        for text_id in ranked:
+            if text_id not in titles:
+                continue
+            lexical_hit = lexical_hits.get(text_id)
+            results.append({
+                "id": text_id,
+                "title": titles[text_id][0],
+                "corpus_id": titles[text_id][1],
+                "score": fused[text_id],
+                "lexical_score": lexical_hit["score"] if lexical_hit else None,
+                "semantic_score": semantic_scores.get(text_id),
+                "rerank_score": rerank_scores.get(text_id),
+                "snippet": lexical_hit["snippet"] if lexical_hit else None,
+            })
+
+        return {
+            "results": results,
+            "meta": {
+                "embedding_version": embedding_version.name,
+                "fusion": fusion,
+                "alpha": alpha if fusion == "weighted" else None,
+                "reranked": bool(rerank),
+                "candidates": {"lexical": len(lexical), "semantic": len(semantic), "fused": len(fused)},
+                "timings_ms": {stage: round(ms, 3) for stage, ms in timings.items()},
+            },
+        }
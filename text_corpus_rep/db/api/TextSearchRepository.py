@@ -0,0 +1,159 @@
+import re
+
+import snowballstemmer
+from django.db import connection
+
+# Полнотекстовый индекс:
+#  - SQLite: виртуальная таблица FTS5 db_text_fts (rowid = id текста), синхронизируется из Text.save / post_delete;
+#  - PostgreSQL: генерируемая колонка db_text.search_vector (конфигурация russian стеммит и английские слова).
+# Обе структуры создаются миграцией 0004_text_search_index.
+FTS_TABLE = "db_text_fts"
+PG_SEARCH_CONFIG = "russian"
+
+# Веса полей title, description, text при ранжировании bm25
+BM25_WEIGHTS = (10.0, 2.0, 1.0)
+SNIPPET_START = "<b>"
+SNIPPET_END = "</b>"
+SNIPPET_WORDS = 16
+# Максимум результатов на запрос
+MAX_LIMIT = 200
+
+QUERY_TERM_RE = re.compile(r'"([^"]+)"|(\w+)')
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-яё]', re.IGNORECASE)
+
+_stemmers = {
+    "russian": snowballstemmer.stemmer("russian"),
+    "english": snowballstemmer.stemmer("english"),
+}
+
+
+def fold_yo(value: str) -> str:
+    """
+    Заменяет «ё» на «е»: русский стеммер не различает эти буквы, индекс тоже не должен.
+    """
+    return value.replace("ё", "е").replace("Ё", "Е") if value else value
+
+
+def stem_word(word: str) -> str:
+    """
+    Основа слова: русский стеммер для кириллицы, английский — для остального.
+    """
+    word = word.lower()
+    language = "russian" if CYRILLIC_RE.search(word) else "english"
+    return _stemmers[language].stemWord(word) or word
+
+
+class TextSearchRepository:
+    def __init__(self):
+        self.vendor = connection.vendor
+
+    # -----------------------
+    # Синхронизация индекса
+    # -----------------------
+    def index_text(self, text):
+        """
+        Добавляет или обновляет текст в индексе.
+        В PostgreSQL колонка search_vector пересчитывается самой БД.
+        """
+        if self.vendor != "sqlite":
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [text.id])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, text) VALUES (%s, %s, %s, %s)",
+                [text.id, fold_yo(text.title), fold_yo(text.description), fold_yo(text.text)],
+            )
+
+    def remove_text(self, text_id):
+        """
+        Удаляет текст из индекса.
+        """
+        if self.vendor != "sqlite":
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [text_id])
+
+    # -----------------------
+    # Поиск
+    # -----------------------
+    @staticmethod
+    def build_fts_query(query: str) -> str:
+        """
+        Строит запрос FTS5: фразы в кавычках ищутся точно,
+        отдельные слова — по префиксу самого слова или его основы (русский/английский стемминг).
+        В индексе лежат исходные словоформы, а стеммер может менять буквы (story -> stori),
+        поэтому одного префикса основы недостаточно.
+        """
+        terms = []
+        for phrase, word in QUERY_TERM_RE.findall(query):
+            if phrase:
+                words = WORD_RE.findall(fold_yo(phrase.lower()))
+                if words:
+                    terms.append('"' + " ".join(words) + '"')
+            else:
+                word = fold_yo(word.lower())
+                stem = stem_word(word)
+                if stem == word or word.startswith(stem):
+                    terms.append(f'"{stem}"*')
+                else:
+                    terms.append(f'("{word}"* OR "{stem}"*)')
+        return " AND ".join(terms)
+
+    def search(self, query: str, corpus_id=None, limit: int = 20):
+        """
+        Ищет тексты по title, description и text.
+        Возвращает [{id, title, corpus_id, score, snippet}] по убыванию релевантности.
+        """
+        limit = max(1, min(limit, MAX_LIMIT))
+        if self.vendor == "postgresql":
+            return self._search_postgresql(query, corpus_id, limit)
+        return self._search_sqlite(query, corpus_id, limit)
+
+    def _search_sqlite(self, query, corpus_id, limit):
+        match = self.build_fts_query(query)
+        if not match:
+            return []
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        sql = f"""
+        SELECT t.id, t.title, t.corpus_id, -bm25({FTS_TABLE}, {weights}) AS score,
+               snippet({FTS_TABLE}, -1, %s, %s, '…', {SNIPPET_WORDS}) AS snippet
+        FROM {FTS_TABLE}
+        JOIN db_text t ON t.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+        """
+        params = [SNIPPET_START, SNIPPET_END, match]
+        if corpus_id:
+            sql += " AND t.corpus_id = %s"
+            params.append(corpus_id)
+        sql += f" ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s"
+        params.append(limit)
+        return self._fetch(sql, params)
+
+    def _search_postgresql(self, query, corpus_id, limit):
+        corpus_filter = "AND t.corpus_id = %s" if corpus_id else ""
+        # ts_headline дорогой, поэтому считается только для уже отобранных строк
+        sql = f"""
+        SELECT top.id, top.title, top.corpus_id, top.score,
+               ts_headline('{PG_SEARCH_CONFIG}', top.text, top.q, %s) AS snippet
+        FROM (
+            SELECT t.id, t.title, t.corpus_id, t.text, q, ts_rank_cd(t.search_vector, q) AS score
+            FROM db_text t, websearch_to_tsquery('{PG_SEARCH_CONFIG}', %s) q
+            WHERE t.search_vector @@ q {corpus_filter}
+            ORDER BY score DESC
+            LIMIT %s
+        ) top
+        ORDER BY top.score DESC
+        """
+        options = f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords={SNIPPET_WORDS}, MinWords=5"
+        params = [options, query] + ([corpus_id] if corpus_id else []) + [limit]
+        return self._fetch(sql, params)
+
+    @staticmethod
+    def _fetch(sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                {"id": row[0], "title": row[1], "corpus_id": row[2], "score": float(row[3]), "snippet": row[4]}
+                for row in cursor.fetchall()
+            ]
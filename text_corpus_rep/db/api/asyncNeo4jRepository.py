@@ -0,0 +1,137 @@
+# asyncNeo4jRepository.py
+import asyncio
+import time
+import weakref
+from typing import List, Dict, Any, Optional, Tuple
+
+from neo4j import AsyncGraphDatabase, AsyncDriver, basic_auth, READ_ACCESS
+
+from .neo4jRepository import Neo4jRepository
+from .query_stats import query_stats, profile_query, wants_plan
+from core.settings import NEO4J_DATABASE, NEO4J_MAX_RETRY_TIME
+
+# Асинхронный драйвер привязан к event loop, в котором открыты его соединения.
+# Под ASGI loop сервера живёт всё время работы процесса: драйвер (пул соединений, маршрутизация)
+# создаётся один раз на loop и закрывается при lifespan shutdown (см. core/asgi.py).
+# Под WSGI у каждого запроса свой loop — такие loop не регистрируются, и драйвер открывается на запрос.
+_loop_drivers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncDriver]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def share_drivers_in_loop():
+    """
+    Помечает текущий event loop как долгоживущий: репозитории в нём используют общие драйверы.
+    """
+    _loop_drivers.setdefault(asyncio.get_running_loop(), {})
+
+
+async def close_loop_drivers():
+    """
+    Закрывает общие драйверы текущего event loop.
+    """
+    drivers = _loop_drivers.pop(asyncio.get_running_loop(), {})
+    for driver in drivers.values():
+        await driver.close()
+
+
+def get_async_driver(uri: str, user: str, password: str, encrypted: bool = False) -> Optional[AsyncDriver]:
+    """
+    Общий драйвер текущего долгоживущего event loop (создаётся при первом обращении)
+    или None, если loop не зарегистрирован через share_drivers_in_loop.
+    """
+    try:
+        drivers = _loop_drivers.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return None
+    if drivers is None:
+        return None
+    key = (uri, user, encrypted)
+    if key not in drivers:
+        drivers[key] = _create_driver(uri, user, password, encrypted)
+    return drivers[key]
+
+
+def _create_driver(uri: str, user: str, password: str, encrypted: bool) -> AsyncDriver:
+    return AsyncGraphDatabase.driver(
+        uri,
+        auth=basic_auth(user, password),
+        encrypted=encrypted,
+        max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+    )
+
+
+class AsyncNeo4jRepository:
+    def __init__(self, uri: str, user: str, password: str, encrypted: bool = False,
+                 database: Optional[str] = NEO4J_DATABASE):
+        """
+        Асинхронный аналог Neo4jRepository для ASGI: запросы не блокируют поток,
+        и один воркер обслуживает много одновременных медленных запросов к графу.
+        Репозиторий открывается на запрос через async with. В долгоживущем loop (ASGI) используется
+        общий драйвер loop (get_async_driver), иначе — собственный, который закрывается на выходе.
+        """
+        self.driver = get_async_driver(uri, user, password, encrypted)
+        self._owns_driver = self.driver is None
+        if self._owns_driver:
+            self.driver = _create_driver(uri, user, password, encrypted)
+        self.database = database
+        self.bookmark_manager = AsyncGraphDatabase.bookmark_manager()
+
+    async def close(self):
+        """
+        Закрытие драйвера (общий драйвер loop остаётся открытым)
+        """
+        if self._owns_driver:
+            await self.driver.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # -----------------------
+    # Сессии и транзакции
+    # -----------------------
+    def session(self, readonly: bool = False):
+        config = {"database": self.database, "bookmark_manager": self.bookmark_manager}
+        if readonly:
+            config["default_access_mode"] = READ_ACCESS
+        return self.driver.session(**config)
+
+    @staticmethod
+    async def execute(tx, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """
+        Асинхронный аналог Neo4jRepository.execute (со статистикой в query_stats).
+        """
+        params = params or {}
+        started = time.perf_counter()
+        res = await tx.run(profile_query(query), params)
+        keys = res.keys()
+        rows = await res.values()
+        summary = await res.consume()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        plan = None
+        if wants_plan(elapsed_ms):
+            plan = (await (await tx.run(f"EXPLAIN {query}", params)).consume()).plan
+        query_stats.record(query, params, elapsed_ms, len(rows), summary, plan)
+        return keys, rows
+
+    async def read_values(self, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """Запрос на чтение (execute_read, маршрутизируется на реплики)"""
+        async with self.session(readonly=True) as session:
+            return await session.execute_read(self.execute, query, params)
+
+    async def write_values(self, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """Запрос на запись (execute_write, выполняется на лидере)"""
+        async with self.session() as session:
+            return await session.execute_write(self.execute, query, params)
+
+    # -----------------------
+    # Утилиты
+    # -----------------------
+    async def run_custom_query(self, query: str, params: Dict[str, Any] = None, readonly: bool = False) -> List[Dict[str, Any]]:
+        """
+        Выполнить произвольный Cypher query и вернуть список строк (каждая — dict), как Neo4jRepository.run_custom_query.
+        """
+        keys, rows = await (self.read_values(query, params) if readonly else self.write_values(query, params))
+        return Neo4jRepository.rows_to_dicts(keys, rows)
@@ -0,0 +1,54 @@
+# asyncOntologyRepository.py
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from .asyncNeo4jRepository import AsyncNeo4jRepository
+from .neo4jRepository import TNode
+from .ontologyRepository import OntologyRepository
+
+
+class AsyncOntologyRepository(AsyncNeo4jRepository):
+    """
+    Асинхронные чтения онтологии. Запросы и разбор результатов общие с OntologyRepository.
+    Каждый вызов открывает свою сессию, поэтому независимые запросы можно выполнять параллельно (asyncio.gather).
+    """
+    async def get_ontology(self) -> List[TNode]:
+        return await self.run_custom_query(OntologyRepository.ONTOLOGY_CYPHER, readonly=True)
+
+    async def get_class(self, class_uri: str) -> Optional[TNode]:
+        res = await self.run_custom_query(OntologyRepository.CLASS_CYPHER, {"uri": class_uri}, readonly=True)
+        return res[0]["c"] if res else None
+
+    async def get_class_parents(self, class_uri: str) -> List[TNode]:
+        return await self.run_custom_query(OntologyRepository.CLASS_PARENTS_CYPHER, {"uri": class_uri}, readonly=True)
+
+    async def get_class_children(self, class_uri: str) -> List[TNode]:
+        return await self.run_custom_query(OntologyRepository.CLASS_CHILDREN_CYPHER, {"uri": class_uri}, readonly=True)
+
+    async def get_class_objects(self, class_uri: str) -> List[TNode]:
+        return await self.run_custom_query(OntologyRepository.CLASS_OBJECTS_CYPHER, {"uri": class_uri}, readonly=True)
+
+    async def get_object(self, object_uri: str) -> Optional[TNode]:
+        res = await self.run_custom_query(OntologyRepository.OBJECT_CYPHER, {"uri": object_uri}, readonly=True)
+        return res[0]["o"] if res else None
+
+    async def collect_signature(self, class_uri: str) -> Dict[str, Any]:
+        res = await self.run_custom_query(OntologyRepository.SIGNATURE_CYPHER, {"uri": class_uri}, readonly=True)
+        return OntologyRepository.build_signature(res)
+
+    async def get_nodes_by_uris(self, uris: List[str], labels: Optional[List[str]] = None) -> Dict[str, Any]:
+        uris, cypher = OntologyRepository.nodes_by_uris_query(uris, labels)
+        rows = await self.run_custom_query(cypher, {"uris": uris}, readonly=True) if cypher else []
+        return OntologyRepository.order_nodes(uris, rows)
+
+    async def get_class_overview(self, class_uri: str) -> Dict[str, Any]:
+        """
+        Класс, его сигнатура, родители и потомки — четыре запроса выполняются одновременно.
+        """
+        cls, signature, parents, children = await asyncio.gather(
+            self.get_class(class_uri),
+            self.collect_signature(class_uri),
+            self.get_class_parents(class_uri),
+            self.get_class_children(class_uri),
+        )
+        return {"class": cls, "signature": signature, "parents": parents, "children": children}
@@ -0,0 +1,203 @@
+import codecs
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from transformers import AutoTokenizer
+
+from db.api.TextSearchRepository import WORD_RE, fold_yo
+from core.settings import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_MAX_SEQ_LENGTH,
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+)
+
+TChunk = Dict[str, Any]
+# Единица упаковки: (start, end, text, tail, tokens), tail — разделитель после текста
+TUnit = Tuple[int, int, str, str, int]
+
+# Граница предложения: знаки конца предложения (с закрывающими кавычками/скобками) и пробелы,
+# либо пустая строка между абзацами
+SENTENCE_BOUNDARY_RE = re.compile(r'[.!?…]+["»”\')\]]*(?P<sep>\s+)|(?P<par>\n\s*\n\s*)')
+# Фрагмент без границ предложений длиннее этого числа символов режется принудительно
+MAX_SENTENCE_CHARS = 10000
+
+# Размер блока при потоковом чтении текста (байт)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Токенизаторы загружаются один раз на процесс (без весов модели), по одному на модель
+_tokenizers = {}
+
+
+def get_tokenizer(model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Возвращает токенизатор модели эмбеддингов.
+    """
+    if model_name not in _tokenizers:
+        _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+    return _tokenizers[model_name]
+
+
+def get_token_budget(model_name: str = EMBEDDING_MODEL_NAME) -> int:
+    """
+    Бюджет токенов на чанк: CHUNK_MAX_TOKENS или длина входа модели без служебных токенов.
+    """
+    if CHUNK_MAX_TOKENS:
+        return CHUNK_MAX_TOKENS
+    return EMBEDDING_MAX_SEQ_LENGTH - get_tokenizer(model_name).num_special_tokens_to_add()
+
+
+def iter_decoded(stream, encoding: str = "utf-8", block_size: int = STREAM_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Читает байтовый поток блоками и отдаёт декодированные куски текста.
+    Многобайтовые символы на границе блоков собираются инкрементальным декодером.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        piece = decoder.decode(block)
+        if piece:
+            yield piece
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _span(buffer: str, begin: int, end: int, next_begin: int, offset: int) -> Optional[Tuple[int, int, str, str]]:
+    """
+    Вырезает предложение buffer[begin:end] без крайних пробелов.
+    Возвращает (start, end, text, tail) в абсолютных смещениях или None для пустого фрагмента.
+    """
+    segment = buffer[begin:end]
+    text = segment.strip()
+    if not text:
+        return None
+    start = begin + (len(segment) - len(segment.lstrip()))
+    stop = start + len(text)
+    return offset + start, offset + stop, text, buffer[stop:next_begin]
+
+
+def iter_sentences(pieces: Iterable[str]) -> Iterator[Tuple[int, int, str, str]]:
+    """
+    Потоково делит текст (последовательность кусков) на предложения и абзацы.
+    Отдаёт (start, end, text, tail) — символьные смещения в исходном тексте.
+    В памяти держится только текущее незавершённое предложение.
+    """
+    buffer = ""
+    offset = 0  # абсолютное смещение buffer[0]
+    for piece in pieces:
+        buffer += piece
+        pos = 0
+        for m in SENTENCE_BOUNDARY_RE.finditer(buffer):
+            if m.end() == len(buffer):
+                # разделитель может продолжиться в следующем куске
+                break
+            end = m.start("sep") if m.group("sep") is not None else m.start("par")
+            sentence = _span(buffer, pos, end, m.end(), offset)
+            if sentence:
+                yield sentence
+            pos = m.end()
+        while len(buffer) - pos > MAX_SENTENCE_CHARS:
+            # слишком длинный фрагмент без границ — режем по последнему пробелу
+            limit = pos + MAX_SENTENCE_CHARS
+            cut = buffer.rfind(" ", pos, limit)
+            cut = cut if cut > pos else limit
+            sentence = _span(buffer, pos, cut, cut, offset)
+            if sentence:
+                yield sentence
+            pos = cut
+        buffer = buffer[pos:]
+        offset += pos
+    sentence = _span(buffer, 0, len(buffer), len(buffer), offset)
+    if sentence:
+        yield sentence
+
+
+def tokenize_words(text: str) -> Iterator[Tuple[int, int, int, str]]:
+    """
+    Слова текста для статистики корпуса: (номер предложения, start, end, словоформа).
+    Предложения те же, что у iter_chunks (iter_sentences); словоформа — \\w+ в нижнем регистре, «ё» как «е».
+    """
+    for index, (start, _, sentence, _) in enumerate(iter_sentences((text,))):
+        for m in WORD_RE.finditer(sentence):
+            yield index, start + m.start(), start + m.end(), fold_yo(m.group().lower())
+
+
+def _make_chunk(units: List[TUnit]) -> TChunk:
+    parts = [text + tail for _, _, text, tail, _ in units[:-1]]
+    parts.append(units[-1][2])
+    return {
+        "text": "".join(parts),
+        "start": units[0][0],
+        "end": units[-1][1],
+        "tokens": sum(unit[4] for unit in units),
+    }
+
+
+def _split_long_sentence(sentence: Tuple[int, int, str, str], offsets: List[Tuple[int, int]],
+                         max_tokens: int, overlap: int) -> Iterator[TChunk]:
+    """
+    Режет предложение длиннее бюджета на окна по max_tokens токенов с перекрытием.
+    """
+    start, _, text, _ = sentence
+    step = max(max_tokens - overlap, 1)
+    for i in range(0, len(offsets), step):
+        window = offsets[i:i + max_tokens]
+        a, b = window[0][0], window[-1][1]
+        yield {"text": text[a:b], "start": start + a, "end": start + b, "tokens": len(window)}
+        if i + max_tokens >= len(offsets):
+            break
+
+
+def iter_chunks(text: Union[str, Iterable[str]], max_tokens: int = None, overlap: int = None,
+                model_name: str = EMBEDDING_MODEL_NAME) -> Iterator[TChunk]:
+    """
+    Разбивает текст на чанки по границам предложений так, чтобы каждый чанк
+    укладывался в бюджет токенов модели. Соседние чанки перекрываются на
+    последние предложения суммарной длиной не больше overlap токенов.
+
+    text — строка или итератор кусков строки (для потоковой обработки).
+    Отдаёт {text, start, end, tokens}, где start/end — символьные смещения.
+    model_name — модель, токенизатором которой считаются токены (по умолчанию текущая).
+    """
+    tokenizer = get_tokenizer(model_name)
+    budget = get_token_budget(model_name)
+    # чанк длиннее входа модели был бы обрезан при расчёте эмбеддинга
+    max_tokens = min(max_tokens, budget) if max_tokens else budget
+    overlap = CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    overlap = min(overlap, max_tokens // 2)
+    pieces = (text,) if isinstance(text, str) else text
+
+    window: List[TUnit] = []
+    total = 0
+    for sentence in iter_sentences(pieces):
+        encoding = tokenizer(sentence[2], add_special_tokens=False, return_offsets_mapping=True)
+        n_tokens = len(encoding["input_ids"])
+        if n_tokens > max_tokens:
+            if window:
+                yield _make_chunk(window)
+                window, total = [], 0
+            yield from _split_long_sentence(sentence, encoding["offset_mapping"], max_tokens, overlap)
+            continue
+
+        if window and total + n_tokens > max_tokens:
+            yield _make_chunk(window)
+            # переносим хвостовые предложения в следующий чанк в пределах перекрытия
+            carry: List[TUnit] = []
+            carried = 0
+            for unit in reversed(window):
+                if carried + unit[4] > overlap:
+                    break
+                carry.insert(0, unit)
+                carried += unit[4]
+            while carry and carried + n_tokens > max_tokens:
+                carried -= carry.pop(0)[4]
+            window, total = carry, carried
+
+        window.append((*sentence, n_tokens))
+        total += n_tokens
+
+    if window:
+        yield _make_chunk(window)
@@ -0,0 +1,75 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from db.api.chunk_utils import tokenize_words
+
+# Статистика корпусов: профиль текста (частоты слов и n-грамм) считается при сохранении текста
+# и хранится компактно — массивами uint32 [k, n + 1] (id слов n-граммы по словарю Word и частота),
+# частоты слов и n-грамм корпуса поддерживаются инкрементально в CorpusWordCount и CorpusNgramCount
+# (см. TextProfile.update_for).
+# N-граммы не пересекают границы предложений.
+# Тот же проход даёт позиционный индекс текста: номера слов каждой словоформы (WordPosting)
+# и символьные границы всех слов (TextProfile.offsets) — по ним строится конкорданс.
+
+NGRAM_ORDERS = (1, 2, 3)
+# Более длинные «слова» (хеши, base64 и т. п.) в статистику не попадают
+MAX_WORD_LENGTH = 100
+
+
+def profile_text(text: str) -> Dict[str, Any]:
+    """
+    Профиль текста: число слов, предложений и символов, частоты словоформ и n-грамм (кортежи словоформ),
+    позиции словоформ (номера слов в тексте) и символьные границы всех слов.
+    """
+    sentences: Dict[int, List[str]] = {}
+    positions: Dict[str, List[int]] = {}
+    starts, ends = [], []
+    for position, (sentence, start, end, form) in enumerate(tokenize_words(text)):
+        starts.append(start)
+        ends.append(end)
+        if len(form) <= MAX_WORD_LENGTH:
+            sentences.setdefault(sentence, []).append(form)
+            positions.setdefault(form, []).append(position)
+    ngrams = {n: Counter() for n in NGRAM_ORDERS}
+    for words in sentences.values():
+        for n in NGRAM_ORDERS:
+            ngrams[n].update(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+    return {
+        "tokens": sum(len(words) for words in sentences.values()),
+        "types": len(ngrams[1]),
+        "sentences": len(sentences),
+        "characters": len(text),
+        "ngrams": ngrams,
+        "positions": positions,
+        "starts": starts,
+        "ends": ends,
+    }
+
+
+def pack_counts(counts: Counter, word_ids: Dict[str, int], n: int) -> bytes:
+    """
+    Частоты n-грамм -> байты массива uint32 [k, n + 1], строки упорядочены по id слов.
+    """
+    rows = np.array([[word_ids[form] for form in key] + [count] for key, count in counts.items()],
+                    dtype="<u4").reshape(-1, n + 1)
+    if len(rows):
+        rows = rows[np.lexsort(rows[:, n - 1::-1].T)]
+    return rows.tobytes()
+
+
+def unpack_counts(blob: bytes, n: int) -> np.ndarray:
+    return np.frombuffer(bytes(blob), dtype="<u4").reshape(-1, n + 1)
+
+
+def aggregate_counts(arrays: Iterable[np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Суммирует частоты одинаковых n-грамм из нескольких массивов: (ключи [m, n], частоты [m]).
+    """
+    arrays = [array for array in arrays if len(array)]
+    if not arrays:
+        return np.empty((0, n), dtype=np.uint32), np.empty(0, dtype=np.int64)
+    rows = np.concatenate(arrays)
+    keys, inverse = np.unique(rows[:, :n], axis=0, return_inverse=True)
+    return keys, np.bincount(inverse.reshape(-1), weights=rows[:, n]).astype(np.int64)
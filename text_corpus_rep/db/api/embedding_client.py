@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+from http.client import HTTPConnection, HTTPException
+from typing import Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from core.settings import EMBEDDING_SERVER_URL, EMBEDDING_SERVER_TIMEOUT
+
+# Клиент сервера эмбеддингов (см. embedding_server): используется get_embeddings, если задан EMBEDDING_SERVER_URL.
+# Соединение keep-alive своё у каждого потока воркера.
+
+_local = threading.local()
+
+
+class EmbeddingServerError(Exception):
+    pass
+
+
+def _connection(url: str) -> HTTPConnection:
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        parts = urlsplit(url)
+        connection = HTTPConnection(parts.hostname, parts.port or 80, timeout=EMBEDDING_SERVER_TIMEOUT)
+        _local.connection = connection
+    return connection
+
+
+def _post(url: str, body: bytes):
+    """
+    Один повтор на новом соединении: сервер мог закрыть простаивающее keep-alive соединение.
+    """
+    for attempt in range(2):
+        connection = _connection(url)
+        try:
+            connection.request("POST", "/encode", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response, response.read()
+        except (HTTPException, OSError) as e:
+            connection.close()
+            _local.connection = None
+            if attempt or isinstance(e, TimeoutError):
+                raise
+
+
+def encode_remote(texts: list[str], model_name: str, backend: str, normalize: bool = False,
+                  url: str = EMBEDDING_SERVER_URL) -> Tuple[np.ndarray, float]:
+    """
+    Эмбеддинги текстов с сервера: (матрица float32, время запроса в секундах).
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32), 0.0
+    started = time.perf_counter()
+    body = json.dumps({"texts": texts, "model_name": model_name, "backend": backend, "normalize": normalize})
+    try:
+        response, payload = _post(url, body.encode("utf-8"))
+    except (HTTPException, OSError) as e:
+        raise EmbeddingServerError(f"Embedding server {url} is unavailable: {e}") from e
+    if response.status != 200:
+        raise EmbeddingServerError(f"Embedding server error {response.status}: {payload.decode('utf-8', 'replace')}")
+    rows, dimension = (int(value) for value in response.getheader("X-Embedding-Shape").split(","))
+    embeddings = np.frombuffer(payload, dtype="<f4").reshape(rows, dimension)
+    return embeddings, time.perf_counter() - started
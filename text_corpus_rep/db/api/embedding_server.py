@@ -0,0 +1,234 @@
+import json
+import logging
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from db.models import EmbeddingVersion
+from db.api.embedding_utils import EMBEDDING_BACKENDS, get_model, normalize_rows
+from core.settings import EMBEDDING_SERVER_MAX_BATCH, EMBEDDING_SERVER_MAX_WAIT_MS
+
+# Сервер эмбеддингов (команда embedding_server): один процесс держит модели, веб-воркеры обращаются к нему
+# по HTTP на localhost (см. embedding_client). Одновременные запросы к одной модели собираются в общий батч:
+# батч отправляется в модель, когда набралось max_batch_size текстов или с первого запроса прошло max_wait.
+# Обслуживаются только модели версий эмбеддингов (EmbeddingVersion): произвольные модели из запроса не загружаются.
+#
+# Протокол:
+#   POST /encode  {"texts": [...], "model_name": ..., "backend": ..., "normalize": bool}
+#                 -> float32 little-endian [n, dim], заголовок X-Embedding-Shape: "n,dim"
+#   GET  /health  -> статистика батчей по моделям (JSON)
+
+logger = logging.getLogger(__name__)
+
+ENCODE_PATH = "/encode"
+HEALTH_PATH = "/health"
+
+
+class _Pending:
+    """
+    Запрос, ожидающий своего батча.
+    """
+    __slots__ = ("texts", "normalize", "done", "embeddings", "error")
+
+    def __init__(self, texts: List[str], normalize: bool):
+        self.texts = texts
+        self.normalize = normalize
+        self.done = threading.Event()
+        self.embeddings: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+
+
+class DynamicBatcher:
+    """
+    Очередь запросов к одной модели и поток, кодирующий их общими батчами.
+    """
+    def __init__(self, model, max_batch_size: int = EMBEDDING_SERVER_MAX_BATCH,
+                 max_wait_ms: float = EMBEDDING_SERVER_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "encode_seconds": 0.0}
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def encode(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        Эмбеддинги текстов; блокирует вызывающий поток до обработки батча.
+        """
+        pending = _Pending(texts, normalize)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.embeddings
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["mean_batch_texts"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            self._encode(self._collect())
+
+    def _encode(self, batch: List[_Pending]):
+        texts = [text for pending in batch for text in pending.texts]
+        started = time.perf_counter()
+        try:
+            embeddings = np.asarray(self.model.encode(texts, batch_size=self.max_batch_size, convert_to_numpy=True),
+                                    dtype=np.float32)
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+                pending.done.set()
+            return
+        elapsed = time.perf_counter() - started
+
+        offset = 0
+        for pending in batch:
+            part = embeddings[offset:offset + len(pending.texts)]
+            if pending.normalize:
+                part = normalize_rows(part)
+            pending.embeddings = part
+            offset += len(pending.texts)
+            pending.done.set()
+        with self._lock:
+            self.stats["requests"] += len(batch)
+            self.stats["texts"] += len(texts)
+            self.stats["batches"] += 1
+            self.stats["encode_seconds"] += elapsed
+
+
+class EmbeddingServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер с батчером на каждую пару модель + бэкенд (модель загружается при первом запросе).
+    """
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], max_batch_size: int = EMBEDDING_SERVER_MAX_BATCH,
+                 max_wait_ms: float = EMBEDDING_SERVER_MAX_WAIT_MS):
+        super().__init__(address, EmbeddingRequestHandler)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batchers: Dict[Tuple[str, str], DynamicBatcher] = {}
+        self._batchers_lock = threading.Lock()
+        # по блокировке на загружаемую модель: загрузка одной модели не задерживает запросы к другим
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+
+    @staticmethod
+    def is_known_model(model_name: str, backend: str) -> bool:
+        return EmbeddingVersion.objects.filter(model_name=model_name, backend=backend).exists()
+
+    def get_batcher(self, model_name: str, backend: str) -> DynamicBatcher:
+        """
+        Батчер модели; при первом запросе модель загружается. Модель без версии эмбеддингов — ValueError.
+        """
+        key = (model_name, backend)
+        with self._batchers_lock:
+            batcher = self.batchers.get(key)
+            if batcher is not None:
+                return batcher
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._batchers_lock:
+                batcher = self.batchers.get(key)
+            if batcher is not None:
+                return batcher
+            if not self.is_known_model(model_name, backend):
+                raise ValueError(f"No embedding version uses model {model_name} [{backend}]")
+            batcher = DynamicBatcher(get_model(backend, model_name), self.max_batch_size, self.max_wait_ms)
+            with self._batchers_lock:
+                self.batchers[key] = batcher
+        return batcher
+
+    def health(self) -> Dict[str, Any]:
+        with self._batchers_lock:
+            batchers = dict(self.batchers)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "models": {f"{model_name} [{backend}]": batcher.snapshot()
+                       for (model_name, backend), batcher in batchers.items()},
+        }
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != HEALTH_PATH:
+            self._reply(404, b"", "text/plain")
+            return
+        self._reply(200, json.dumps(self.server.health()).encode("utf-8"), "application/json")
+
+    def do_POST(self):
+        if self.path != ENCODE_PATH:
+            self._reply(404, b"", "text/plain")
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            texts = body["texts"]
+            model_name = body["model_name"]
+            backend = body["backend"]
+            normalize = bool(body.get("normalize", False))
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be a list of strings")
+            if backend not in EMBEDDING_BACKENDS:
+                raise ValueError(f"Unknown embedding backend: {backend}")
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, str(e).encode("utf-8"), "text/plain")
+            return
+
+        if not texts:
+            self._reply(200, b"", "application/octet-stream", {"X-Embedding-Shape": "0,0"})
+            return
+        try:
+            batcher = self.server.get_batcher(model_name, backend)
+        except ValueError as e:
+            self._reply(400, str(e).encode("utf-8"), "text/plain")
+            return
+        try:
+            embeddings = batcher.encode(texts, normalize)
+        except Exception as e:
+            logger.exception("Embedding request failed")
+            self._reply(500, str(e).encode("utf-8"), "text/plain")
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype="<f4").reshape(len(texts), -1)
+        self._reply(200, embeddings.tobytes(), "application/octet-stream", {
+            "X-Embedding-Shape": f"{embeddings.shape[0]},{embeddings.shape[1]}",
+        })
+
+    def _reply(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
@@ -1,27 +1,138 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import time
+from typing import TYPE_CHECKING
+
 import numpy as np
-import re
+from sklearn.metrics.pairwise import cosine_similarity
+
+from db.api.chunk_utils import iter_chunks
+from db.api.embedding_client import encode_remote
+from db.api.request_metrics import request_metrics
+from core.settings import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_QUANTIZATION_CONFIG,
+    EMBEDDING_SERVER_URL,
+)
+
+# torch и sentence_transformers импортируются только при загрузке модели: веб-воркеры,
+# работающие через сервер эмбеддингов (EMBEDDING_SERVER_URL), их не загружают
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Фиксированная выборка для проверки качества бэкендов инференса
+ACCURACY_SAMPLE = [
+    "Корпус текстов содержит художественные и публицистические произведения.",
+    "Онтология описывает классы, их атрибуты и связи между объектами.",
+    "Лингвисты размечают упоминания персонажей в тексте романа.",
+    "Перевод текста связан с оригиналом отношением has_translation.",
+    "Москва — столица России и крупнейший город страны.",
+    "Поэт написал это стихотворение во время ссылки на Кавказ.",
+    "The corpus contains fiction and journalistic texts.",
+    "An ontology describes classes, their attributes and relations between objects.",
+    "Linguists annotate mentions of characters in the text of the novel.",
+    "The translation of a text is linked to the original.",
+    "Moscow is the capital of Russia and its largest city.",
+    "The weather was cold and rainy for the whole week.",
+]
+
+# Модели загружаются один раз на процесс (по одной на пару модель + бэкенд)
+_models = {}
+
+
+def load_model(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> "SentenceTransformer":
+    """
+    Загружает модель с указанным бэкендом инференса.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        # Динамическая квантизация линейных слоёв, работает только на CPU
+        reference = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(reference, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx-int8":
+        return _load_quantized_onnx_model(model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {EMBEDDING_BACKENDS}")
+
+
+def _load_quantized_onnx_model(model_name: str = EMBEDDING_MODEL_NAME) -> "SentenceTransformer":
+    """
+    Загружает int8 ONNX-модель. При первом запуске экспортирует и квантует модель в EMBEDDING_ONNX_DIR
+    (модели, отличные от текущей, — в подкаталог по имени модели).
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    onnx_dir = EMBEDDING_ONNX_DIR
+    if model_name != EMBEDDING_MODEL_NAME:
+        onnx_dir = os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+    # Суффикс задаётся явно: по умолчанию экспорт называет файл по типу весов (model_quint8_avx2.onnx)
+    file_suffix = f"qint8_{EMBEDDING_QUANTIZATION_CONFIG}"
+    file_name = f"onnx/model_{file_suffix}.onnx"
+    if not os.path.exists(os.path.join(onnx_dir, file_name)):
+        onnx_model = SentenceTransformer(model_name, backend="onnx")
+        onnx_model.save_pretrained(onnx_dir)
+        export_dynamic_quantized_onnx_model(onnx_model, EMBEDDING_QUANTIZATION_CONFIG, onnx_dir,
+                                            file_suffix=file_suffix)
+    return SentenceTransformer(onnx_dir, backend="onnx", model_kwargs={"file_name": file_name})
 
-# Загружаем модель один раз
-model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-mpnet-base-v2')
 
-def get_chunks(text: str, chunk_size: int = 200) -> list[str]:
+def get_model(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> "SentenceTransformer":
     """
-    Разбивает текст на чанки длиной примерно chunk_size слов.
+    Возвращает модель для бэкенда, загружая её при первом обращении.
     """
-    words = re.findall(r'\w+', text)
-    chunks = []
-    for i in range(0, len(words), chunk_size):
-        chunk = ' '.join(words[i:i + chunk_size])
-        chunks.append(chunk)
-    return chunks
+    key = (model_name, backend)
+    if key not in _models:
+        _models[key] = load_model(backend, model_name)
+    return _models[key]
 
-def get_embeddings(texts: list[str]) -> np.ndarray:
+
+def get_chunks(text: str, chunk_size: int = None) -> list[str]:
+    """
+    Разбивает текст на чанки не длиннее chunk_size токенов модели
+    (по умолчанию — вся длина входа модели) по границам предложений.
+    """
+    return [chunk["text"] for chunk in iter_chunks(text, max_tokens=chunk_size)]
+
+def get_embeddings(texts: list[str], batch_size: int = 32, version=None, tokens: int = None) -> np.ndarray:
     """
     Возвращает эмбеддинги для списка текстов (или чанков).
+    batch_size — размер батча инференса (крупнее для пакетного пересчёта).
+    version — EmbeddingVersion: модель, бэкенд и нормализация (по умолчанию — текущие настройки, без нормализации).
+    tokens — число токенов входов, если оно уже известно (для чанков его считает чанкер).
+    Каждый вызов учитывается в метриках: размер батча, время инференса и число токенов, если оно передано
+    (ради счётчика входы повторно не токенизируются).
+    Если задан EMBEDDING_SERVER_URL, тексты кодируются сервером эмбеддингов (батчи собирает он,
+    batch_size не используется), время в метриках — время запроса к серверу.
     """
-    return model.encode(texts, convert_to_numpy=True)
+    if EMBEDDING_SERVER_URL:
+        model_name, backend = (version.model_name, version.backend) if version is not None else (EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)
+        embeddings, elapsed = encode_remote(texts, model_name, backend, version is not None and version.normalized)
+        request_metrics.observe_encode(len(texts), tokens, elapsed)
+        return embeddings
+    model = get_model(version.backend, version.model_name) if version is not None else get_model()
+    normalize = version is not None and version.normalized
+    started = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=normalize)
+    elapsed = time.perf_counter() - started
+    request_metrics.observe_encode(len(texts), tokens, elapsed)
+    return embeddings
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-нормализация векторов по последней оси; нулевые векторы остаются нулевыми.
+    """
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
 
 def cos_compare(emb1: np.ndarray, emb2: np.ndarray) -> float:
     """
@@ -30,3 +141,44 @@ def cos_compare(emb1: np.ndarray, emb2: np.ndarray) -> float:
     emb1 = emb1.reshape(1, -1)
     emb2 = emb2.reshape(1, -1)
     return float(cosine_similarity(emb1, emb2)[0][0])
+
+
+def _timed_encode(model: "SentenceTransformer", texts: list[str], repeats: int) -> tuple[np.ndarray, float]:
+    """
+    Кодирует тексты repeats раз и возвращает эмбеддинги и лучшее время (сек).
+    """
+    model.encode(texts[:1], convert_to_numpy=True)  # прогрев
+    best = float("inf")
+    embeddings = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = model.encode(texts, convert_to_numpy=True)
+        best = min(best, time.perf_counter() - start)
+    return embeddings, best
+
+
+def check_backend_accuracy(backend: str = EMBEDDING_BACKEND, texts: list[str] = None, repeats: int = 3) -> dict:
+    """
+    Сравнивает бэкенд с эталонной моделью (torch, fp32) на фиксированной выборке.
+    Возвращает сходство эмбеддингов с эталоном, ошибку попарных косинусных оценок и ускорение.
+    """
+    texts = texts or ACCURACY_SAMPLE
+    reference, reference_time = _timed_encode(get_model("torch"), texts, repeats)
+    candidate, candidate_time = _timed_encode(get_model(backend), texts, repeats)
+
+    # Сходство эмбеддинга одного и того же текста у эталона и бэкенда
+    self_similarity = np.diag(cosine_similarity(reference, candidate))
+    # Отклонение попарных оценок — именно они используются при сравнении текстов
+    score_error = np.abs(cosine_similarity(reference) - cosine_similarity(candidate))
+
+    return {
+        "backend": backend,
+        "samples": len(texts),
+        "mean_cosine": float(self_similarity.mean()),
+        "min_cosine": float(self_similarity.min()),
+        "mean_score_error": float(score_error.mean()),
+        "max_score_error": float(score_error.max()),
+        "reference_seconds": reference_time,
+        "backend_seconds": candidate_time,
+        "speedup": reference_time / candidate_time if candidate_time else None,
+    }
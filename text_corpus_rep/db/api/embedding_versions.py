@@ -0,0 +1,95 @@
+from typing import Any, Dict, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from db.models import EmbeddingVersion, Text, TextEmbedding
+from db.api.embedding_utils import EMBEDDING_BACKENDS
+
+# Жизненный цикл версии эмбеддингов:
+#  1. create_version — новая версия в статусе building, запросы её не видят (кроме явно закрепивших);
+#  2. reembed --embedding-version <name> строит векторы в фоне, повторный запуск с --missing-only досчитывает
+#     тексты, изменённые за время построения;
+#  3. activate_version — в одной транзакции меняет активную версию и Text.embedding; поиск не прерывается.
+
+COPY_BATCH_SIZE = 1000
+
+
+def create_version(name: str, model_name: str, backend: str = "torch", chunk_max_tokens: int = None,
+                   normalized: bool = False) -> EmbeddingVersion:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {EMBEDDING_BACKENDS}")
+    if EmbeddingVersion.objects.filter(name=name).exists():
+        raise ValueError(f"Embedding version {name} already exists")
+    return EmbeddingVersion.objects.create(
+        name=name,
+        model_name=model_name,
+        backend=backend,
+        chunk_max_tokens=chunk_max_tokens,
+        normalized=normalized,
+    )
+
+
+def missing_texts(version: EmbeddingVersion):
+    """
+    Тексты с содержимым, для которых у версии нет вектора.
+    """
+    return Text.objects.exclude(text="").exclude(embeddings__version=version)
+
+
+def version_info(version: EmbeddingVersion) -> Dict[str, Any]:
+    return {
+        "name": version.name,
+        "model_name": version.model_name,
+        "backend": version.backend,
+        "chunk_max_tokens": version.chunk_max_tokens,
+        "normalized": version.normalized,
+        "dimension": version.dimension,
+        "status": version.status,
+        "texts": version.text_embeddings.count(),
+        "missing": missing_texts(version).count(),
+        "created_at": version.created_at.isoformat(),
+        "activated_at": version.activated_at.isoformat() if version.activated_at else None,
+    }
+
+
+def list_versions() -> List[Dict[str, Any]]:
+    EmbeddingVersion.get_active()
+    return [version_info(version) for version in EmbeddingVersion.objects.order_by("created_at")]
+
+
+def activate_version(name: str, force: bool = False) -> EmbeddingVersion:
+    """
+    Атомарно делает версию активной: прежняя уходит в retired, Text.embedding переписывается векторами новой версии.
+    Без force версия без векторов для части текстов не активируется.
+    """
+    version = EmbeddingVersion.objects.get(name=name)
+    if version.is_active:
+        return version
+    missing = missing_texts(version).count()
+    if missing and not force:
+        raise ValueError(f"Embedding version {name} has no vectors for {missing} texts; run reembed --missing-only")
+
+    with transaction.atomic():
+        EmbeddingVersion.objects.filter(status="active").update(status="retired")
+        version.status = "active"
+        version.activated_at = timezone.now()
+        version.save(update_fields=["status", "activated_at"])
+
+        Text.objects.exclude(embeddings__version=version).update(embedding=None)
+        batch = []
+        for text_id, embedding in TextEmbedding.objects.filter(version=version).values_list("text_id", "embedding").iterator(chunk_size=COPY_BATCH_SIZE):
+            batch.append(Text(id=text_id, embedding=embedding))
+            if len(batch) == COPY_BATCH_SIZE:
+                Text.objects.bulk_update(batch, ["embedding"])
+                batch = []
+        if batch:
+            Text.objects.bulk_update(batch, ["embedding"])
+    return version
+
+
+def delete_version(name: str):
+    version = EmbeddingVersion.objects.get(name=name)
+    if version.is_active:
+        raise ValueError(f"Embedding version {name} is active and cannot be deleted")
+    version.delete()
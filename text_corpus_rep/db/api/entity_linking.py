@@ -0,0 +1,167 @@
+import hashlib
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from db.models import EmbeddingVersion, OntologyObjectEmbedding, Text, TextAnnotation, TextChunk
+from db.api.embedding_utils import get_embeddings, normalize_rows
+from db.api.ontologyRepository import OntologyRepository
+from core.settings import ENTITY_LINK_THRESHOLD, ENTITY_LINK_TOP_K
+
+# Entity linking выполняется пакетно вне запросов (команда link_entities):
+#  1. refresh_object_index — эмбеддинги title + description объектов онтологии, пересчитываются только изменившиеся
+#     (версия эмбеддингов входит в хеш: после смены активной версии индекс пересчитывается целиком);
+#  2. link_chunks — сохранённые эмбеддинги чанков активной версии сравниваются с индексом объектов,
+#     совпадения выше порога записываются как TextAnnotation со статусом proposed.
+
+
+def _object_content(obj: Dict[str, Any]) -> str:
+    title = obj.get("title") or ""
+    description = obj.get("description") or ""
+    return f"{title}. {description}" if description else title
+
+
+def _content_hash(content: str, version: EmbeddingVersion) -> str:
+    return hashlib.sha256(f"{version.name}\n{content}".encode("utf-8")).hexdigest()
+
+
+def _batches(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def refresh_object_index(ontology: OntologyRepository, batch_size: int = 256) -> Tuple[Set[str], Set[str]]:
+    """
+    Синхронизирует векторный индекс объектов с онтологией.
+    Возвращает (uri новых/изменённых объектов, uri удалённых объектов).
+    """
+    version = EmbeddingVersion.get_active()
+    objects = [obj for obj in ontology.get_all_objects() if obj.get("uri")]
+    known = dict(OntologyObjectEmbedding.objects.values_list("object_uri", "content_hash"))
+
+    changed = []
+    for obj in objects:
+        content = _object_content(obj)
+        content_hash = _content_hash(content, version)
+        if known.get(obj["uri"]) != content_hash:
+            changed.append((obj, content, content_hash))
+
+    for batch in _batches(changed, batch_size):
+        embeddings = get_embeddings([content for _, content, _ in batch], version=version)
+        OntologyObjectEmbedding.objects.filter(object_uri__in=[obj["uri"] for obj, _, _ in batch]).delete()
+        OntologyObjectEmbedding.objects.bulk_create([
+            OntologyObjectEmbedding(
+                object_uri=obj["uri"],
+                class_uri=obj.get("class_uri") or "",
+                title=obj.get("title") or "",
+                content_hash=content_hash,
+                embedding=emb.tolist(),
+            )
+            for (obj, _, content_hash), emb in zip(batch, embeddings)
+        ])
+
+    removed = set(known) - {obj["uri"] for obj in objects}
+    if removed:
+        OntologyObjectEmbedding.objects.filter(object_uri__in=removed).delete()
+    changed_uris = {obj["uri"] for obj, _, _ in changed}
+    # Непроверенные предложения для изменённых и удалённых объектов устарели
+    TextAnnotation.objects.filter(status="proposed", object_uri__in=changed_uris | removed).delete()
+    return changed_uris, removed
+
+
+def _load_object_index(object_uris: Set[str] = None) -> Tuple[List[OntologyObjectEmbedding], np.ndarray]:
+    objects = OntologyObjectEmbedding.objects.all()
+    if object_uris is not None:
+        objects = objects.filter(object_uri__in=object_uris)
+    objects = list(objects)
+    if not objects:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    matrix = normalize_rows(np.asarray([obj.embedding for obj in objects], dtype=np.float32))
+    return objects, matrix
+
+
+def _propose(chunks: List[TextChunk], objects: List[OntologyObjectEmbedding], matrix: np.ndarray,
+             threshold: float, top_k: int) -> List[TextAnnotation]:
+    """
+    Сопоставляет пакет чанков с объектами и строит предложенные аннотации.
+    """
+    chunk_matrix = normalize_rows(np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32))
+    scores = chunk_matrix @ matrix.T
+    texts = dict(Text.objects.filter(id__in={chunk.text_id for chunk in chunks}).values_list("id", "text"))
+    existing = set(
+        TextAnnotation.objects.filter(text_id__in=texts.keys())
+        .values_list("text_id", "object_uri", "start", "end")
+    )
+
+    proposals = []
+    for row, chunk in enumerate(chunks):
+        top = np.argsort(-scores[row])[:top_k]
+        for col in top:
+            score = float(scores[row, col])
+            if score < threshold:
+                break
+            obj = objects[col]
+            if (chunk.text_id, obj.object_uri, chunk.start, chunk.end) in existing:
+                continue
+            proposals.append(TextAnnotation(
+                text_id=chunk.text_id,
+                start=chunk.start,
+                end=chunk.end,
+                fragment=texts.get(chunk.text_id, "")[chunk.start:chunk.end],
+                object_uri=obj.object_uri,
+                object_title=obj.title,
+                class_uri=obj.class_uri,
+                status="proposed",
+                confidence=score,
+            ))
+    return proposals
+
+
+def _link(chunks, objects, matrix, threshold, top_k, batch_size, mark_linked) -> int:
+    """
+    Обходит чанки пакетами по id (постранично, без открытого курсора — чанки обновляются по ходу).
+    """
+    created = 0
+    last_id = 0
+    while True:
+        batch = list(chunks.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            break
+        created += _flush(batch, objects, matrix, threshold, top_k, mark_linked)
+        last_id = batch[-1].id
+    return created
+
+
+def _flush(batch, objects, matrix, threshold, top_k, mark_linked) -> int:
+    proposals = _propose(batch, objects, matrix, threshold, top_k)
+    TextAnnotation.objects.bulk_create(proposals)
+    if mark_linked:
+        TextChunk.objects.filter(id__in=[chunk.id for chunk in batch]).update(linked=True)
+    return len(proposals)
+
+
+def link_chunks(changed_uris: Set[str], corpus_id=None, threshold: float = ENTITY_LINK_THRESHOLD,
+                top_k: int = ENTITY_LINK_TOP_K, batch_size: int = 512) -> Dict[str, int]:
+    """
+    Предлагает связи чанков с объектами:
+    - новые (ещё не сопоставленные) чанки — со всеми объектами индекса;
+    - уже сопоставленные чанки — только с новыми/изменёнными объектами.
+    """
+    chunks = TextChunk.objects.filter(version=EmbeddingVersion.get_active())
+    if corpus_id:
+        chunks = chunks.filter(text__corpus_id=corpus_id)
+
+    result = {"new_chunks": 0, "changed_objects": len(changed_uris), "proposed": 0}
+
+    if changed_uris:
+        objects, matrix = _load_object_index(changed_uris)
+        if objects:
+            result["proposed"] += _link(chunks.filter(linked=True), objects, matrix,
+                                        threshold, top_k, batch_size, mark_linked=False)
+
+    new_chunks = chunks.filter(linked=False)
+    result["new_chunks"] = new_chunks.count()
+    objects, matrix = _load_object_index()
+    if objects:
+        result["proposed"] += _link(new_chunks, objects, matrix, threshold, top_k, batch_size, mark_linked=True)
+    return result
@@ -1,23 +1,45 @@
 # neo4jRepository.py
 import json
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-from neo4j import GraphDatabase, basic_auth
+from neo4j import GraphDatabase, basic_auth, READ_ACCESS
+from neo4j.graph import Entity, Node, Relationship
+
+from .query_stats import query_stats, profile_query, wants_plan
+from core.settings import NEO4J_DATABASE, NEO4J_MAX_RETRY_TIME
 
 TNode = Dict[str, Any]
 TArc = Dict[str, Any]
 
+# Проекции RETURN: только нужные поля вместо целых узлов и отношений (без гидрации объектов драйвера)
+NODE_PROJECTION = "id(n) AS id, n.uri AS uri, n.title AS title, n.description AS description"
+ARC_PROJECTION = "id(r) AS id, type(r) AS type, a.uri AS node_uri_from, b.uri AS node_uri_to"
+
 class Neo4jRepository:
-    def __init__(self, uri: str, user: str, password: str, encrypted: bool = False):
+    def __init__(self, uri: str, user: str, password: str, encrypted: bool = False, database: Optional[str] = NEO4J_DATABASE):
         """
         Инициализация драйвера neo4j
-        :param uri: например "bolt://localhost:7687"
+        :param uri: например "bolt://localhost:7687" (или "neo4j://..." — с маршрутизацией по кластеру)
         :param user: логин
         :param password: пароль
         :param encrypted: шифрованное соединение (TLS/SSL)
+        :param database: имя базы (None — база по умолчанию)
+
+        Чтения выполняются через execute_read (маршрутизируются на реплики), записи — через execute_write;
+        обе управляемые транзакции повторяются драйвером при временных ошибках.
+        Все сессии одного репозитория делят bookmark manager: чтение после записи в рамках
+        репозитория (т.е. одного запроса) видит эту запись даже на реплике.
         """
-        self.driver = GraphDatabase.driver(uri, auth=basic_auth(user, password), encrypted=encrypted)
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=basic_auth(user, password),
+            encrypted=encrypted,
+            max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+        )
+        self.database = database
+        self.bookmark_manager = GraphDatabase.bookmark_manager()
 
     def close(self):
         """
@@ -25,6 +47,47 @@ class Neo4jRepository:
         """
         self.driver.close()
 
+    # -----------------------
+    # Сессии и транзакции
+    # -----------------------
+    def session(self, readonly: bool = False):
+        """
+        Сессия с базой репозитория и общим bookmark manager.
+        """
+        config = {"database": self.database, "bookmark_manager": self.bookmark_manager}
+        if readonly:
+            config["default_access_mode"] = READ_ACCESS
+        return self.driver.session(**config)
+
+    @staticmethod
+    def execute(tx, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """
+        Выполняет запрос в транзакции и материализует результат без объектов Record:
+        (имена столбцов, строки-списки значений). Результат нельзя читать после завершения транзакции,
+        а сама функция может быть повторена драйвером.
+        Каждый запрос учитывается в query_stats (время, строки, размер параметров, db hits при PROFILE).
+        """
+        params = params or {}
+        started = time.perf_counter()
+        res = tx.run(profile_query(query), params)
+        keys = res.keys()
+        rows = res.values()
+        summary = res.consume()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        plan = tx.run(f"EXPLAIN {query}", params).consume().plan if wants_plan(elapsed_ms) else None
+        query_stats.record(query, params, elapsed_ms, len(rows), summary, plan)
+        return keys, rows
+
+    def read_values(self, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """Запрос на чтение (execute_read, маршрутизируется на реплики)"""
+        with self.session(readonly=True) as session:
+            return session.execute_read(self.execute, query, params)
+
+    def write_values(self, query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[list]]:
+        """Запрос на запись (execute_write, выполняется на лидере)"""
+        with self.session() as session:
+            return session.execute_write(self.execute, query, params)
+
     # -----------------------
     # Вспомогательные функции
     # -----------------------
@@ -61,38 +124,43 @@ class Neo4jRepository:
     # -----------------------
     # Сборщики (collect)
     # -----------------------
+    @staticmethod
+    def node_from_row(row) -> TNode:
+        """
+        TNode из строки проекции NODE_PROJECTION: (id, uri, title, description).
+        """
+        node_id, uri, title, description = row
+        return {"id": node_id, "uri": uri, "title": title, "description": description, "arcs": []}
+
+    @staticmethod
+    def arc_from_row(row) -> TArc:
+        """
+        TArc из строки проекции ARC_PROJECTION: (id, type, uri начала, uri конца).
+        """
+        arc_id, rel_type, uri_from, uri_to = row
+        return {"id": arc_id, "uri": rel_type, "node_uri_from": uri_from, "node_uri_to": uri_to}
+
     @staticmethod
     def collect_node(record_node: Dict[str, Any]) -> TNode:
         """
         Преобразует результат neo4j node в TNode dict.
         Ожидается, что record_node — это dict с ключами: id, uri, title, description
-        Если передан объект neo4j.Node, можно извлечь через .id и .items()
+        или объект neo4j.Node. Сами методы репозитория собирают узлы из проекций (node_from_row).
         """
-        # Поддержка разных форматов входа
-        if hasattr(record_node, "items") and 'uri' in record_node:
-            # dict-like
-            node = record_node
-            return {
-                "id": int(node.get("id")) if node.get("id") is not None else None,
-                "uri": node.get("uri"),
-                "title": node.get("title"),
-                "description": node.get("description"),
-                "arcs": node.get("arcs", []),
-            }
-        # Предполагаем, что это neo4j.Node
-        try:
-            props = dict(record_node.items())
-            props['id'] = int(record_node.id)  # neo4j node id
-            return {
-                "id": props.get("id"),
-                "uri": props.get("uri"),
-                "title": props.get("title"),
-                "description": props.get("description"),
-                "arcs": props.get("arcs", []),
-            }
-        except Exception:
+        if isinstance(record_node, Node):
+            node_id, props = record_node.id, record_node
+        elif isinstance(record_node, dict):
+            node_id, props = record_node.get("id"), record_node
+        else:
             # fallback: просто приведение в dict
             return dict(record_node)
+        return {
+            "id": int(node_id) if node_id is not None else None,
+            "uri": props.get("uri"),
+            "title": props.get("title"),
+            "description": props.get("description"),
+            "arcs": props.get("arcs", []),
+        }
 
     @staticmethod
     def collect_arc(rel) -> TArc:
@@ -100,12 +168,12 @@ class Neo4jRepository:
         Преобразует neo4j relationship или dict в TArc
         Ожидается: id, type (uri), startNode, endNode
         """
-        if hasattr(rel, "type") and hasattr(rel, "id"):
+        if isinstance(rel, Relationship):
             return {
                 "id": int(rel.id),
                 "uri": rel.type,
-                "node_uri_from": rel.start_node.get("uri") if hasattr(rel, "start_node") else None,
-                "node_uri_to": rel.end_node.get("uri") if hasattr(rel, "end_node") else None,
+                "node_uri_from": rel.start_node.get("uri") if rel.start_node is not None else None,
+                "node_uri_to": rel.end_node.get("uri") if rel.end_node is not None else None,
             }
         if isinstance(rel, dict):
             return {
@@ -131,95 +199,53 @@ class Neo4jRepository:
         labels_part = f" {self.transform_labels(labels)}" if labels else ""
         props_part = self.transform_props(props_with_uri)
 
-        cypher = f"CREATE (n{labels_part} {props_part}) RETURN n"
-        with self.driver.session() as session:
-            rec = session.run(cypher).single()
-            node = rec["n"]
-            node_props = dict(node.items())
-            node_props["id"] = int(node.id)
-            return self.collect_node(node_props)
+        cypher = f"CREATE (n{labels_part} {props_part}) RETURN {NODE_PROJECTION}"
+        _, rows = self.write_values(cypher)
+        return self.node_from_row(rows[0])
 
     def get_all_nodes(self) -> List[TNode]:
         """Получить все узлы (без связей)"""
-        cypher = "MATCH (n) RETURN n"
-        with self.driver.session() as session:
-            res = session.run(cypher)
-            nodes = []
-            for r in res:
-                node = r["n"]
-                props = dict(node.items())
-                props["id"] = int(node.id)
-                nodes.append(self.collect_node(props))
-            return nodes
+        cypher = f"MATCH (n) RETURN {NODE_PROJECTION}"
+        _, rows = self.read_values(cypher)
+        return [self.node_from_row(row) for row in rows]
 
     def get_all_nodes_and_arcs(self) -> List[TNode]:
         """
         Получить все узлы и их связи (арки вложены в поле arcs для узла).
         Формируем список узлов, у каждого поле arcs = [TArc...]
+        Узлы и дуги читаются двумя запросами с проекцией нужных полей, каждый узел собирается один раз.
         """
-        cypher = """
-        MATCH (a)-[r]->(b)
-        RETURN a, r, b
-        """
-        with self.driver.session() as session:
-            res = session.run(cypher)
-            nodes_map: Dict[str, TNode] = {}
-            for r in res:
-                a = r["a"]
-                b = r["b"]
-                rel = r["r"]
-                # собираем узлы
-                a_props = dict(a.items()); a_props["id"] = int(a.id)
-                b_props = dict(b.items()); b_props["id"] = int(b.id)
-                a_node = self.collect_node(a_props)
-                b_node = self.collect_node(b_props)
-                # сохранить/обновить в map
-                nodes_map[a_node["uri"]] = nodes_map.get(a_node["uri"], a_node)
-                nodes_map[b_node["uri"]] = nodes_map.get(b_node["uri"], b_node)
-                # собрать дугу
-                arc = self.collect_arc(rel)
-                # попытка получить node uri from/to из свойств rel (если есть)
-                if not arc["node_uri_from"]:
-                    arc["node_uri_from"] = a_node["uri"]
-                if not arc["node_uri_to"]:
-                    arc["node_uri_to"] = b_node["uri"]
-                # добавить arc в узел-источник
-                src = nodes_map[arc["node_uri_from"]]
-                src.setdefault("arcs", []).append(arc)
-            # также добавить отдельные изолированные узлы (без связей)
-            # Получим все узлы и добавим те, которых нет в nodes_map
-            all_nodes = self.get_all_nodes()
-            for n in all_nodes:
-                if n["uri"] not in nodes_map:
-                    nodes_map[n["uri"]] = n
-            return list(nodes_map.values())
+        nodes_cypher = f"MATCH (n) RETURN {NODE_PROJECTION}"
+        arcs_cypher = f"MATCH (a)-[r]->(b) RETURN {ARC_PROJECTION}"
+        with self.session(readonly=True) as session:
+            def load(tx):
+                return self.execute(tx, nodes_cypher)[1], self.execute(tx, arcs_cypher)[1]
+            node_rows, arc_rows = session.execute_read(load)
+
+        nodes_map: Dict[str, TNode] = {}
+        for row in node_rows:
+            nodes_map.setdefault(row[1], self.node_from_row(row))
+        for row in arc_rows:
+            # добавить arc в узел-источник
+            src = nodes_map.get(row[2])
+            if src is not None:
+                src["arcs"].append(self.arc_from_row(row))
+        return list(nodes_map.values())
 
     def get_nodes_by_labels(self, labels: List[str]) -> List[TNode]:
         """Выбрать узлы по меткам"""
         labels_part = self.transform_labels(labels)
         if labels_part:
-            cypher = f"MATCH (n{labels_part}) RETURN n"
+            cypher = f"MATCH (n{labels_part}) RETURN {NODE_PROJECTION}"
         else:
-            cypher = "MATCH (n) RETURN n"
-        with self.driver.session() as session:
-            res = session.run(cypher)
-            nodes = []
-            for r in res:
-                node = r["n"]
-                props = dict(node.items())
-                props["id"] = int(node.id)
-                nodes.append(self.collect_node(props))
-            return nodes
+            cypher = f"MATCH (n) RETURN {NODE_PROJECTION}"
+        _, rows = self.read_values(cypher)
+        return [self.node_from_row(row) for row in rows]
 
     def get_node_by_uri(self, uri: str) -> Optional[TNode]:
-        cypher = "MATCH (n {`uri`: $uri}) RETURN n LIMIT 1"
-        with self.driver.session() as session:
-            rec = session.run(cypher, uri=uri).single()
-            if not rec:
-                return None
-            node = rec["n"]
-            props = dict(node.items()); props["id"] = int(node.id)
-            return self.collect_node(props)
+        cypher = f"MATCH (n {{`uri`: $uri}}) RETURN {NODE_PROJECTION} LIMIT 1"
+        _, rows = self.read_values(cypher, {"uri": uri})
+        return self.node_from_row(rows[0]) if rows else None
 
     def update_node(self, uri: str, props: Dict[str, Any]) -> Optional[TNode]:
         """
@@ -229,16 +255,11 @@ class Neo4jRepository:
         # формируем SET n += { ... } используя параметры
         param_map = {f"p_{k}": v for k, v in props.items()}
         set_parts = ", ".join([f"n.`{k}` = $p_{k}" for k in props.keys()])
-        cypher = f"MATCH (n {{`uri`: $uri}}) SET {set_parts} RETURN n"
+        cypher = f"MATCH (n {{`uri`: $uri}}) SET {set_parts} RETURN {NODE_PROJECTION}"
         params = {"uri": uri}
         params.update(param_map)
-        with self.driver.session() as session:
-            rec = session.run(cypher, **params).single()
-            if not rec:
-                return None
-            node = rec["n"]
-            p = dict(node.items()); p["id"] = int(node.id)
-            return self.collect_node(p)
+        _, rows = self.write_values(cypher, params)
+        return self.node_from_row(rows[0]) if rows else None
 
     def delete_node_by_uri(self, uri: str) -> bool:
         """
@@ -246,10 +267,9 @@ class Neo4jRepository:
         Возвращает True если был удалён хотя бы один узел.
         """
         cypher = "MATCH (n {`uri`: $uri}) DETACH DELETE n RETURN COUNT(n) as cnt"
-        with self.driver.session() as session:
-            rec = session.run(cypher, uri=uri).single()
-            cnt = rec["cnt"] if rec else 0
-            return int(cnt) > 0
+        _, rows = self.write_values(cypher, {"uri": uri})
+        cnt = rows[0][0] if rows else 0
+        return int(cnt) > 0
 
     # -----------------------
     # CRUD: дуги (арки)
@@ -264,43 +284,48 @@ class Neo4jRepository:
         cypher = f"""
         MATCH (a {{`uri`: $uri1}}), (b {{`uri`: $uri2}})
         CREATE (a)-[r:`{rel_type}` {props_part}]->(b)
-        RETURN r, a, b
-        """
-        with self.driver.session() as session:
-            rec = session.run(cypher, uri1=node1_uri, uri2=node2_uri).single()
-            if not rec:
-                return None
-            rel = rec["r"]
-            arc = self.collect_arc(rel)
-            # попытка извлечь node uri из узлов в ответе
-            a = rec.get("a"); b = rec.get("b")
-            if a and b:
-                arc["node_uri_from"] = a.get("uri") if hasattr(a, "get") else (a["uri"] if "uri" in a else None)
-                arc["node_uri_to"] = b.get("uri") if hasattr(b, "get") else (b["uri"] if "uri" in b else None)
-            return arc
+        RETURN {ARC_PROJECTION}
+        """
+        _, rows = self.write_values(cypher, {"uri1": node1_uri, "uri2": node2_uri})
+        return self.arc_from_row(rows[0]) if rows else None
 
     def delete_arc_by_id(self, arc_id: int) -> bool:
         """
         Удалить арку по внутреннему id relationship. Возвращает True если удалено.
         """
         cypher = "MATCH ()-[r]-() WHERE id(r) = $rid DELETE r RETURN COUNT(r) as cnt"
-        with self.driver.session() as session:
-            rec = session.run(cypher, rid=arc_id).single()
-            cnt = rec["cnt"] if rec else 0
-            return int(cnt) > 0
+        _, rows = self.write_values(cypher, {"rid": arc_id})
+        cnt = rows[0][0] if rows else 0
+        return int(cnt) > 0
 
     # -----------------------
     # Утилиты
     # -----------------------
-    def run_custom_query(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def rows_to_dicts(keys: List[str], rows: List[list]) -> List[Dict[str, Any]]:
         """
-        Выполнить произвольный Cypher query и вернуть список строк (каждая — dict)
+        Строки результата в dict; узлы и отношения верхнего уровня заменяются словарями их свойств.
+        Столбцы с графовыми объектами определяются один раз по данным, остальные копируются как есть.
         """
-        params = params or {}
-        with self.driver.session() as session:
-            res = session.run(query, **params)
-            out = []
-            for r in res:
-                # преобразуем Record в dict
-                out.append({k: (v if not hasattr(v, "items") else dict(v.items())) for k, v in dict(r).items()})
-            return out
+        entity_columns = [
+            i for i in range(len(keys))
+            if any(isinstance(row[i], Entity) for row in rows)
+        ]
+        if not entity_columns:
+            return [dict(zip(keys, row)) for row in rows]
+        out = []
+        for row in rows:
+            for i in entity_columns:
+                value = row[i]
+                if isinstance(value, Entity):
+                    row[i] = dict(value.items())
+            out.append(dict(zip(keys, row)))
+        return out
+
+    def run_custom_query(self, query: str, params: Dict[str, Any] = None, readonly: bool = False) -> List[Dict[str, Any]]:
+        """
+        Выполнить произвольный Cypher query и вернуть список строк (каждая — dict).
+        readonly=True — запрос только читает и может уйти на реплику; иначе выполняется как запись.
+        """
+        keys, rows = self.read_values(query, params) if readonly else self.write_values(query, params)
+        return self.rows_to_dicts(keys, rows)
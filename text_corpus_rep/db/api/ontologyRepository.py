@@ -1,11 +1,116 @@
 # ontologyRepository.py
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from .neo4jRepository import Neo4jRepository, TNode
+from .query_stats import query_stats
+
+# Метки узлов, из которых состоит онтология (первая метка узла — основная, по ней идёт MERGE при импорте)
+ONTOLOGY_LABELS = ["Class", "Object", "DatatypeProperty", "ObjectProperty"]
+# Размер пакета UNWIND при импорте снимка
+IMPORT_BATCH_SIZE = 5000
+# Метки и связи схемы онтологии (без объектов) — то, что держит в памяти OntologySchemaCache
+SCHEMA_LABELS = ["Class", "DatatypeProperty", "ObjectProperty"]
+SCHEMA_RELATIONS = ["SUBCLASS_OF", "DOMAIN", "RANGE"]
+
+# Операции пакетного изменения онтологии: имя -> (cypher, поля-ссылки на uri, меняет ли схему).
+# Каждый запрос создаёт/меняет узел и его связи целиком и возвращает n; пустой результат
+# (не найден связанный узел) откатывает весь пакет.
+BATCH_OPERATIONS = {
+    "create_class": ("""
+        CREATE (n:Class {uri: $uri, title: $title, description: $description})
+        WITH n
+        OPTIONAL MATCH (parent:Class {uri: $parent_uri})
+        WITH n, parent
+        WHERE $parent_uri IS NULL OR parent IS NOT NULL
+        FOREACH (p IN CASE WHEN parent IS NULL THEN [] ELSE [parent] END | CREATE (n)-[:SUBCLASS_OF]->(p))
+        RETURN n
+        """, ("parent_uri",), True),
+    "update_class": ("""
+        MATCH (n:Class {uri: $uri})
+        SET n.title = $title, n.description = $description
+        RETURN n
+        """, ("uri",), True),
+    "add_class_parent": ("""
+        MATCH (n:Class {uri: $target_uri}), (parent:Class {uri: $parent_uri})
+        CREATE (n)-[:SUBCLASS_OF]->(parent)
+        RETURN n
+        """, ("target_uri", "parent_uri"), True),
+    "add_class_attribute": ("""
+        MATCH (c:Class {uri: $class_uri})
+        CREATE (n:DatatypeProperty {uri: $uri, title: $attr_name})-[:DOMAIN]->(c)
+        RETURN n
+        """, ("class_uri",), True),
+    "add_class_object_attribute": ("""
+        MATCH (c:Class {uri: $class_uri}), (rc:Class {uri: $range_class_uri})
+        CREATE (n:ObjectProperty {uri: $uri, title: $attr_name})-[:DOMAIN]->(c)
+        CREATE (n)-[:RANGE]->(rc)
+        RETURN n
+        """, ("class_uri", "range_class_uri"), True),
+    "delete_class_attribute": ("""
+        MATCH (n:DatatypeProperty {uri: $uri})
+        WITH n, properties(n) AS props
+        DETACH DELETE n
+        RETURN props AS n
+        """, ("uri",), True),
+    "delete_class_object_attribute": ("""
+        MATCH (n:ObjectProperty {uri: $uri})
+        WITH n, properties(n) AS props
+        DETACH DELETE n
+        RETURN props AS n
+        """, ("uri",), True),
+    "create_object": ("""
+        MATCH (c:Class {uri: $class_uri})
+        CREATE (n:Object {uri: $uri, title: $title, description: $description, class_uri: $class_uri})-[:INSTANCE_OF]->(c)
+        RETURN n
+        """, ("class_uri",), False),
+    "update_object": ("""
+        MATCH (n:Object {uri: $uri})
+        SET n.title = $title, n.description = $description
+        RETURN n
+        """, ("uri",), False),
+    "delete_object": ("""
+        MATCH (n:Object {uri: $uri})
+        WITH n, properties(n) AS props
+        DETACH DELETE n
+        RETURN props AS n
+        """, ("uri",), False),
+}
+# Операции, создающие новый узел (для них генерируется uri, а временный id клиента связывается с ним)
+BATCH_CREATE_OPERATIONS = {"create_class", "add_class_attribute", "add_class_object_attribute", "create_object"}
+
 
 class OntologyRepository(Neo4jRepository):
     """
     Репозиторий для работы с онтологиями поверх графовой БД Neo4j
     """
+    # Запросы чтения, общие с AsyncOntologyRepository
+    ONTOLOGY_CYPHER = "MATCH (c:Class) OPTIONAL MATCH (c)-[r]->(x) RETURN c, r, x"
+    CLASS_CYPHER = "MATCH (c:Class {uri: $uri}) RETURN c"
+    CLASS_PARENTS_CYPHER = """
+        MATCH (c:Class {uri: $uri})-[:SUBCLASS_OF]->(parent:Class)
+        RETURN parent
+        """
+    CLASS_CHILDREN_CYPHER = """
+        MATCH (parent:Class {uri: $uri})<-[:SUBCLASS_OF]-(child:Class)
+        RETURN child
+        """
+    CLASS_OBJECTS_CYPHER = """
+        MATCH (o:Object {class_uri: $uri})
+        RETURN o
+        """
+    OBJECT_CYPHER = "MATCH (o:Object {uri: $uri}) RETURN o"
+    SIGNATURE_CYPHER = """
+        MATCH (c:Class {uri: $uri})
+        OPTIONAL MATCH (c)<-[:DOMAIN]-(dp:DatatypeProperty)
+        OPTIONAL MATCH (c)<-[:DOMAIN]-(op1:ObjectProperty)-[:RANGE]->(rc1:Class)
+        OPTIONAL MATCH (c)<-[:RANGE]-(op2:ObjectProperty)-[:DOMAIN]->(rc2:Class)
+
+        RETURN
+          collect(DISTINCT dp) AS datatype_props,
+          collect(DISTINCT {prop: op1, target: rc1, direction: 1}) AS obj_props_pos,
+          collect(DISTINCT {prop: op2, target: rc2, direction: -1}) AS obj_props_neg
+        """
+
     # -----------------------
     # Базовые методы
     # -----------------------
@@ -13,8 +118,7 @@ class OntologyRepository(Neo4jRepository):
         """
         Получить всю онтологию (все классы и их связи).
         """
-        cypher = "MATCH (c:Class) OPTIONAL MATCH (c)-[r]->(x) RETURN c, r, x"
-        return self.run_custom_query(cypher)
+        return self.run_custom_query(self.ONTOLOGY_CYPHER, readonly=True)
 
     def get_ontology_parent_classes(self) -> List[TNode]:
         """
@@ -25,45 +129,32 @@ class OntologyRepository(Neo4jRepository):
         WHERE NOT (c)-[:SUBCLASS_OF]->(:Class)
         RETURN c
         """
-        return self.run_custom_query(cypher)
+        return self.run_custom_query(cypher, readonly=True)
 
     def get_class(self, class_uri: str) -> Optional[TNode]:
         """
         Получить класс по uri.
         """
-        cypher = "MATCH (c:Class {uri: $uri}) RETURN c"
-        res = self.run_custom_query(cypher, {"uri": class_uri})
+        res = self.run_custom_query(self.CLASS_CYPHER, {"uri": class_uri}, readonly=True)
         return res[0]["c"] if res else None
 
     def get_class_parents(self, class_uri: str) -> List[TNode]:
         """
         Получить родителей класса.
         """
-        cypher = """
-        MATCH (c:Class {uri: $uri})-[:SUBCLASS_OF]->(parent:Class)
-        RETURN parent
-        """
-        return self.run_custom_query(cypher, {"uri": class_uri})
+        return self.run_custom_query(self.CLASS_PARENTS_CYPHER, {"uri": class_uri}, readonly=True)
 
     def get_class_children(self, class_uri: str) -> List[TNode]:
         """
         Получить потомков класса.
         """
-        cypher = """
-        MATCH (parent:Class {uri: $uri})<-[:SUBCLASS_OF]-(child:Class)
-        RETURN child
-        """
-        return self.run_custom_query(cypher, {"uri": class_uri})
+        return self.run_custom_query(self.CLASS_CHILDREN_CYPHER, {"uri": class_uri}, readonly=True)
 
     def get_class_objects(self, class_uri: str) -> List[TNode]:
         """
         Получить объекты данного класса.
         """
-        cypher = """
-        MATCH (o:Object {class_uri: $uri})
-        RETURN o
-        """
-        return self.run_custom_query(cypher, {"uri": class_uri})
+        return self.run_custom_query(self.CLASS_OBJECTS_CYPHER, {"uri": class_uri}, readonly=True)
 
     def update_class(self, class_uri: str, title: str, description: str) -> Optional[TNode]:
         """
@@ -75,6 +166,7 @@ class OntologyRepository(Neo4jRepository):
         RETURN c
         """
         res = self.run_custom_query(cypher, {"uri": class_uri, "title": title, "description": description})
+        self.bump_schema_version()
         return res[0]["c"] if res else None
 
     def create_class(self, title: str, description: str, parent_uri: Optional[str] = None) -> TNode:
@@ -84,22 +176,31 @@ class OntologyRepository(Neo4jRepository):
         new_class = self.create_node({"title": title, "description": description}, labels=["Class"])
         if parent_uri:
             self.create_arc(new_class["uri"], parent_uri, "SUBCLASS_OF")
+        self.bump_schema_version()
         return new_class
 
-    def delete_class(self, class_uri: str) -> bool:
+    def get_class_subtree_uris(self, class_uri: str) -> List[str]:
         """
-        Удаляет класс вместе со всеми потомками, их объектами и атрибутами.
+        Получить uri класса и всех его потомков.
         """
-        # 1. Находим все классы: целевой и его потомков
-        cypher_classes = """
+        cypher = """
         MATCH (c:Class {uri: $uri})
         OPTIONAL MATCH (c)<-[:SUBCLASS_OF*0..]-(descendant:Class)
-        WITH collect(DISTINCT c) + collect(DISTINCT descendant) AS classes_to_delete
-        UNWIND classes_to_delete AS cls
-        RETURN cls.uri AS uri
+        WITH collect(DISTINCT c) + collect(DISTINCT descendant) AS classes
+        UNWIND classes AS cls
+        RETURN DISTINCT cls.uri AS uri
         """
-        res = self.run_custom_query(cypher_classes, {"uri": class_uri})
-        classes_uris = [row["uri"] for row in res if row.get("uri")]
+        res = self.run_custom_query(cypher, {"uri": class_uri}, readonly=True)
+        return [row["uri"] for row in res if row.get("uri")]
+
+    def delete_class(self, class_uri: str, classes_uris: List[str] = None) -> bool:
+        """
+        Удаляет класс вместе со всеми потомками, их объектами и атрибутами.
+        classes_uris — uri класса и потомков, если вызывающий код уже получил их через get_class_subtree_uris.
+        """
+        # 1. Находим все классы: целевой и его потомков
+        if classes_uris is None:
+            classes_uris = self.get_class_subtree_uris(class_uri)
         if not classes_uris:
             return False
 
@@ -109,7 +210,7 @@ class OntologyRepository(Neo4jRepository):
         WHERE o.class_uri IN $classes
         RETURN collect(o.uri) AS objects_to_delete
         """
-        res_objects = self.run_custom_query(cypher_objects, {"classes": classes_uris})
+        res_objects = self.run_custom_query(cypher_objects, {"classes": classes_uris}, readonly=True)
         object_uris = res_objects[0].get("objects_to_delete", []) if res_objects else []
 
         # 3. Находим все DatatypeProperty и ObjectProperty этих классов
@@ -123,7 +224,7 @@ class OntologyRepository(Neo4jRepository):
         RETURN collect(p.uri) AS props_to_delete
         """
 
-        res_props = self.run_custom_query(cypher_props, {"classes": classes_uris})
+        res_props = self.run_custom_query(cypher_props, {"classes": classes_uris}, readonly=True)
         prop_uris = res_props[0].get("props_to_delete", []) if res_props else []
 
         # 4. Удаляем объекты
@@ -138,6 +239,7 @@ class OntologyRepository(Neo4jRepository):
         for c_uri in classes_uris:
             self.delete_node_by_uri(c_uri)
 
+        self.bump_schema_version()
         return True
 
     # -----------------------
@@ -149,6 +251,7 @@ class OntologyRepository(Neo4jRepository):
         """
         prop = self.create_node({"title": attr_name}, labels=["DatatypeProperty"])
         self.create_arc(prop["uri"], class_uri, "DOMAIN")
+        self.bump_schema_version()
         return prop
 
     def delete_class_attribute(self, prop_uri: str) -> bool:
@@ -161,6 +264,7 @@ class OntologyRepository(Neo4jRepository):
         RETURN COUNT(p) > 0 AS deleted
         """
         res = self.run_custom_query(cypher, {"uri": prop_uri})
+        self.bump_schema_version()
         return res[0]["deleted"] if res else False
 
     def add_class_object_attribute(self, class_uri: str, attr_name: str, range_class_uri: str) -> TNode:
@@ -172,6 +276,7 @@ class OntologyRepository(Neo4jRepository):
         self.create_arc(prop["uri"], class_uri, "DOMAIN")
         # задаём range (с какой классой связан)
         self.create_arc(prop["uri"], range_class_uri, "RANGE")
+        self.bump_schema_version()
         return prop
 
     def delete_class_object_attribute(self, object_property_uri: str) -> bool:
@@ -184,6 +289,7 @@ class OntologyRepository(Neo4jRepository):
         RETURN COUNT(p) > 0 AS deleted
         """
         res = self.run_custom_query(cypher, {"uri": object_property_uri})
+        self.bump_schema_version()
         return res[0]["deleted"] if res else False
 
     def add_class_parent(self, parent_uri: str, target_uri: str):
@@ -191,6 +297,7 @@ class OntologyRepository(Neo4jRepository):
         Присоединить родителя к существующему классу.
         """
         self.create_arc(target_uri, parent_uri, "SUBCLASS_OF")
+        self.bump_schema_version()
 
     # -----------------------
     # Объекты классов
@@ -199,10 +306,73 @@ class OntologyRepository(Neo4jRepository):
         """
         Получить объект класса.
         """
-        cypher = "MATCH (o:Object {uri: $uri}) RETURN o"
-        res = self.run_custom_query(cypher, {"uri": object_uri})
+        res = self.run_custom_query(self.OBJECT_CYPHER, {"uri": object_uri}, readonly=True)
         return res[0]["o"] if res else None
 
+    def get_objects(self, object_uris: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получить краткие данные нескольких объектов одним запросом: {uri: {title, class_uri}}.
+        """
+        cypher = """
+        MATCH (o:Object)
+        WHERE o.uri IN $uris
+        RETURN o.uri AS uri, o.title AS title, o.class_uri AS class_uri
+        """
+        res = self.run_custom_query(cypher, {"uris": list(set(object_uris))}, readonly=True)
+        return {row["uri"]: {"title": row["title"], "class_uri": row["class_uri"]} for row in res}
+
+    def get_nodes_by_uris(self, uris: List[str], labels: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Получить узлы онтологии по списку uri одним запросом.
+        Для каждой метки выполняется индексный поиск по uri (UNION подзапросов; индексы — ensure_indexes), поэтому
+        сотни uri разрешаются за один round trip. Возвращает
+        {nodes: [{uri, labels, node}] в порядке входного списка, missing: [uri, ...]}.
+        """
+        uris, cypher = self.nodes_by_uris_query(uris, labels)
+        rows = self.run_custom_query(cypher, {"uris": uris}, readonly=True) if cypher else []
+        return self.order_nodes(uris, rows)
+
+    @staticmethod
+    def nodes_by_uris_query(uris: List[str], labels: Optional[List[str]] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Уникальные uri (в исходном порядке) и запрос для их поиска (None, если искать нечего).
+        """
+        labels = [label for label in (labels or ONTOLOGY_LABELS) if label in ONTOLOGY_LABELS]
+        uris = list(dict.fromkeys(uri for uri in uris if uri))
+        if not uris or not labels:
+            return uris, None
+        branches = "\n            UNION\n".join(
+            f"            WITH uri MATCH (n:`{label}` {{uri: uri}}) RETURN n" for label in labels
+        )
+        cypher = f"""
+        UNWIND $uris AS uri
+        CALL {{
+{branches}
+        }}
+        RETURN uri, labels(n) AS labels, n
+        """
+        return uris, cypher
+
+    @staticmethod
+    def order_nodes(uris: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        found: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            found.setdefault(row["uri"], {"uri": row["uri"], "labels": row["labels"], "node": row["n"]})
+        return {
+            "nodes": [found[uri] for uri in uris if uri in found],
+            "missing": [uri for uri in uris if uri not in found],
+        }
+
+    def get_all_objects(self) -> List[Dict[str, Any]]:
+        """
+        Получить все объекты онтологии (uri, title, description, class_uri).
+        """
+        cypher = """
+        MATCH (o:Object)
+        RETURN o.uri AS uri, o.title AS title, o.description AS description, o.class_uri AS class_uri
+        """
+        return self.run_custom_query(cypher, readonly=True)
+
     def delete_object(self, object_uri: str) -> bool:
         """
         Удалить объект класса (только если это Object).
@@ -244,18 +414,14 @@ class OntologyRepository(Neo4jRepository):
           1  — класс <-[DOMAIN]- ObjectProperty
          -1  — ObjectProperty -[RANGE]-> класс
         """
-        cypher = """
-        MATCH (c:Class {uri: $uri})
-        OPTIONAL MATCH (c)<-[:DOMAIN]-(dp:DatatypeProperty)
-        OPTIONAL MATCH (c)<-[:DOMAIN]-(op1:ObjectProperty)-[:RANGE]->(rc1:Class)
-        OPTIONAL MATCH (c)<-[:RANGE]-(op2:ObjectProperty)-[:DOMAIN]->(rc2:Class)
+        res = self.run_custom_query(self.SIGNATURE_CYPHER, {"uri": class_uri}, readonly=True)
+        return self.build_signature(res)
 
-        RETURN
-          collect(DISTINCT dp) AS datatype_props,
-          collect(DISTINCT {prop: op1, target: rc1, direction: 1}) AS obj_props_pos,
-          collect(DISTINCT {prop: op2, target: rc2, direction: -1}) AS obj_props_neg
+    @staticmethod
+    def build_signature(res: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Сигнатура класса из результата SIGNATURE_CYPHER.
         """
-        res = self.run_custom_query(cypher, {"uri": class_uri})
         if not res:
             return {"params": [], "obj_params": []}
 
@@ -294,3 +460,237 @@ class OntologyRepository(Neo4jRepository):
             "obj_params": obj_params_pos + obj_params_neg
         }
 
+
+
+    # -----------------------
+    # Снимок онтологии (экспорт / импорт)
+    # -----------------------
+    def ensure_indexes(self):
+        """
+        Индексы по uri для всех меток онтологии — без них MERGE при импорте сканирует все узлы метки.
+        """
+        with self.session() as session:
+            for label in ONTOLOGY_LABELS:
+                session.run(f"CREATE INDEX `{label.lower()}_uri` IF NOT EXISTS FOR (n:`{label}`) ON (n.uri)").consume()
+
+    def iter_export_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Потоково отдаёт снимок онтологии: сначала все узлы, затем все дуги между ними.
+        Записи читаются из курсора по мере обработки, в память весь граф не загружается.
+        """
+        nodes_cypher = """
+        MATCH (n)
+        WHERE any(label IN labels(n) WHERE label IN $labels)
+        RETURN n.uri AS uri, labels(n) AS labels, properties(n) AS props
+        """
+        arcs_cypher = """
+        MATCH (a)-[r]->(b)
+        WHERE any(label IN labels(a) WHERE label IN $labels)
+          AND any(label IN labels(b) WHERE label IN $labels)
+        RETURN a.uri AS from, type(r) AS rel, b.uri AS to, properties(r) AS props
+        """
+        with self.session(readonly=True) as session:
+            # Record — кортеж, распаковка дешевле доступа по ключу; props уже приходят новым dict
+            started, rows = time.perf_counter(), 0
+            res = session.run(nodes_cypher, labels=ONTOLOGY_LABELS)
+            for uri, labels, props in res:
+                props.pop("uri", None)
+                # основная метка онтологии — первой
+                labels.sort(key=lambda l: l not in ONTOLOGY_LABELS)
+                rows += 1
+                yield {"type": "node", "uri": uri, "labels": labels, "props": props}
+            query_stats.record(nodes_cypher, None, (time.perf_counter() - started) * 1000, rows, res.consume())
+
+            started, rows = time.perf_counter(), 0
+            res = session.run(arcs_cypher, labels=ONTOLOGY_LABELS)
+            for uri_from, rel, uri_to, props in res:
+                rows += 1
+                yield {"type": "arc", "from": uri_from, "rel": rel, "to": uri_to, "props": props}
+            query_stats.record(arcs_cypher, None, (time.perf_counter() - started) * 1000, rows, res.consume())
+
+    @staticmethod
+    def _import_nodes_tx(tx, labels: Tuple[str, ...], rows: List[Dict[str, Any]]):
+        extra = "".join(f" SET n:`{label}`" for label in labels[1:])
+        cypher = f"""
+        UNWIND $rows AS row
+        MERGE (n:`{labels[0]}` {{uri: row.uri}})
+        SET n += row.props{extra}
+        """
+        Neo4jRepository.execute(tx, cypher, {"rows": rows})
+
+    @staticmethod
+    def _import_arcs_tx(tx, key: Tuple[Optional[str], str, Optional[str]], rows: List[Dict[str, Any]]):
+        from_label, rel, to_label = key
+        from_part = f":`{from_label}`" if from_label else ""
+        to_part = f":`{to_label}`" if to_label else ""
+        cypher = f"""
+        UNWIND $rows AS row
+        MATCH (a{from_part} {{uri: row.from}})
+        MATCH (b{to_part} {{uri: row.to}})
+        MERGE (a)-[r:`{rel}`]->(b)
+        SET r += row.props
+        """
+        Neo4jRepository.execute(tx, cypher, {"rows": rows})
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Импортирует снимок онтологии пакетами UNWIND (по транзакции на пакет).
+        Узлы сливаются по uri (MERGE), поэтому повторный импорт того же снимка ничего не дублирует.
+        Узлы группируются по набору меток, дуги — по (метка начала, тип, метка конца):
+        метки концов берутся из уже импортированных узлов, чтобы MATCH шёл по индексу.
+        """
+        self.ensure_indexes()
+        node_labels: Dict[str, str] = {}
+        node_batches: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        arc_batches: Dict[Tuple[Optional[str], str, Optional[str]], List[Dict[str, Any]]] = {}
+        stats = {"nodes": 0, "arcs": 0}
+
+        with self.session() as session:
+            def flush_nodes(labels):
+                batch = node_batches.pop(labels)
+                session.execute_write(self._import_nodes_tx, labels, batch)
+                stats["nodes"] += len(batch)
+
+            def flush_arcs(key):
+                batch = arc_batches.pop(key)
+                session.execute_write(self._import_arcs_tx, key, batch)
+                stats["arcs"] += len(batch)
+
+            for row in rows:
+                if row.get("type") == "node":
+                    labels = tuple(row.get("labels") or [])
+                    if not labels and row.get("uri") in node_labels:
+                        # дополнение свойств уже встреченного узла
+                        labels = (node_labels[row["uri"]],)
+                    if not labels or not row.get("uri"):
+                        continue
+                    node_labels[row["uri"]] = labels[0]
+                    batch = node_batches.setdefault(labels, [])
+                    batch.append({"uri": row["uri"], "props": row.get("props") or {}})
+                    if len(batch) >= batch_size:
+                        flush_nodes(labels)
+                elif row.get("type") == "arc":
+                    # дуга может ссылаться на узел из ещё не записанного пакета
+                    for labels in list(node_batches):
+                        flush_nodes(labels)
+                    key = (node_labels.get(row["from"]), row["rel"], node_labels.get(row["to"]))
+                    batch = arc_batches.setdefault(key, [])
+                    batch.append({"from": row["from"], "to": row["to"], "props": row.get("props") or {}})
+                    if len(batch) >= batch_size:
+                        flush_arcs(key)
+
+            for labels in list(node_batches):
+                flush_nodes(labels)
+            for key in list(arc_batches):
+                flush_arcs(key)
+        self.bump_schema_version()
+        return stats
+
+    # -----------------------
+    # Пакетные изменения
+    # -----------------------
+    def _apply_batch_tx(self, tx, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        ids: Dict[str, str] = {}
+        results = []
+        schema_changed = False
+        for index, op in enumerate(operations):
+            if not isinstance(op, dict):
+                raise ValueError(f"Operation {index}: expected an object")
+            name = op.get("op")
+            if name not in BATCH_OPERATIONS:
+                raise ValueError(f"Operation {index}: unknown op {name!r}. Expected one of {sorted(BATCH_OPERATIONS)}")
+            cypher, refs, changes_schema = BATCH_OPERATIONS[name]
+            params = {key: value for key, value in op.items() if key not in ("op", "id")}
+            # ссылки на узлы, созданные раньше в этом же пакете, задаются их временным id
+            for ref in refs:
+                value = params.get(ref)
+                if value is not None and not isinstance(value, str):
+                    raise ValueError(f"Operation {index} ({name}): {ref} must be a string")
+                params[ref] = ids.get(value, value)
+            if op.get("id") is not None and not isinstance(op["id"], str):
+                raise ValueError(f"Operation {index} ({name}): id must be a string")
+            if name in BATCH_CREATE_OPERATIONS:
+                params["uri"] = self.generate_random_string()
+            params.setdefault("title", None)
+            params.setdefault("description", None)
+            params.setdefault("parent_uri", None)
+
+            _, rows = self.execute(tx, cypher, params)
+            if not rows:
+                raise ValueError(f"Operation {index} ({name}): referenced node not found")
+            node = dict(rows[0][0].items())
+            if name in BATCH_CREATE_OPERATIONS and op.get("id"):
+                ids[op["id"]] = node["uri"]
+            results.append({"op": name, "id": op.get("id"), "node": node})
+            schema_changed = schema_changed or changes_schema
+
+        if schema_changed:
+            self.execute(tx, """
+            MERGE (v:OntologyVersion {name: 'schema'})
+            SET v.value = coalesce(v.value, 0) + 1
+            """)
+        return {"ids": ids, "results": results, "schema_changed": schema_changed}
+
+    def apply_batch(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Выполняет список операций в одной управляемой транзакции записи: либо применяются все, либо ни одна.
+        Операция — {op, id?, ...параметры}, где op — ключ BATCH_OPERATIONS, а id — временный id клиента
+        для создаваемого узла; следующие операции могут ссылаться на него вместо uri.
+        Возвращает {ids: {временный id: uri}, results: [{op, id, node}], schema_changed}.
+        Ошибка в любой операции (ValueError) откатывает весь пакет.
+        """
+        with self.session() as session:
+            return session.execute_write(self._apply_batch_tx, operations)
+
+    # -----------------------
+    # Версия схемы (для кеша схемы в памяти процессов)
+    # -----------------------
+    def get_schema_version(self) -> int:
+        """
+        Текущая версия схемы онтологии (0, если схема ещё не менялась).
+        """
+        cypher = "MATCH (v:OntologyVersion {name: 'schema'}) RETURN v.value AS version"
+        res = self.run_custom_query(cypher, readonly=True)
+        return res[0]["version"] if res else 0
+
+    def bump_schema_version(self) -> int:
+        """
+        Увеличивает версию схемы. Вызывается каждым методом, меняющим классы, свойства или их связи.
+        """
+        cypher = """
+        MERGE (v:OntologyVersion {name: 'schema'})
+        SET v.value = coalesce(v.value, 0) + 1
+        RETURN v.value AS version
+        """
+        res = self.run_custom_query(cypher)
+        return res[0]["version"]
+
+    def load_schema(self) -> Dict[str, Any]:
+        """
+        Загружает схему онтологии (классы, свойства и связи между ними) вместе с её версией:
+        {version, nodes: [{uri, labels, props}], arcs: [(from, type, to)]}
+        Всё читается в одной транзакции, поэтому версия соответствует загруженной схеме.
+        """
+        nodes_cypher = """
+        MATCH (n)
+        WHERE any(label IN labels(n) WHERE label IN $labels)
+        RETURN n.uri AS uri, labels(n) AS labels, properties(n) AS props
+        """
+        arcs_cypher = """
+        MATCH (a)-[r]->(b)
+        WHERE type(r) IN $relations
+          AND any(label IN labels(a) WHERE label IN $labels)
+          AND any(label IN labels(b) WHERE label IN $labels)
+        RETURN a.uri AS from, type(r) AS rel, b.uri AS to
+        """
+        def load(tx):
+            _, version = self.execute(tx, "MATCH (v:OntologyVersion {name: 'schema'}) RETURN v.value AS version")
+            _, node_rows = self.execute(tx, nodes_cypher, {"labels": SCHEMA_LABELS})
+            _, arc_rows = self.execute(tx, arcs_cypher, {"labels": SCHEMA_LABELS, "relations": SCHEMA_RELATIONS})
+            nodes = [{"uri": uri, "labels": labels, "props": props} for uri, labels, props in node_rows]
+            arcs = [tuple(row) for row in arc_rows]
+            return (version[0][0] if version else 0), nodes, arcs
+
+        with self.session(readonly=True) as session:
+            version, nodes, arcs = session.execute_read(load)
+        return {"version": version, "nodes": nodes, "arcs": arcs}
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from db.api.ontologyRepository import OntologyRepository
+from core.settings import DB_URI, DB_USER, DB_PASSWORD, ONTOLOGY_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class OntologySchema:
+    """
+    Неизменяемый снимок схемы онтологии в памяти: классы, иерархия и свойства.
+    Ответы повторяют формат соответствующих методов OntologyRepository.
+    """
+    def __init__(self, version: int, nodes: List[Dict[str, Any]], arcs: List[tuple]):
+        self.version = version
+        self.classes: Dict[str, Dict[str, Any]] = {}
+        self.properties: Dict[str, Dict[str, Any]] = {}
+        self.datatype_properties = set()
+        self.object_properties = set()
+        for node in nodes:
+            props = node["props"]
+            if "Class" in node["labels"]:
+                self.classes[node["uri"]] = props
+            if "DatatypeProperty" in node["labels"]:
+                self.properties[node["uri"]] = props
+                self.datatype_properties.add(node["uri"])
+            if "ObjectProperty" in node["labels"]:
+                self.properties[node["uri"]] = props
+                self.object_properties.add(node["uri"])
+
+        self.parents: Dict[str, List[str]] = {}
+        self.children: Dict[str, List[str]] = {}
+        # свойство -> классы DOMAIN / RANGE и обратные индексы класс -> свойства
+        self.domains: Dict[str, List[str]] = {}
+        self.ranges: Dict[str, List[str]] = {}
+        self.domain_of: Dict[str, List[str]] = {}
+        self.range_of: Dict[str, List[str]] = {}
+        for start, rel, end in arcs:
+            if rel == "SUBCLASS_OF" and start in self.classes and end in self.classes:
+                self.parents.setdefault(start, []).append(end)
+                self.children.setdefault(end, []).append(start)
+            elif rel == "DOMAIN" and start in self.properties and end in self.classes:
+                self.domains.setdefault(start, []).append(end)
+                self.domain_of.setdefault(end, []).append(start)
+            elif rel == "RANGE" and start in self.properties and end in self.classes:
+                self.ranges.setdefault(start, []).append(end)
+                self.range_of.setdefault(end, []).append(start)
+
+    def get_class(self, class_uri: str) -> Optional[Dict[str, Any]]:
+        return self.classes.get(class_uri)
+
+    def get_class_parents(self, class_uri: str) -> List[Dict[str, Any]]:
+        return [{"parent": self.classes[uri]} for uri in dict.fromkeys(self.parents.get(class_uri, []))]
+
+    def get_class_children(self, class_uri: str) -> List[Dict[str, Any]]:
+        return [{"child": self.classes[uri]} for uri in dict.fromkeys(self.children.get(class_uri, []))]
+
+    def collect_signature(self, class_uri: str) -> Dict[str, Any]:
+        if class_uri not in self.classes:
+            return {"params": [], "obj_params": []}
+        params = [
+            {"title": self.properties[uri].get("title"), "uri": uri}
+            for uri in dict.fromkeys(self.domain_of.get(class_uri, []))
+            if uri in self.datatype_properties
+        ]
+        obj_params = []
+        for uri in dict.fromkeys(self.domain_of.get(class_uri, [])):
+            if uri in self.object_properties:
+                for target in dict.fromkeys(self.ranges.get(uri, [])):
+                    obj_params.append(self._obj_param(uri, target, 1))
+        for uri in dict.fromkeys(self.range_of.get(class_uri, [])):
+            if uri in self.object_properties:
+                for target in dict.fromkeys(self.domains.get(uri, [])):
+                    obj_params.append(self._obj_param(uri, target, -1))
+        return {"params": params, "obj_params": obj_params}
+
+    def _obj_param(self, prop_uri: str, target_uri: str, direction: int) -> Dict[str, Any]:
+        return {
+            "title": self.properties[prop_uri].get("title"),
+            "uri": prop_uri,
+            "target_class_uri": target_uri,
+            "relation_direction": direction,
+        }
+
+
+class OntologySchemaCache:
+    """
+    Реплика схемы онтологии в памяти процесса для горячих эндпоинтов чтения.
+    Версия схемы (узел OntologyVersion) сверяется с Neo4j не чаще раза в ONTOLOGY_CACHE_TTL секунд;
+    при расхождении схема перечитывается целиком. Записи в этом процессе сбрасывают кеш сразу (invalidate).
+    """
+    def __init__(self, ttl: float = ONTOLOGY_CACHE_TTL):
+        self.ttl = ttl
+        self._schema: Optional[OntologySchema] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._repo: Optional[OntologyRepository] = None
+
+    def _repository(self) -> OntologyRepository:
+        if self._repo is None:
+            self._repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+        return self._repo
+
+    def get(self) -> OntologySchema:
+        """
+        Актуальная схема; Neo4j затрагивается только при проверке версии или перезагрузке.
+        """
+        schema = self._schema
+        if schema is not None and time.monotonic() - self._checked_at < self.ttl:
+            return schema
+        with self._lock:
+            if self._schema is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._schema
+            repo = self._repository()
+            if self._schema is None or repo.get_schema_version() != self._schema.version:
+                data = repo.load_schema()
+                self._schema = OntologySchema(data["version"], data["nodes"], data["arcs"])
+            self._checked_at = time.monotonic()
+            return self._schema
+
+    def invalidate(self):
+        with self._lock:
+            self._schema = None
+
+    def warm_up(self):
+        try:
+            self.get()
+        except Exception as e:
+            # Схема загрузится при первом запросе
+            logger.warning("Ontology schema cache warm-up failed: %s", e)
+
+    # -----------------------
+    # Горячие чтения
+    # -----------------------
+    def get_class(self, class_uri: str) -> Optional[Dict[str, Any]]:
+        return self.get().get_class(class_uri)
+
+    def get_class_parents(self, class_uri: str) -> List[Dict[str, Any]]:
+        return self.get().get_class_parents(class_uri)
+
+    def get_class_children(self, class_uri: str) -> List[Dict[str, Any]]:
+        return self.get().get_class_children(class_uri)
+
+    def collect_signature(self, class_uri: str) -> Dict[str, Any]:
+        return self.get().collect_signature(class_uri)
+
+
+schema_cache = OntologySchemaCache()
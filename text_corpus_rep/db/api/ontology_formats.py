@@ -0,0 +1,226 @@
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from db.onthology_namespace import (
+    CLASS,
+    OBJECT,
+    SUB_CLASS,
+    PROPERTY_DOMAIN,
+    PROPERTY_RANGE,
+    PROPERTY_LABEL,
+    PROPERTY_LABEL_OBJECT,
+    PROPERTY_URI_NAMESPACE,
+    NOTE,
+    TITLE,
+    RESOURCE_NAMESPACE,
+    RDF_TYPE,
+)
+
+# Сериализация снимка онтологии. Снимок — поток строк двух видов:
+#   {"type": "node", "uri": ..., "labels": [...], "props": {...}}
+#   {"type": "arc", "from": uri, "rel": TYPE, "to": uri, "props": {...}}
+# Сначала идут все узлы, затем все дуги — так импорт всегда находит концы дуг.
+
+EXPORT_FORMATS = ("jsonl", "ntriples", "turtle")
+IMPORT_FORMATS = ("jsonl", "ntriples")
+
+LABEL_TYPES = {
+    "Class": CLASS,
+    "Object": OBJECT,
+    "DatatypeProperty": PROPERTY_LABEL,
+    "ObjectProperty": PROPERTY_LABEL_OBJECT,
+}
+REL_PREDICATES = {
+    "SUBCLASS_OF": SUB_CLASS,
+    "DOMAIN": PROPERTY_DOMAIN,
+    "RANGE": PROPERTY_RANGE,
+    "INSTANCE_OF": RDF_TYPE,
+}
+PROP_PREDICATES = {
+    "title": TITLE,
+    "description": NOTE,
+}
+TYPE_LABELS = {v: k for k, v in LABEL_TYPES.items()}
+PREDICATE_RELS = {v: k for k, v in REL_PREDICATES.items()}
+PREDICATE_PROPS = {v: k for k, v in PROP_PREDICATES.items()}
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+TURTLE_PREFIXES = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "xsd": XSD,
+    "crm": RESOURCE_NAMESPACE + "/",
+    "prop": PROPERTY_URI_NAMESPACE,
+}
+
+NTRIPLE_RE = re.compile(
+    r'^\s*<([^>]*)>\s+<([^>]*)>\s+'
+    r'(?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:\^\^<([^>]*)>|@[\w-]+)?)\s*\.\s*$'
+)
+ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+UNESCAPE_RE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+UNESCAPES = {"n": "\n", "r": "\r", "t": "\t", '"': '"', "\\": "\\", "'": "'", "b": "\b", "f": "\f"}
+
+
+# -----------------------
+# IRI и литералы
+# -----------------------
+def node_iri(uri: str) -> str:
+    return uri if "://" in uri else f"{RESOURCE_NAMESPACE}/{uri}"
+
+
+def iri_node(iri: str) -> str:
+    prefix = RESOURCE_NAMESPACE + "/"
+    return iri[len(prefix):] if iri.startswith(prefix) else iri
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return f'"{str(value).lower()}"^^<{XSD}boolean>'
+    if isinstance(value, int):
+        return f'"{value}"^^<{XSD}integer>'
+    if isinstance(value, float):
+        return f'"{value!r}"^^<{XSD}double>'
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + "".join(ESCAPES.get(ch, ch) for ch in value) + '"'
+
+
+def _parse_literal(raw: str, datatype: Optional[str]) -> Any:
+    value = UNESCAPE_RE.sub(
+        lambda m: chr(int(m.group(1)[1:], 16)) if m.group(1)[0] in "uU" and len(m.group(1)) > 1
+        else UNESCAPES.get(m.group(1), m.group(1)),
+        raw,
+    )
+    if datatype == XSD + "integer":
+        return int(value)
+    if datatype == XSD + "double":
+        return float(value)
+    if datatype == XSD + "boolean":
+        return value == "true"
+    return value
+
+
+def _prop_predicate(key: str) -> str:
+    return PROP_PREDICATES.get(key) or PROPERTY_URI_NAMESPACE + key
+
+
+def _rel_predicate(rel: str) -> str:
+    return REL_PREDICATES.get(rel) or PROPERTY_URI_NAMESPACE + rel
+
+
+# -----------------------
+# Экспорт
+# -----------------------
+def _row_triples(row: Dict[str, Any]) -> Iterator[tuple]:
+    """
+    Тройки (subject, predicate, object) строки снимка; object — готовый IRI в <> или литерал.
+    """
+    if row["type"] == "node":
+        subject = node_iri(row["uri"])
+        for label in row["labels"]:
+            if label in LABEL_TYPES:
+                yield subject, RDF_TYPE, f"<{LABEL_TYPES[label]}>"
+        for key, value in row["props"].items():
+            if value is not None:
+                yield subject, _prop_predicate(key), _literal(value)
+    else:
+        yield node_iri(row["from"]), _rel_predicate(row["rel"]), f"<{node_iri(row['to'])}>"
+
+
+def _turtle_term(iri: str) -> str:
+    for prefix, namespace in TURTLE_PREFIXES.items():
+        if iri.startswith(namespace) and re.fullmatch(r'[\w-]+', iri[len(namespace):]):
+            return f"{prefix}:{iri[len(namespace):]}"
+    return f"<{iri}>"
+
+
+def serialize(rows: Iterable[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    """
+    Потоково сериализует строки снимка в jsonl, ntriples или turtle (по строке за раз).
+    """
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+    elif fmt == "ntriples":
+        for row in rows:
+            for s, p, o in _row_triples(row):
+                yield f"<{s}> <{p}> {o} .\n"
+    elif fmt == "turtle":
+        for prefix, namespace in TURTLE_PREFIXES.items():
+            yield f"@prefix {prefix}: <{namespace}> .\n"
+        yield "\n"
+        for row in rows:
+            triples = list(_row_triples(row))
+            if not triples:
+                continue
+            subject = _turtle_term(triples[0][0])
+            predicates = [
+                f"{'a' if p == RDF_TYPE else _turtle_term(p)} "
+                f"{_turtle_term(o[1:-1]) if o.startswith('<') else o}"
+                for _, p, o in triples
+            ]
+            yield f"{subject} " + " ;\n    ".join(predicates) + " .\n"
+    else:
+        raise ValueError(f"Unknown export format: {fmt}. Expected one of {EXPORT_FORMATS}")
+
+
+# -----------------------
+# Импорт
+# -----------------------
+def _parse_ntriples(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Собирает строки снимка из N-Triples. Тройки одного субъекта-узла ожидаются подряд
+    (так пишет экспорт); повторная встреча узла даёт ещё одну строку, которая при импорте
+    дополняет его свойства.
+    """
+    current: Optional[Dict[str, Any]] = None
+    for number, line in enumerate(lines, start=1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        m = NTRIPLE_RE.match(line)
+        if not m:
+            raise ValueError(f"Invalid N-Triples line {number}: {line.strip()[:200]}")
+        subject, predicate, obj_iri, literal, datatype = m.groups()
+        uri = iri_node(subject)
+
+        if obj_iri is not None and not (predicate == RDF_TYPE and obj_iri in TYPE_LABELS):
+            rel = PREDICATE_RELS.get(predicate)
+            if rel is None:
+                rel = predicate[len(PROPERTY_URI_NAMESPACE):] if predicate.startswith(PROPERTY_URI_NAMESPACE) else predicate
+            # узел, к которому относится дуга, отдаётся раньше неё
+            if current is not None:
+                yield current
+                current = None
+            yield {"type": "arc", "from": uri, "rel": rel, "to": iri_node(obj_iri), "props": {}}
+            continue
+
+        if current is None or current["uri"] != uri:
+            if current is not None:
+                yield current
+            current = {"type": "node", "uri": uri, "labels": [], "props": {}}
+        if obj_iri is not None:
+            current["labels"].append(TYPE_LABELS[obj_iri])
+        else:
+            key = PREDICATE_PROPS.get(predicate)
+            if key is None:
+                key = predicate[len(PROPERTY_URI_NAMESPACE):] if predicate.startswith(PROPERTY_URI_NAMESPACE) else predicate
+            current["props"][key] = _parse_literal(literal, datatype)
+    if current is not None:
+        yield current
+
+
+def parse(lines: Iterable[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """
+    Потоково читает снимок онтологии в формате jsonl или ntriples.
+    """
+    if fmt == "jsonl":
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "ntriples":
+        yield from _parse_ntriples(lines)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}. Expected one of {IMPORT_FORMATS}")
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Сжатые списки позиций позиционного индекса (WordPosting) и смещений слов текста (TextProfile.offsets):
+# возрастающие последовательности хранятся разностями соседних значений, разности — varint
+# (7 бит на байт, старший бит — «дальше есть байты»). Кодирование и декодирование векторные.
+
+
+def encode_varints(values) -> bytes:
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b""
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        mask = lengths > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(blob: bytes) -> np.ndarray:
+    data = np.frombuffer(bytes(blob), dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.int64)
+    last = data < 0x80
+    group = np.concatenate(([0], np.cumsum(last)[:-1]))
+    group_start = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    shift = (np.arange(len(data)) - group_start[group]) * 7
+    parts = (data & 0x7F).astype(np.int64) << shift
+    return np.bincount(group, weights=parts).astype(np.int64)
+
+
+def encode_positions(positions) -> bytes:
+    """
+    Возрастающие номера слов -> varint разностей.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    return encode_varints(np.diff(positions, prepend=0))
+
+
+def decode_positions(blob: bytes) -> np.ndarray:
+    return np.cumsum(decode_varints(blob))
+
+
+def encode_offsets(starts, ends) -> bytes:
+    """
+    Символьные границы слов текста: пары (отступ от конца предыдущего слова, длина слова).
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    gaps = starts - np.concatenate(([0], ends[:-1]))
+    return encode_varints(np.column_stack((gaps, ends - starts)).reshape(-1))
+
+
+def decode_offsets(blob: bytes):
+    """
+    -> (starts, ends) массивы символьных смещений слов.
+    """
+    pairs = decode_varints(blob).reshape(-1, 2)
+    ends = np.cumsum(pairs[:, 0] + pairs[:, 1])
+    return ends - pairs[:, 1], ends
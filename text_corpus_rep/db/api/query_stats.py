@@ -0,0 +1,157 @@
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from core.settings import NEO4J_SLOW_QUERY_MS, NEO4J_QUERY_PROFILE
+from db.api.request_metrics import current_endpoint, observe_stage
+
+# Статистика запросов к Neo4j: каждый запрос репозиториев учитывается по паре
+# (эндпоинт, шаблон запроса). Эндпоинт текущего HTTP-запроса выставляет QueryStatsMiddleware.
+
+logger = logging.getLogger("db.neo4j.slow")
+
+PROFILE_MODES = ("profile", "explain")
+# Сколько последних медленных запросов хранить для эндпоинта метрик
+SLOW_LOG_SIZE = 100
+
+STRING_LITERAL_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+NUMBER_LITERAL_RE = re.compile(r'(?<![\w$`])-?\d+(?:\.\d+)?\b')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """
+    Шаблон запроса: литералы (например, свойства, встроенные create_node) заменяются на ?, пробелы схлопываются.
+    """
+    query = STRING_LITERAL_RE.sub("?", query)
+    query = NUMBER_LITERAL_RE.sub("?", query)
+    return WHITESPACE_RE.sub(" ", query).strip()
+
+
+def params_size(params: Optional[Dict[str, Any]]) -> int:
+    if not params:
+        return 0
+    return len(json.dumps(params, ensure_ascii=False, default=str))
+
+
+def count_db_hits(plan: Optional[Dict[str, Any]]) -> Optional[int]:
+    """
+    Сумма dbHits по дереву профиля (PROFILE); None, если профиля нет.
+    """
+    if not plan:
+        return None
+    hits = plan.get("dbHits") or plan.get("args", {}).get("DbHits") or 0
+    return int(hits) + sum(count_db_hits(child) or 0 for child in plan.get("children", []))
+
+
+def profile_query(query: str) -> str:
+    return f"PROFILE {query}" if NEO4J_QUERY_PROFILE == "profile" else query
+
+
+def wants_plan(elapsed_ms: float) -> bool:
+    """
+    В режиме explain план медленного запроса дополнительно запрашивается через EXPLAIN (без выполнения).
+    """
+    return NEO4J_QUERY_PROFILE == "explain" and elapsed_ms >= NEO4J_SLOW_QUERY_MS
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "server_ms": 0.0, "rows": 0, "params_bytes": 0,
+            "db_hits": 0, "profiled": 0, "slow": 0}
+
+
+class QueryStats:
+    """
+    Агрегаты по (эндпоинт, шаблон запроса) и журнал медленных запросов; общие для процесса.
+    """
+    def __init__(self, slow_ms: float = NEO4J_SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+        self._slow: List[Dict[str, Any]] = []
+
+    def record(self, query: str, params: Optional[Dict[str, Any]], elapsed_ms: float, rows: int,
+               summary=None, plan: Optional[Dict[str, Any]] = None):
+        endpoint = current_endpoint.get()
+        template = normalize_query(query)
+        size = params_size(params)
+        server_ms = None
+        db_hits = None
+        if summary is not None:
+            available = getattr(summary, "result_available_after", None)
+            consumed = getattr(summary, "result_consumed_after", None)
+            if available is not None:
+                server_ms = available + (consumed or 0)
+            db_hits = count_db_hits(getattr(summary, "profile", None))
+            plan = plan or getattr(summary, "profile", None) or getattr(summary, "plan", None)
+        slow = elapsed_ms >= self.slow_ms
+        observe_stage("neo4j", elapsed_ms / 1000)
+
+        with self._lock:
+            entry = self._stats.get((endpoint, template))
+            if entry is None:
+                entry = self._stats[(endpoint, template)] = _new_entry()
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["server_ms"] += server_ms or 0.0
+            entry["rows"] += rows
+            entry["params_bytes"] += size
+            if db_hits is not None:
+                entry["db_hits"] += db_hits
+                entry["profiled"] += 1
+            if slow:
+                entry["slow"] += 1
+                self._slow.append({
+                    "endpoint": endpoint,
+                    "query": template,
+                    "elapsed_ms": round(elapsed_ms, 3),
+                    "server_ms": server_ms,
+                    "rows": rows,
+                    "params_bytes": size,
+                    "db_hits": db_hits,
+                    "plan": plan,
+                })
+                del self._slow[:-SLOW_LOG_SIZE]
+
+        if slow:
+            logger.warning(
+                "Slow Neo4j query (%.1f ms, %d rows, db hits %s) at %s: %s",
+                elapsed_ms, rows, db_hits if db_hits is not None else "n/a", endpoint, template,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Агрегаты по эндпоинтам (с разбивкой по шаблонам, самые затратные первыми) и журнал медленных запросов.
+        """
+        with self._lock:
+            items = [(key, dict(entry)) for key, entry in self._stats.items()]
+            slow = list(self._slow)
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for (endpoint, template), entry in items:
+            summary = endpoints.setdefault(endpoint, {"endpoint": endpoint, "queries": [], **_new_entry()})
+            for key in ("count", "total_ms", "server_ms", "rows", "params_bytes", "db_hits", "profiled", "slow"):
+                summary[key] += entry[key]
+            summary["max_ms"] = max(summary["max_ms"], entry["max_ms"])
+            entry["query"] = template
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            summary["queries"].append(entry)
+        for summary in endpoints.values():
+            summary["avg_ms"] = round(summary["total_ms"] / summary["count"], 3)
+            summary["queries"].sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return {
+            "profile_mode": NEO4J_QUERY_PROFILE,
+            "slow_query_ms": self.slow_ms,
+            "endpoints": sorted(endpoints.values(), key=lambda summary: summary["total_ms"], reverse=True),
+            "slow_queries": slow,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+
+query_stats = QueryStats()
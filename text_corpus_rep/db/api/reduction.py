@@ -0,0 +1,153 @@
+import os
+import random
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from db.models import EmbeddingReduction, EmbeddingVersion, TextEmbedding
+from db.api.embedding_utils import normalize_rows
+from core.settings import EMBEDDING_REDUCTION_DIR, REDUCTION_OVERSAMPLE
+
+# Понижение размерности векторов версии эмбеддингов (команда reduce_embeddings):
+#  1. fit — PCA по выборке полных векторов корпуса (или усечение для Matryoshka-моделей), артефакт в EMBEDDING_REDUCTION_DIR;
+#  2. recall_report — recall@k поиска по пониженным векторам (и с переранжированием полными) относительно полного поиска;
+#  3. activate — пониженные векторы записываются в TextEmbedding.reduced (apply), после чего поиск версии
+#     идёт по ним, а кандидаты переранжируются полными. В TextEmbedding хранятся векторы только активного понижения.
+
+REDUCTION_METHODS = ("pca", "truncate")
+RECALL_K = (1, 10, 50)
+WRITE_BATCH_SIZE = 1000
+
+
+def load_vectors(version: EmbeddingVersion, sample: int = None, seed: int = 0) -> Tuple[List[int], np.ndarray]:
+    """
+    Полные векторы версии (или случайная выборка из sample текстов): (id текстов, матрица).
+    """
+    rows = TextEmbedding.objects.filter(version=version)
+    if sample:
+        ids = list(rows.values_list("text_id", flat=True))
+        if len(ids) > sample:
+            rows = rows.filter(text_id__in=random.Random(seed).sample(ids, sample))
+    pairs = list(rows.order_by("text_id").values_list("text_id", "embedding"))
+    return [text_id for text_id, _ in pairs], np.asarray([embedding for _, embedding in pairs], dtype=np.float32)
+
+
+def fit_pca(matrix: np.ndarray, dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Главные компоненты нормализованных векторов: (mean, components[dimension x D]).
+    """
+    matrix = normalize_rows(matrix)
+    mean = matrix.mean(axis=0)
+    _, _, vt = np.linalg.svd(matrix - mean, full_matrices=False)
+    return mean.astype(np.float32), vt[:dimension].astype(np.float32)
+
+
+def fit_reduction(version: EmbeddingVersion, method: str, dimension: int, sample: int = 20000) -> EmbeddingReduction:
+    if method not in REDUCTION_METHODS:
+        raise ValueError(f"Unknown reduction method: {method}. Expected one of {REDUCTION_METHODS}")
+    if version.dimension is not None and dimension >= version.dimension:
+        raise ValueError(f"Reduced dimension {dimension} must be less than {version.dimension}")
+
+    reduction = EmbeddingReduction(version=version, method=method, dimension=dimension)
+    if method == "pca":
+        _, matrix = load_vectors(version, sample)
+        if len(matrix) < dimension:
+            raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} vectors, got {len(matrix)}")
+        mean, components = fit_pca(matrix, dimension)
+        reduction.save()
+        os.makedirs(EMBEDDING_REDUCTION_DIR, exist_ok=True)
+        reduction.artifact = os.path.join(EMBEDDING_REDUCTION_DIR, f"{version.name}-pca{dimension}-{reduction.id}.npz")
+        np.savez(reduction.artifact, mean=mean, components=components)
+    reduction.save()
+    return reduction
+
+
+def apply_reduction(reduction: EmbeddingReduction) -> int:
+    """
+    Записывает пониженные векторы всех текстов версии.
+    """
+    updated = 0
+    rows = TextEmbedding.objects.filter(version=reduction.version).only("id", "embedding").order_by("id")
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:WRITE_BATCH_SIZE])
+        if not batch:
+            break
+        reduced = reduction.pack([row.embedding for row in batch])
+        for row, vector in zip(batch, reduced):
+            row.reduced = vector
+            row.reduction = reduction
+        TextEmbedding.objects.bulk_update(batch, ["reduced", "reduction"])
+        updated += len(batch)
+        last_id = batch[-1].id
+    return updated
+
+
+def recall_report(reduction: EmbeddingReduction, queries: int = 200, k: Sequence[int] = RECALL_K,
+                  oversample: int = REDUCTION_OVERSAMPLE, seed: int = 0) -> Dict[str, Any]:
+    """
+    Тексты корпуса используются как запросы (сам текст исключается из выдачи).
+    recall@k — доля точного top-k (полные векторы), найденная в top-k по пониженным векторам;
+    rerank_recall@k — то же, если top-(k * oversample) по пониженным переранжирован полными векторами.
+    """
+    ids, full = load_vectors(reduction.version)
+    if len(ids) < 2:
+        return {"texts": len(ids), "queries": 0}
+    full = normalize_rows(full)
+    reduced = reduction.project(full)
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(ids), size=min(queries, len(ids)), replace=False)
+
+    hits = {f"recall@{n}": 0.0 for n in k}
+    hits.update({f"rerank_recall@{n}": 0.0 for n in k})
+    for row in query_rows:
+        exact_scores = full @ full[row]
+        approx_scores = reduced @ reduced[row]
+        exact_scores[row] = approx_scores[row] = -np.inf
+        exact = np.argsort(-exact_scores)
+        approx = np.argsort(-approx_scores)
+        for n in k:
+            # в маленьком корпусе k не больше числа остальных текстов
+            top = min(n, len(ids) - 1)
+            truth = set(exact[:top].tolist())
+            hits[f"recall@{n}"] += len(truth & set(approx[:top].tolist())) / top
+            candidates = approx[:top * oversample]
+            reranked = candidates[np.argsort(-exact_scores[candidates])][:top]
+            hits[f"rerank_recall@{n}"] += len(truth & set(reranked.tolist())) / top
+
+    report = {key: round(value / len(query_rows), 4) for key, value in hits.items()}
+    report.update({
+        "texts": len(ids),
+        "queries": len(query_rows),
+        "oversample": oversample,
+        "full_dimension": int(full.shape[1]),
+        "dimension": reduction.dimension,
+        "bytes_per_vector": {"full": int(full.shape[1]) * 4, "reduced": reduction.dimension * 4},
+    })
+    if reduction.method == "pca":
+        # доля дисперсии, сохранённая проекцией (на всех векторах корпуса)
+        with np.load(reduction.artifact) as artifact:
+            mean, components = artifact["mean"], artifact["components"]
+        centered = full - mean
+        total = float((centered ** 2).sum())
+        report["explained_variance"] = round(float(((centered @ components.T) ** 2).sum()) / total, 4) if total else None
+    reduction.report = report
+    reduction.save(update_fields=["report"])
+    return report
+
+
+def activate_reduction(reduction: EmbeddingReduction):
+    """
+    Включает понижение для поиска версии. Тексты без пониженного вектора сначала досчитываются.
+    """
+    if TextEmbedding.objects.filter(version=reduction.version).exclude(reduction=reduction).exists():
+        apply_reduction(reduction)
+    with transaction.atomic():
+        EmbeddingReduction.objects.filter(version=reduction.version, active=True).update(active=False)
+        reduction.active = True
+        reduction.save(update_fields=["active"])
+
+
+def deactivate_reductions(version: EmbeddingVersion):
+    EmbeddingReduction.objects.filter(version=version, active=True).update(active=False)
@@ -0,0 +1,104 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from django.db import transaction
+
+from db.models import EmbeddingVersion, Text, TextChunk, TextEmbedding
+from db.api.embedding_utils import get_embeddings
+from db.api.embedding_versions import missing_texts
+
+# Пакетный пересчёт эмбеддингов текстов в версии (команда reembed) — после смены модели или размера чанков.
+# Тексты читаются пачками по id, чанки всей пачки кодируются одним вызовом модели,
+# векторы записываются bulk_update / bulk_create. Прогресс (последний обработанный id) пишется в checkpoint.
+
+
+def text_queryset(corpus_ids: Optional[List[int]] = None, after_id: int = 0, missing_for: EmbeddingVersion = None):
+    """
+    Тексты для пересчёта по возрастанию id; missing_for — только тексты без вектора в этой версии.
+    """
+    texts = missing_texts(missing_for) if missing_for is not None else Text.objects.all()
+    texts = texts.filter(id__gt=after_id).order_by("id")
+    if corpus_ids:
+        texts = texts.filter(corpus_id__in=corpus_ids)
+    return texts
+
+
+def iter_text_batches(texts, batch_size: int) -> Iterator[List[Text]]:
+    """
+    Пачки текстов; в памяти одновременно не больше batch_size объектов (iterator без кеша queryset).
+    """
+    batch = []
+    for text in texts.only("id", "text").iterator(chunk_size=batch_size):
+        batch.append(text)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reembed_batch(texts: List[Text], version: EmbeddingVersion, encode_batch_size: int = 128) -> Dict[str, int]:
+    """
+    Пересчитывает эмбеддинги пачки текстов в версии так же, как Text.save: чанки, эмбеддинги чанков и их среднее.
+    Text.embedding обновляется только для активной версии.
+    """
+    chunks_by_text = [list(version.iter_chunks(text.text)) if text.text else [] for text in texts]
+    contents = [chunk["text"] for chunks in chunks_by_text for chunk in chunks]
+    tokens = sum(chunk["tokens"] for chunks in chunks_by_text for chunk in chunks)
+    embeddings = get_embeddings(contents, batch_size=encode_batch_size, version=version,
+                                tokens=tokens) if contents else np.empty((0, 0))
+    if contents:
+        version.record_dimension(embeddings.shape[1])
+
+    reduction = version.get_reduction()
+    new_chunks = []
+    new_embeddings = []
+    offset = 0
+    for text, chunks in zip(texts, chunks_by_text):
+        if not chunks:
+            text.embedding = None
+            continue
+        text_embeddings = embeddings[offset:offset + len(chunks)]
+        offset += len(chunks)
+        text.embedding = np.mean(text_embeddings, axis=0).tolist()
+        new_embeddings.append(TextEmbedding(
+            text_id=text.id,
+            version=version,
+            embedding=text.embedding,
+            reduced=reduction.pack([text.embedding])[0] if reduction else None,
+            reduction=reduction,
+        ))
+        new_chunks.extend(
+            TextChunk(text_id=text.id, version=version, index=i, start=chunk["start"], end=chunk["end"],
+                      embedding=emb.tolist())
+            for i, (chunk, emb) in enumerate(zip(chunks, text_embeddings))
+        )
+
+    text_ids = [text.id for text in texts]
+    with transaction.atomic():
+        if version.is_active:
+            Text.objects.bulk_update(texts, ["embedding"])
+        TextEmbedding.objects.filter(version=version, text_id__in=text_ids).delete()
+        TextEmbedding.objects.bulk_create(new_embeddings, batch_size=1000)
+        TextChunk.objects.filter(version=version, text_id__in=text_ids).delete()
+        TextChunk.objects.bulk_create(new_chunks, batch_size=1000)
+    return {"texts": len(texts), "chunks": len(new_chunks)}
+
+
+def read_checkpoint(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_checkpoint(path: str, state: Dict[str, Any]):
+    """
+    Атомарная запись: прерванный процесс не оставляет обрезанный файл.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,197 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Метрики HTTP-запросов в формате Prometheus (text exposition 0.0.4).
+# Длительность запроса раскладывается по стадиям: encode (инференс модели), orm (SQL через Django ORM),
+# neo4j (запросы репозиториев), render (сериализация ответа DRF); остальное — app.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+STAGES = ("encode", "orm", "neo4j", "render")
+INF_LABEL = 'le="+Inf"'
+
+
+class RequestTimings:
+    """
+    Время и число вызовов по стадиям в рамках одного HTTP-запроса.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {stage: [0, 0.0] for stage in STAGES}
+        self.encode_texts = 0
+        self.encode_tokens = 0
+
+    def add(self, stage: str, seconds: float, count: int = 1):
+        entry = self.stages[stage]
+        entry[0] += count
+        entry[1] += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: float) -> str:
+        """
+        Значение заголовка Server-Timing (длительности в мс).
+        """
+        parts = [f"total;dur={total * 1000:.1f}"]
+        spent = 0.0
+        for stage, (count, seconds) in self.stages.items():
+            if count:
+                spent += seconds
+                parts.append(f'{stage};dur={seconds * 1000:.1f};desc="{count} calls"')
+        parts.append(f"app;dur={max(total - spent, 0.0) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Эндпоинт (url name) и стадии текущего HTTP-запроса; выставляются middleware
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="-")
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), value: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [счётчики по бакетам (не накопительные), сумма, количество]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_label = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, labels, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class RequestMetrics:
+    """
+    Метрики процесса: длительность запросов по эндпоинтам, время стадий, инференс модели.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("endpoint", "method", "status"))
+        self.stage_seconds = Counter(
+            "http_request_stage_seconds_total", "Time spent in a request stage.", ("endpoint", "stage"))
+        self.stage_calls = Counter(
+            "http_request_stage_calls_total", "Calls made in a request stage.", ("endpoint", "stage"))
+        self.encode_duration = Histogram(
+            "embedding_encode_duration_seconds", "Embedding model encode call latency.", ("endpoint",))
+        self.encode_batch = Histogram(
+            "embedding_encode_batch_size", "Texts per encode call.", ("endpoint",), BATCH_BUCKETS)
+        self.encode_tokens = Counter(
+            "embedding_encode_tokens_total", "Tokens passed to the embedding model (inputs with a known token count, i.e. chunks).", ("endpoint",))
+        self._metrics = (self.request_duration, self.stage_seconds, self.stage_calls,
+                         self.encode_duration, self.encode_batch, self.encode_tokens)
+
+    def observe_request(self, endpoint: str, method: str, status: int, timings: RequestTimings, total: float):
+        with self._lock:
+            self.request_duration.observe((endpoint, method, str(status)), total)
+            for stage, (count, seconds) in timings.stages.items():
+                if count:
+                    self.stage_seconds.inc((endpoint, stage), seconds)
+                    self.stage_calls.inc((endpoint, stage), count)
+
+    def observe_encode(self, texts: int, tokens: Optional[int], seconds: float):
+        """
+        tokens=None — число токенов неизвестно (не считалось), счётчик токенов не меняется.
+        """
+        tokens = tokens or 0
+        endpoint = current_endpoint.get()
+        with self._lock:
+            self.encode_duration.observe((endpoint,), seconds)
+            self.encode_batch.observe((endpoint,), texts)
+            self.encode_tokens.inc((endpoint,), tokens)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add("encode", seconds)
+            timings.encode_texts += texts
+            timings.encode_tokens += tokens
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def observe_stage(stage: str, seconds: float):
+    """
+    Учитывает время стадии в текущем HTTP-запросе (вне запроса — ничего не делает).
+    """
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def orm_execute_wrapper(execute, sql, params, many, context):
+    """
+    Обёртка выполнения SQL (connection.execute_wrappers): время и число запросов ORM.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("orm", time.perf_counter() - started)
+
+
+def install_orm_wrapper(sender, connection, **kwargs):
+    """
+    Обработчик connection_created: подключает orm_execute_wrapper к каждому новому соединению.
+    """
+    if orm_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(orm_execute_wrapper)
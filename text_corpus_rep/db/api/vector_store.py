@@ -0,0 +1,386 @@
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from db.models import EmbeddingVersion, TextEmbedding
+from db.api.embedding_utils import normalize_rows
+from core.settings import (
+    VECTOR_STORE_DIR, VECTOR_STORE_QUANTIZATION, VECTOR_STORE_RERANK, VECTOR_STORE_KEEP_GENERATIONS, PQ_SUBVECTORS,
+)
+
+# Компактное хранилище векторов текстов одной версии эмбеддингов для семантического поиска.
+# Каталог хранилища (все массивы открываются через np.load(mmap_mode="r") — страницы общие для всех процессов):
+#   ids.npy                      — id текстов (int64)
+#   full.npy                     — нормализованные float32-векторы, читаются только строки кандидатов (точный rerank)
+#   sq_codes.npy, sq_scale.npy, sq_offset.npy — int8 скалярная квантизация по измерениям
+#   pq_codes.npy, pq_codebooks.npy           — uint8 коды product quantization и кодовые книги [M, 256, D / M]
+#   meta.json                    — версия, размерность, число векторов, время построения
+# Поиск: asymmetric distance computation (запрос float, база — коды) по блокам, затем точный rerank кандидатов.
+# Хранилище — снимок: векторы, записанные после built_at (TextEmbedding.updated_at), ищутся напрямую по БД.
+# Корпус текста в снимок не входит (текст можно перенести в другой корпус без пересчёта вектора) —
+# фильтр по корпусу задаётся списком id текстов из БД.
+#
+# Публикация: VECTOR_STORE_DIR/<версия>/<поколение>/ — каталоги поколений, <версия>/current — symlink на текущее.
+# Строит один процесс (flock на <версия>/.lock); новое поколение пишется целиком, затем symlink атомарно
+# подменяется через os.replace. Воркеры (gunicorn) только читают: get_store сверяет current и переоткрывает
+# хранилище при смене поколения, старое остаётся доступным уже открытым отображениям до их закрытия.
+
+QUANTIZATION_METHODS = ("sq", "pq")
+PQ_CENTROIDS = 256
+KMEANS_ITERATIONS = 20
+# Строк в блоке при вычислении оценок: ограничивает временную память float32 при распаковке кодов
+SCORE_BLOCK_ROWS = 65536
+
+
+def store_path(version_name: str) -> str:
+    return os.path.join(VECTOR_STORE_DIR, version_name)
+
+
+def current_path(version_name: str) -> Optional[str]:
+    """
+    Каталог текущего поколения хранилища версии (None, если хранилище не опубликовано).
+    """
+    link = os.path.join(store_path(version_name), "current")
+    try:
+        return os.path.join(store_path(version_name), os.readlink(link))
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def builder_lock(version_name: str):
+    """
+    Эксклюзивная блокировка построения хранилища версии: второй построитель получает ValueError, а не ждёт.
+    """
+    os.makedirs(store_path(version_name), exist_ok=True)
+    with open(os.path.join(store_path(version_name), ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ValueError(f"Vector store for {version_name} is already being built")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def publish(version_name: str, generation: str):
+    """
+    Атомарно делает поколение текущим и удаляет старые, кроме VECTOR_STORE_KEEP_GENERATIONS последних.
+    """
+    root = store_path(version_name)
+    tmp_link = os.path.join(root, f".current-{os.getpid()}")
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(generation, tmp_link)
+    os.replace(tmp_link, os.path.join(root, "current"))
+
+    generations = sorted(name for name in os.listdir(root) if not name.startswith(".") and name != "current")
+    for name in generations[:-VECTOR_STORE_KEEP_GENERATIONS]:
+        if name != generation:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+_stores: Dict[str, "VectorStore"] = {}
+
+
+# -----------------------
+# Квантизация
+# -----------------------
+def train_sq(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Параметры int8-квантизации по измерениям: x ≈ offset + scale * (code + 128).
+    """
+    low = matrix.min(axis=0)
+    high = matrix.max(axis=0)
+    scale = (high - low) / 255.0
+    scale[scale == 0] = 1.0
+    return scale.astype(np.float32), low.astype(np.float32)
+
+
+def encode_sq(matrix: np.ndarray, scale: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    codes = np.rint((matrix - offset) / scale) - 128
+    return np.clip(codes, -128, 127).astype(np.int8)
+
+
+def pq_subvectors(dimension: int, wanted: int = PQ_SUBVECTORS) -> int:
+    """
+    Число подпространств PQ: наибольший делитель размерности, не больший wanted.
+    """
+    return max(m for m in range(1, min(wanted, dimension) + 1) if dimension % m == 0)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Алгоритм Ллойда; начальные центры — случайные точки выборки.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (data ** 2).sum(axis=1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+        assignment = distances.argmin(axis=1)
+        for c in range(k):
+            members = data[assignment == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+
+def train_pq(matrix: np.ndarray, subvectors: int, sample: int = 50000, seed: int = 0) -> np.ndarray:
+    """
+    Кодовые книги PQ [subvectors, <=256, D / subvectors], k-means на выборке по каждому подпространству.
+    """
+    rng = np.random.default_rng(seed)
+    if len(matrix) > sample:
+        matrix = matrix[rng.choice(len(matrix), size=sample, replace=False)]
+    width = matrix.shape[1] // subvectors
+    codebooks = np.zeros((subvectors, PQ_CENTROIDS, width), dtype=np.float32)
+    for m in range(subvectors):
+        centroids = kmeans(matrix[:, m * width:(m + 1) * width], PQ_CENTROIDS, seed=seed + m)
+        codebooks[m, :len(centroids)] = centroids
+        # неиспользуемые центры (выборка меньше 256) дублируют первый и никогда не выигрывают у него
+        codebooks[m, len(centroids):] = centroids[0]
+    return codebooks
+
+
+def encode_pq(matrix: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    subvectors, _, width = codebooks.shape
+    codes = np.empty((len(matrix), subvectors), dtype=np.uint8)
+    for m in range(subvectors):
+        part = matrix[:, m * width:(m + 1) * width]
+        book = codebooks[m]
+        distances = (part ** 2).sum(axis=1)[:, None] - 2 * part @ book.T + (book ** 2).sum(axis=1)[None, :]
+        codes[:, m] = distances.argmin(axis=1)
+    return codes
+
+
+# -----------------------
+# Построение
+# -----------------------
+def build_store(path: str, version_name: str, ids: np.ndarray, matrix: np.ndarray, built_at: datetime.datetime, subvectors: int = PQ_SUBVECTORS) -> Dict[str, Any]:
+    """
+    Строит хранилище в новом каталоге path. Векторы нормализуются.
+    built_at — момент, не позже которого прочитаны векторы.
+    """
+    matrix = normalize_rows(np.asarray(matrix, dtype=np.float32))
+    os.makedirs(path)
+
+    np.save(os.path.join(path, "ids.npy"), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(path, "full.npy"), matrix)
+
+    scale, offset = train_sq(matrix)
+    np.save(os.path.join(path, "sq_scale.npy"), scale)
+    np.save(os.path.join(path, "sq_offset.npy"), offset)
+    np.save(os.path.join(path, "sq_codes.npy"), encode_sq(matrix, scale, offset))
+
+    subvectors = pq_subvectors(matrix.shape[1], subvectors)
+    codebooks = train_pq(matrix, subvectors)
+    np.save(os.path.join(path, "pq_codebooks.npy"), codebooks)
+    np.save(os.path.join(path, "pq_codes.npy"), encode_pq(matrix, codebooks))
+
+    meta = {
+        "version": version_name,
+        "count": int(len(matrix)),
+        "dimension": int(matrix.shape[1]),
+        "pq_subvectors": subvectors,
+        "built_at": built_at.isoformat(),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def build_version_store(version: EmbeddingVersion, subvectors: int = PQ_SUBVECTORS,
+                        batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Строит и публикует новое поколение хранилища версии; векторы, записанные во время построения,
+    попадут в поиск как свежие. Недостроенное поколение удаляется и не публикуется.
+    """
+    with builder_lock(version.name):
+        built_at = datetime.datetime.now(datetime.timezone.utc)
+        rows = TextEmbedding.objects.filter(version=version).order_by("text_id")
+        ids, vectors = [], []
+        for text_id, embedding in rows.values_list("text_id", "embedding").iterator(chunk_size=batch_size):
+            ids.append(text_id)
+            vectors.append(embedding)
+        if not vectors:
+            raise ValueError(f"Embedding version {version.name} has no vectors")
+
+        generation = f"{built_at:%Y%m%dT%H%M%S%f}"
+        path = os.path.join(store_path(version.name), generation)
+        try:
+            meta = build_store(path, version.name, np.asarray(ids), np.asarray(vectors, dtype=np.float32),
+                               built_at, subvectors)
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        publish(version.name, generation)
+    meta["generation"] = generation
+    return meta
+
+
+# -----------------------
+# Поиск
+# -----------------------
+class VectorStore:
+    """
+    Хранилище, открытое только на чтение через memory map: процессы-воркеры делят одни и те же страницы.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.built_at = datetime.datetime.fromisoformat(self.meta["built_at"])
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.ids = load("ids.npy")
+        self.full = load("full.npy")
+        self.sq_codes = load("sq_codes.npy")
+        self.sq_scale = np.asarray(load("sq_scale.npy"))
+        self.sq_offset = np.asarray(load("sq_offset.npy"))
+        self.pq_codes = load("pq_codes.npy")
+        self.pq_codebooks = np.asarray(load("pq_codebooks.npy"))
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def sq_scores(self, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """
+        ADC по int8-кодам: q · (offset + scale * (code + 128)) = q·offset + 128·(q·scale) + (q * scale) · code.
+        """
+        weights = (query * self.sq_scale).astype(np.float32)
+        constant = float(query @ self.sq_offset) + 128.0 * float(weights.sum())
+        codes = self.sq_codes if rows is None else self.sq_codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = np.asarray(codes[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ weights + constant
+        return scores
+
+    def pq_scores(self, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """
+        ADC по кодам PQ: таблица скалярных произведений запроса с центрами [M, 256], оценка — сумма по подпространствам.
+        """
+        subvectors, _, width = self.pq_codebooks.shape
+        table = np.einsum("mkd,md->mk", self.pq_codebooks, query.reshape(subvectors, width))
+        codes = self.pq_codes if rows is None else self.pq_codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        columns = np.arange(subvectors)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = np.asarray(codes[start:start + SCORE_BLOCK_ROWS])
+            scores[start:start + len(block)] = table[columns, block].sum(axis=1)
+        return scores
+
+    def search(self, query: np.ndarray, limit: int, text_ids=None, exclude_ids=None,
+               method: str = VECTOR_STORE_QUANTIZATION, rerank: int = VECTOR_STORE_RERANK) -> List[Tuple[int, float]]:
+        """
+        Ближайшие тексты: отбор max(limit, rerank) кандидатов по квантованным кодам и точный rerank float-векторами.
+        text_ids — искать только среди этих текстов (например, текстов корпуса по БД).
+        Возвращает [(id текста, косинусное сходство)].
+        """
+        query = normalize_rows(np.asarray(query, dtype=np.float32))
+        rows = None
+        if text_ids is not None:
+            rows = np.flatnonzero(np.isin(np.asarray(self.ids), np.fromiter(text_ids, dtype=np.int64)))
+        if method == "sq":
+            scores = self.sq_scores(query, rows)
+        elif method == "pq":
+            scores = self.pq_scores(query, rows)
+        else:
+            raise ValueError(f"Unknown quantization: {method}. Expected one of {QUANTIZATION_METHODS}")
+        if exclude_ids:
+            candidate_ids = np.asarray(self.ids if rows is None else self.ids[rows])
+            scores[np.isin(candidate_ids, list(exclude_ids))] = -np.inf
+
+        count = min(max(limit, rerank), len(scores))
+        if count == 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.isfinite(scores[top])]
+        candidates = top if rows is None else rows[top]
+        # обращение к строкам memmap по возрастанию — последовательное чтение страниц
+        candidates = np.sort(candidates)
+        exact = np.asarray(self.full[candidates]) @ query
+        order = np.argsort(-exact)[:limit]
+        return [(int(self.ids[candidates[i]]), float(exact[i])) for i in order]
+
+
+def get_store(version_name: str) -> Optional[VectorStore]:
+    """
+    Текущее поколение хранилища версии, открытое в этом процессе (None, если хранилище не построено).
+    Смена поколения видна по symlink current — проверка стоит одного readlink на запрос.
+    """
+    path = current_path(version_name)
+    if path is None:
+        _stores.pop(version_name, None)
+        return None
+    store = _stores.get(version_name)
+    if store is None or store.path != path:
+        try:
+            store = VectorStore(path)
+        except FileNotFoundError:
+            # поколение удалено между readlink и открытием: следующий запрос увидит новое
+            return store
+        _stores[version_name] = store
+    return store
+
+
+def store_report(store: VectorStore, queries: int = 200, k: int = 10, seed: int = 0) -> Dict[str, Any]:
+    """
+    recall@k отбора по кодам (sq, pq) и после точного rerank относительно точного поиска;
+    векторы хранилища используются как запросы, сам вектор из выдачи исключается.
+    """
+    full = np.asarray(store.full)
+    if len(full) < 2:
+        return {"texts": len(full), "queries": 0}
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(full), size=min(queries, len(full)), replace=False)
+    top = min(k, len(full) - 1)
+    hits = {f"{method}_recall@{k}": 0.0 for method in QUANTIZATION_METHODS}
+    hits.update({f"{method}_rerank_recall@{k}": 0.0 for method in QUANTIZATION_METHODS})
+    for row in query_rows:
+        exact = full @ full[row]
+        exact[row] = -np.inf
+        truth = set(np.argsort(-exact)[:top].tolist())
+        for method in QUANTIZATION_METHODS:
+            approx = store.sq_scores(full[row]) if method == "sq" else store.pq_scores(full[row])
+            approx[row] = -np.inf
+            order = np.argsort(-approx)
+            hits[f"{method}_recall@{k}"] += len(truth & set(order[:top].tolist())) / top
+            candidates = order[:max(top, VECTOR_STORE_RERANK)]
+            reranked = candidates[np.argsort(-exact[candidates])][:top]
+            hits[f"{method}_rerank_recall@{k}"] += len(truth & set(reranked.tolist())) / top
+
+    report = {key: round(value / len(query_rows), 4) for key, value in hits.items()}
+    report.update({
+        "texts": len(full),
+        "queries": len(query_rows),
+        "rerank": VECTOR_STORE_RERANK,
+        "bytes_per_vector": {
+            "float32": int(full.shape[1]) * 4,
+            "sq": int(full.shape[1]),
+            "pq": int(store.pq_codes.shape[1]),
+        },
+    })
+    return report
+
+
+def remove_store(version_name: str) -> bool:
+    """
+    Снимает публикацию (воркеры возвращаются к поиску по БД) и удаляет поколения версии.
+    """
+    _stores.pop(version_name, None)
+    if current_path(version_name) is None:
+        return False
+    with builder_lock(version_name):
+        os.remove(os.path.join(store_path(version_name), "current"))
+        for name in os.listdir(store_path(version_name)):
+            if not name.startswith("."):
+                shutil.rmtree(os.path.join(store_path(version_name), name), ignore_errors=True)
+    return True
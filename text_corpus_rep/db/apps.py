@@ -1,5 +1,29 @@
+import threading
+
 from django.apps import AppConfig
 
 
+def warm_up_ontology_cache(sender, **kwargs):
+    """
+    Загрузка схемы онтологии в фоновом потоке по первому запросу процесса: сигнал request_started
+    приходит только в процессах, обслуживающих запросы (WSGI/ASGI, runserver), поэтому команды управления
+    (migrate, reembed и т. п.) к Neo4j не обращаются.
+    """
+    from django.core.signals import request_started
+    from db.api.ontology_cache import schema_cache
+    request_started.disconnect(dispatch_uid="db.ontology_cache.warm_up")
+    threading.Thread(target=schema_cache.warm_up, daemon=True).start()
+
+
 class DbConfig(AppConfig):
     name = 'db'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from db.api.request_metrics import install_orm_wrapper
+        connection_created.connect(install_orm_wrapper, dispatch_uid="db.request_metrics.orm")
+
+        from core.settings import ONTOLOGY_CACHE_WARMUP
+        if ONTOLOGY_CACHE_WARMUP:
+            from django.core.signals import request_started
+            request_started.connect(warm_up_ontology_cache, dispatch_uid="db.ontology_cache.warm_up")
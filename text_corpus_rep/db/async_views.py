@@ -0,0 +1,104 @@
+import json
+
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .api.asyncOntologyRepository import AsyncOntologyRepository
+from core.settings import DB_URI, DB_USER, DB_PASSWORD, NODES_BATCH_MAX_URIS
+
+# Асинхронные эндпоинты чтения онтологии для ASGI-развёртывания (core/asgi.py).
+# Пока запрос ждёт Neo4j, воркер обслуживает другие запросы.
+# Репозиторий открывается на время запроса: async with get_repository() as repo. Драйвер под ASGI общий
+# для event loop сервера, под WSGI — собственный у запроса (см. asyncNeo4jRepository).
+
+
+def get_repository() -> AsyncOntologyRepository:
+    return AsyncOntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+
+
+# -----------------------
+#  ONTOLOGY API (async)
+# -----------------------
+
+@require_GET
+async def getOntology(request):
+    async with get_repository() as repo:
+        data = await repo.get_ontology()
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def getClass(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.get_class(uri)
+    return JsonResponse(result, safe=False)
+
+
+@require_GET
+async def getSignature(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.collect_signature(uri)
+    return JsonResponse(result)
+
+
+@require_GET
+async def getClassParents(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.get_class_parents(uri)
+    return JsonResponse(result, safe=False)
+
+
+@require_GET
+async def getClassChildren(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.get_class_children(uri)
+    return JsonResponse(result, safe=False)
+
+
+@require_GET
+async def getClassObjects(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.get_class_objects(uri)
+    return JsonResponse(result, safe=False)
+
+
+@require_GET
+async def getClassOverview(request):
+    """
+    Класс, его сигнатура, родители и потомки одним ответом (запросы к Neo4j идут параллельно).
+    """
+    uri = request.GET.get("uri")
+    if not uri:
+        return HttpResponse(status=400)
+    async with get_repository() as repo:
+        result = await repo.get_class_overview(uri)
+    return JsonResponse(result)
+
+
+@require_GET
+async def getObject(request):
+    uri = request.GET.get("uri")
+    async with get_repository() as repo:
+        result = await repo.get_object(uri)
+    return JsonResponse(result, safe=False)
+
+
+@csrf_exempt
+@require_POST
+async def getNodesBatch(request):
+    """
+    Узлы онтологии по списку uri одним запросом. Тело: {uris: [...], labels?: [...]}
+    """
+    data = json.loads(request.body.decode('utf-8'))
+    uris = data.get("uris")
+    if not isinstance(uris, list) or len(uris) > NODES_BATCH_MAX_URIS:
+        return HttpResponse(status=400)
+    async with get_repository() as repo:
+        result = await repo.get_nodes_by_uris(uris, data.get("labels"))
+    return JsonResponse(result)
@@ -0,0 +1,4 @@
+from db.benchmarks.scenarios import SCENARIOS, DEFAULT_SCALE, BenchmarkContext, Scenario
+from db.benchmarks.runner import (
+    DEFAULT_TOLERANCE, parse_scale, run_scenario, environment, compare, load_results, save_results,
+)
@@ -0,0 +1,76 @@
+import random
+from typing import Any, Dict, List
+
+from db.api.ontologyRepository import OntologyRepository
+
+# Синтетические данные для бенчмарков. Всё детерминировано seed, чтобы прогоны были сравнимы.
+
+BENCH_PREFIX = "bench"
+
+WORDS = (
+    "корпус", "текст", "роман", "автор", "персонаж", "глава", "перевод", "оригинал", "поэт", "стихотворение",
+    "город", "столица", "река", "война", "мир", "история", "письмо", "дорога", "ссылка", "Кавказ",
+    "лингвист", "разметка", "онтология", "класс", "объект", "атрибут", "связь", "эпоха", "жанр", "сюжет",
+    "написал", "описывает", "встретил", "вернулся", "уехал", "читал", "помнил", "знал", "видел", "любил",
+    "старый", "новый", "долгий", "холодный", "тёмный", "светлый", "русский", "главный", "поздний", "ранний",
+    "и", "в", "на", "с", "о", "под", "после", "перед", "когда", "потому",
+    "the", "novel", "author", "character", "city", "letter", "translation", "war", "peace", "river",
+)
+
+
+def make_sentence(rng: random.Random, min_words: int = 8, max_words: int = 18) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    """
+    Текст примерно из words слов, разбитый на предложения и абзацы.
+    """
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = make_sentence(rng)
+        sentences.append(sentence)
+        count += sentence.count(" ") + 1
+    paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+    return "\n\n".join(paragraphs)
+
+
+def make_texts(seed: int, count: int, words: int) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "title": f"{BENCH_PREFIX} text {i}",
+            "description": make_sentence(rng, 4, 8),
+            "text": make_text(rng, words),
+        }
+        for i in range(count)
+    ]
+
+
+def make_class_tree(repo: OntologyRepository, seed: int, depth: int, branching: int,
+                    attributes: int = 0, objects: int = 0) -> Dict[str, Any]:
+    """
+    Создаёт дерево классов через OntologyRepository (как это делают эндпоинты).
+    Возвращает uri корня и всех классов в порядке создания.
+    """
+    rng = random.Random(seed)
+    root = repo.create_class(f"{BENCH_PREFIX} root {seed}", make_sentence(rng, 4, 8))
+    classes = [root["uri"]]
+    level = [root["uri"]]
+    for d in range(depth):
+        next_level = []
+        for parent_uri in level:
+            for b in range(branching):
+                cls = repo.create_class(f"{BENCH_PREFIX} class {d}.{b}", make_sentence(rng, 4, 8), parent_uri)
+                next_level.append(cls["uri"])
+        classes.extend(next_level)
+        level = next_level
+
+    for class_uri in classes:
+        for a in range(attributes):
+            repo.add_class_attribute(class_uri, f"{BENCH_PREFIX} attr {a}")
+        for o in range(objects):
+            repo.create_object(class_uri, f"{BENCH_PREFIX} object {o}", make_sentence(rng, 4, 8))
+    return {"root": root["uri"], "classes": classes}
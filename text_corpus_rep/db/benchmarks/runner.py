@@ -0,0 +1,147 @@
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from django.db import connection
+
+from db.benchmarks.scenarios import DEFAULT_SCALE, BenchmarkContext, Scenario
+from core.settings import BASE_DIR, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+
+# Медиана дольше базовой более чем на tolerance (доля) считается регрессией
+DEFAULT_TOLERANCE = 0.2
+
+
+@contextmanager
+def isolated_database():
+    """
+    Отдельная тестовая база Django на время прогона (для SQLite — в памяти): бенчмарки не трогают рабочие данные.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def parse_scale(items: List[str]) -> Dict[str, int]:
+    """
+    Объёмы данных прогона: DEFAULT_SCALE с переопределениями "key=value". Неизвестный ключ или не число — ValueError.
+    """
+    scale = dict(DEFAULT_SCALE)
+    for item in items:
+        key, _, value = item.partition("=")
+        if key not in DEFAULT_SCALE or not value.isdigit():
+            raise ValueError(f"Bad --set value: {item}")
+        scale[key] = int(value)
+    return scale
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(scenario: Scenario, ctx: BenchmarkContext, repeats: int, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Выполняет сценарий warmup + repeats раз; замеряется только run. Время — в секундах.
+    """
+    timings = []
+    ops = 0
+    state = None if scenario.per_repeat else scenario.setup(ctx)
+    try:
+        for i in range(warmup + repeats):
+            if scenario.per_repeat:
+                state = scenario.setup(ctx)
+            try:
+                started = time.perf_counter()
+                ops = scenario.run(ctx, state)
+                elapsed = time.perf_counter() - started
+            finally:
+                if scenario.per_repeat:
+                    scenario.teardown(ctx, state)
+            if i >= warmup:
+                timings.append(elapsed)
+    finally:
+        if not scenario.per_repeat:
+            scenario.teardown(ctx, state)
+
+    median = statistics.median(timings)
+    return {
+        "description": scenario.description,
+        "repeats": repeats,
+        "ops": ops,
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.fmean(timings),
+        "p95": percentile(timings, 0.95),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "ops_per_sec": ops / median if median else None,
+        "timings": timings,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(ctx: BenchmarkContext) -> Dict[str, Any]:
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "database": connection.vendor,
+        "neo4j": ctx.ontology is not None,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "seed": ctx.seed,
+        "scale": ctx.scale,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Сравнивает медианы сценариев с базовым прогоном. status: ok, regression, improvement, new.
+    Прогоны с разными объёмами данных сравнивать нельзя — такие сценарии помечаются incomparable.
+    """
+    rows = []
+    same_scale = results["environment"]["scale"] == baseline.get("environment", {}).get("scale")
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            rows.append({"scenario": name, "median": current["median"], "baseline": None, "ratio": None, "status": "new"})
+            continue
+        ratio = current["median"] / base["median"] if base["median"] else None
+        if not same_scale:
+            status = "incomparable"
+        elif ratio is not None and ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio is not None and ratio < 1 - tolerance:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"scenario": name, "median": current["median"], "baseline": base["median"], "ratio": ratio,
+                     "status": status})
+    return rows
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,172 @@
+from typing import Any, Callable, Dict, Optional
+
+from django.db import transaction
+
+from db.models import Corpus, Text
+from db.api.CorpusRepository import CorpusRepository
+from db.api.TextRepository import TextRepository
+from db.api.HybridSearchRepository import HybridSearchRepository
+from db.api.ontologyRepository import OntologyRepository
+from db.benchmarks.generators import BENCH_PREFIX, make_texts, make_class_tree
+
+# Параметры объёма данных по умолчанию (переопределяются --set key=value)
+DEFAULT_SCALE = {
+    "batch": 10,            # текстов в text_create / text_update
+    "texts": 200,           # текстов в корпусе для bulk_ingest, get_corpus, semantic_search
+    "words": 150,           # слов в синтетическом тексте
+    "queries": 20,          # запросов в semantic_search
+    "tree_depth": 3,        # глубина дерева классов
+    "tree_branching": 3,    # потомков у каждого класса
+    "attributes": 2,        # атрибутов у класса в delete_class_cascade
+    "objects": 3,           # объектов у класса в delete_class_cascade
+}
+
+SEARCH_QUERIES = ("роман о войне", "перевод письма", "поэт на Кавказе", "столица и река", "history of the city")
+
+
+class BenchmarkContext:
+    """
+    Общие параметры прогона: seed, объёмы данных и репозиторий онтологии (None — Neo4j не подключён).
+    """
+    def __init__(self, seed: int, scale: Dict[str, int], ontology: Optional[OntologyRepository] = None):
+        self.seed = seed
+        self.scale = scale
+        self.ontology = ontology
+
+
+class Scenario:
+    """
+    Сценарий: setup готовит состояние (не замеряется), run выполняет замеряемую работу и возвращает число операций,
+    teardown убирает данные. per_repeat=False — состояние готовится один раз на все повторы.
+    """
+    def __init__(self, name: str, description: str, run: Callable[[BenchmarkContext, Any], int],
+                 setup: Callable[[BenchmarkContext], Any] = None, teardown: Callable[[BenchmarkContext, Any], None] = None,
+                 per_repeat: bool = True, neo4j: bool = False):
+        self.name = name
+        self.description = description
+        self.run = run
+        self.setup = setup or (lambda ctx: None)
+        self.teardown = teardown or (lambda ctx, state: None)
+        self.per_repeat = per_repeat
+        self.neo4j = neo4j
+
+
+# -----------------------
+# Корпус и тексты (SQLite / ORM)
+# -----------------------
+def _create_corpus(ctx: BenchmarkContext, texts: int = 0) -> Dict[str, Any]:
+    corpus = Corpus.objects.create(title=f"{BENCH_PREFIX} corpus", description="", genre=BENCH_PREFIX)
+    payloads = make_texts(ctx.seed, texts, ctx.scale["words"])
+    with transaction.atomic():
+        ids = [Text.objects.create(corpus=corpus, **payload).id for payload in payloads]
+    return {"corpus_id": corpus.id, "text_ids": ids}
+
+
+def _delete_corpus(ctx: BenchmarkContext, state: Dict[str, Any]):
+    Corpus.objects.filter(id=state["corpus_id"]).delete()
+
+
+def setup_text_create(ctx: BenchmarkContext) -> Dict[str, Any]:
+    state = _create_corpus(ctx)
+    state["payloads"] = make_texts(ctx.seed, ctx.scale["batch"], ctx.scale["words"])
+    return state
+
+
+def run_text_create(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    repo = TextRepository()
+    for payload in state["payloads"]:
+        repo.create_text(corpus_id=state["corpus_id"], **payload)
+    return len(state["payloads"])
+
+
+def setup_text_update(ctx: BenchmarkContext) -> Dict[str, Any]:
+    state = _create_corpus(ctx, ctx.scale["batch"])
+    state["payloads"] = make_texts(ctx.seed + 1, ctx.scale["batch"], ctx.scale["words"])
+    return state
+
+
+def run_text_update(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    repo = TextRepository()
+    for text_id, payload in zip(state["text_ids"], state["payloads"]):
+        repo.update_text(text_id, text=payload["text"])
+    return len(state["text_ids"])
+
+
+def setup_bulk_ingest(ctx: BenchmarkContext) -> Dict[str, Any]:
+    state = _create_corpus(ctx)
+    state["payloads"] = make_texts(ctx.seed, ctx.scale["texts"], ctx.scale["words"])
+    return state
+
+
+def run_bulk_ingest(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    corpus = Corpus.objects.get(id=state["corpus_id"])
+    with transaction.atomic():
+        for payload in state["payloads"]:
+            Text(corpus=corpus, **payload).save()
+    return len(state["payloads"])
+
+
+def setup_corpus(ctx: BenchmarkContext) -> Dict[str, Any]:
+    return _create_corpus(ctx, ctx.scale["texts"])
+
+
+def run_get_corpus(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    CorpusRepository().get_corpus(state["corpus_id"])
+    return 1
+
+
+def run_semantic_search(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    repo = HybridSearchRepository()
+    for i in range(ctx.scale["queries"]):
+        repo.search(SEARCH_QUERIES[i % len(SEARCH_QUERIES)], corpus_id=state["corpus_id"])
+    return ctx.scale["queries"]
+
+
+# -----------------------
+# Онтология (Neo4j)
+# -----------------------
+def run_class_tree_crud(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    repo = ctx.ontology
+    tree = make_class_tree(repo, ctx.seed, ctx.scale["tree_depth"], ctx.scale["tree_branching"])
+    state.update(tree)
+    for class_uri in tree["classes"]:
+        repo.get_class(class_uri)
+        repo.get_class_children(class_uri)
+        repo.collect_signature(class_uri)
+        repo.update_class(class_uri, f"{BENCH_PREFIX} class (updated)", "")
+    # создание + три чтения + обновление на каждый класс
+    return len(tree["classes"]) * 5
+
+
+def teardown_class_tree(ctx: BenchmarkContext, state: Dict[str, Any]):
+    if state.get("root"):
+        ctx.ontology.delete_class(state["root"])
+
+
+def setup_class_tree(ctx: BenchmarkContext) -> Dict[str, Any]:
+    return make_class_tree(ctx.ontology, ctx.seed, ctx.scale["tree_depth"], ctx.scale["tree_branching"],
+                           ctx.scale["attributes"], ctx.scale["objects"])
+
+
+def run_delete_class_cascade(ctx: BenchmarkContext, state: Dict[str, Any]) -> int:
+    ctx.ontology.delete_class(state["root"])
+    state["root"] = None
+    return 1
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in (
+    Scenario("text_create", "Создание текстов с чанкингом и эмбеддингами (TextRepository.create_text)",
+             run_text_create, setup_text_create, _delete_corpus),
+    Scenario("text_update", "Обновление текстов с пересчётом эмбеддингов (TextRepository.update_text)",
+             run_text_update, setup_text_update, _delete_corpus),
+    Scenario("bulk_ingest", "Загрузка корпуса текстов в одной транзакции",
+             run_bulk_ingest, setup_bulk_ingest, _delete_corpus),
+    Scenario("get_corpus", "Чтение корпуса со всеми текстами (CorpusRepository.get_corpus)",
+             run_get_corpus, setup_corpus, _delete_corpus, per_repeat=False),
+    Scenario("semantic_search", "Гибридный поиск по корпусу (HybridSearchRepository.search)",
+             run_semantic_search, setup_corpus, _delete_corpus, per_repeat=False),
+    Scenario("class_tree_crud", "Создание дерева классов, чтение и обновление каждого класса",
+             run_class_tree_crud, lambda ctx: {}, teardown_class_tree, neo4j=True),
+    Scenario("delete_class_cascade", "Каскадное удаление дерева классов с атрибутами и объектами",
+             run_delete_class_cascade, setup_class_tree, teardown_class_tree, neo4j=True),
+)}
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from db.api.ontologyRepository import OntologyRepository
+from db.benchmarks import (
+    SCENARIOS, DEFAULT_SCALE, DEFAULT_TOLERANCE, BenchmarkContext,
+    parse_scale, run_scenario, environment, compare, load_results, save_results,
+)
+from db.benchmarks.runner import isolated_database
+from core.settings import DB_USER, DB_PASSWORD, BENCHMARK_NEO4J_URI
+
+
+class Command(BaseCommand):
+    help = ("Запускает бенчмарки корпуса, эмбеддингов и онтологии на синтетических данных "
+            "в отдельной тестовой базе; сохраняет результаты в JSON и сравнивает с базовым прогоном")
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="*", help=f"Сценарии (по умолчанию все): {', '.join(SCENARIOS)}")
+        parser.add_argument("--list", action="store_true", help="Показать сценарии и выйти")
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                            help=f"Объёмы данных: {', '.join(f'{k}={v}' for k, v in DEFAULT_SCALE.items())}")
+        parser.add_argument("--neo4j-uri", default=BENCHMARK_NEO4J_URI,
+                            help="Отдельный (тестовый) экземпляр Neo4j; без него сценарии онтологии пропускаются")
+        parser.add_argument("--output", help="Файл для результатов (JSON)")
+        parser.add_argument("--baseline", help="Результаты базового прогона (JSON) для сравнения")
+        parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for name, scenario in SCENARIOS.items():
+                self.stdout.write(f"{name:<22} {'[neo4j] ' if scenario.neo4j else ''}{scenario.description}")
+            return
+
+        names = options["scenarios"] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+        try:
+            scale = parse_scale(options["set"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        ontology = self.connect_ontology(options["neo4j_uri"]) if any(SCENARIOS[n].neo4j for n in names) else None
+        ctx = BenchmarkContext(options["seed"], scale, ontology)
+        results = {"environment": None, "scenarios": {}}
+        try:
+            with isolated_database():
+                results["environment"] = environment(ctx)
+                for name in names:
+                    scenario = SCENARIOS[name]
+                    if scenario.neo4j and ontology is None:
+                        self.stdout.write(f"{name:<22} skipped (no Neo4j)")
+                        continue
+                    result = run_scenario(scenario, ctx, options["repeats"], options["warmup"])
+                    results["scenarios"][name] = result
+                    self.stdout.write(
+                        f"{name:<22} median {result['median'] * 1000:10.1f} ms  p95 {result['p95'] * 1000:10.1f} ms  "
+                        f"{result['ops_per_sec'] or 0:10.1f} ops/s"
+                    )
+        finally:
+            if ontology is not None:
+                ontology.close()
+
+        if options["output"]:
+            save_results(results, options["output"])
+        if options["baseline"]:
+            rows = compare(results, load_results(options["baseline"]), options["tolerance"])
+            for row in rows:
+                ratio = f"x{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+                self.stdout.write(f"{row['scenario']:<22} {ratio:>8}  {row['status']}")
+            regressions = [row["scenario"] for row in rows if row["status"] == "regression"]
+            if regressions:
+                raise CommandError(f"Performance regressions: {', '.join(regressions)}")
+
+    def connect_ontology(self, uri):
+        if not uri:
+            return None
+        ontology = OntologyRepository(uri, DB_USER, DB_PASSWORD)
+        try:
+            ontology.driver.verify_connectivity()
+        except Exception as e:
+            ontology.close()
+            self.stderr.write(f"Neo4j at {uri} is unavailable, ontology scenarios skipped: {e}")
+            return None
+        return ontology
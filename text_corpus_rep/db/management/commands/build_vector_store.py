@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from db.models import EmbeddingVersion
+from db.api.vector_store import build_version_store, get_store, remove_store, store_report
+from core.settings import PQ_SUBVECTORS
+
+
+class Command(BaseCommand):
+    help = ("Строит квантованное хранилище векторов версии эмбеддингов (int8 и коды PQ, memory map) "
+            "для семантического поиска, публикует его воркерам атомарной подменой поколения "
+            "и печатает recall@10 относительно точного поиска")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--embedding-version", help="Версия эмбеддингов (по умолчанию активная)")
+        parser.add_argument("--subvectors", type=int, default=PQ_SUBVECTORS, help="Подпространств PQ")
+        parser.add_argument("--queries", type=int, default=200, help="Запросов в отчёте recall@k (0 — без отчёта)")
+        parser.add_argument("--remove", action="store_true", help="Удалить хранилище (поиск по векторам в БД)")
+
+    def handle(self, *args, **options):
+        try:
+            version = EmbeddingVersion.resolve(options["embedding_version"])
+        except EmbeddingVersion.DoesNotExist:
+            raise CommandError(f"Unknown embedding version: {options['embedding_version']}")
+
+        if options["remove"]:
+            try:
+                removed = remove_store(version.name)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Vector store for {version.name} {'removed' if removed else 'not found'}")
+            return
+
+        started = time.perf_counter()
+        try:
+            meta = build_version_store(version, options["subvectors"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        meta["seconds"] = round(time.perf_counter() - started, 2)
+        if options["queries"]:
+            meta["report"] = store_report(get_store(version.name), options["queries"])
+        self.stdout.write(json.dumps(meta, indent=2))
@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from db.api.embedding_utils import EMBEDDING_BACKENDS, check_backend_accuracy
+from core.settings import EMBEDDING_BACKEND
+
+
+class Command(BaseCommand):
+    help = "Сравнивает бэкенд инференса эмбеддингов с эталонной моделью по качеству и скорости"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND)
+        parser.add_argument("--repeats", type=int, default=3)
+
+    def handle(self, *args, **options):
+        report = check_backend_accuracy(options["backend"], repeats=options["repeats"])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from db.models import CorpusNgramCount, CorpusWordCount, Text, TextProfile
+
+
+class Command(BaseCommand):
+    help = ("Строит профили текстов, частоты слов и n-грамм корпусов и позиционный индекс конкорданса "
+            "(тексты, сохранённые после появления статистики, учитываются автоматически)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", type=int, action="append", help="id корпуса (можно несколько раз)")
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Удалить статистику и пересчитать все тексты заново")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        texts = Text.objects.order_by("id")
+        profiles = TextProfile.objects.all()
+        counts = CorpusWordCount.objects.all()
+        ngram_counts = CorpusNgramCount.objects.all()
+        if options["corpus"]:
+            texts = texts.filter(corpus_id__in=options["corpus"])
+            profiles = profiles.filter(corpus_id__in=options["corpus"])
+            counts = counts.filter(corpus_id__in=options["corpus"])
+            ngram_counts = ngram_counts.filter(corpus_id__in=options["corpus"])
+        if options["rebuild"]:
+            profiles.delete()
+            counts.delete()
+            ngram_counts.delete()
+
+        processed = 0
+        for text in texts.only("id", "text", "corpus_id").iterator(chunk_size=options["batch_size"]):
+            TextProfile.update_for(text)
+            processed += 1
+            if processed % options["batch_size"] == 0:
+                self.stderr.write(f"{processed} texts")
+        self.stdout.write(json.dumps({"texts": processed, "profiles": profiles.count(), "words": counts.count()}))
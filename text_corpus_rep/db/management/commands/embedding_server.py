@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from db.models import EmbeddingVersion
+from db.api.embedding_server import EmbeddingServer
+from core.settings import EMBEDDING_SERVER_MAX_BATCH, EMBEDDING_SERVER_MAX_WAIT_MS
+
+
+class Command(BaseCommand):
+    help = ("Запускает сервер эмбеддингов: одна копия модели на процесс, одновременные запросы веб-воркеров "
+            "собираются в общие батчи. Воркеры используют его, если задан EMBEDDING_SERVER_URL")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--max-batch-size", type=int, default=EMBEDDING_SERVER_MAX_BATCH,
+                            help="Максимум текстов в одном батче модели")
+        parser.add_argument("--max-wait-ms", type=float, default=EMBEDDING_SERVER_MAX_WAIT_MS,
+                            help="Сколько ждать попутных запросов после первого в батче")
+        parser.add_argument("--no-preload", action="store_true",
+                            help="Не загружать модель активной версии при старте (загрузится при первом запросе)")
+
+    def handle(self, *args, **options):
+        server = EmbeddingServer((options["host"], options["port"]), options["max_batch_size"], options["max_wait_ms"])
+        if not options["no_preload"]:
+            version = EmbeddingVersion.get_active()
+            server.get_batcher(version.model_name, version.backend)
+        self.stdout.write(f"Embedding server on http://{options['host']}:{options['port']} "
+                          f"(max batch {options['max_batch_size']}, max wait {options['max_wait_ms']} ms)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
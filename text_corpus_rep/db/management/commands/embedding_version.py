@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from db.models import EmbeddingVersion
+from db.api.embedding_utils import EMBEDDING_BACKENDS
+from db.api.embedding_versions import create_version, list_versions, activate_version, delete_version, version_info
+from core.settings import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND
+
+
+class Command(BaseCommand):
+    help = "Версии эмбеддингов: создание, список с покрытием, атомарное переключение активной версии, удаление"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="action", required=True)
+        subparsers.add_parser("list")
+
+        create = subparsers.add_parser("create")
+        create.add_argument("name")
+        create.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+        create.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND)
+        create.add_argument("--chunk-max-tokens", type=int, default=None)
+        create.add_argument("--normalize", action="store_true", help="Хранить L2-нормализованные векторы")
+
+        activate = subparsers.add_parser("activate")
+        activate.add_argument("name")
+        activate.add_argument("--force", action="store_true", help="Активировать, даже если не все тексты посчитаны")
+
+        delete = subparsers.add_parser("delete")
+        delete.add_argument("name")
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        try:
+            if action == "list":
+                self.stdout.write(json.dumps(list_versions(), indent=2))
+            elif action == "create":
+                version = create_version(options["name"], options["model"], options["backend"],
+                                         options["chunk_max_tokens"], options["normalize"])
+                self.stdout.write(f"Created {version.name}; build it with: manage.py reembed --embedding-version {version.name}")
+            elif action == "activate":
+                version = activate_version(options["name"], force=options["force"])
+                self.stdout.write(json.dumps(version_info(version), indent=2))
+            elif action == "delete":
+                delete_version(options["name"])
+                self.stdout.write(f"Deleted {options['name']}")
+        except EmbeddingVersion.DoesNotExist:
+            raise CommandError(f"Unknown embedding version: {options['name']}")
+        except ValueError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from db.api.ontologyRepository import OntologyRepository, ONTOLOGY_LABELS
+from core.settings import DB_URI, DB_USER, DB_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Создаёт индексы по uri для всех меток онтологии (поиск узлов по uri и импорт снимков)"
+
+    def handle(self, *args, **options):
+        ontology = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+        try:
+            ontology.ensure_indexes()
+        finally:
+            ontology.close()
+        self.stdout.write(f"Indexes ensured for: {', '.join(ONTOLOGY_LABELS)}")
@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from db.api.ontology_formats import EXPORT_FORMATS, serialize
+from db.api.ontologyRepository import OntologyRepository
+from core.settings import DB_URI, DB_USER, DB_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Выгружает снимок онтологии (классы, свойства, объекты и связи) в jsonl, N-Triples или Turtle"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+        parser.add_argument("--output", default="-", help="Файл снимка (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        ontology = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+        out = sys.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8")
+        try:
+            for line in serialize(ontology.iter_export_rows(), options["format"]):
+                out.write(line)
+        finally:
+            ontology.close()
+            if out is not sys.stdout:
+                out.close()
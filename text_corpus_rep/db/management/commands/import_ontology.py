@@ -0,0 +1,28 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from db.api.ontology_formats import IMPORT_FORMATS, parse
+from db.api.ontologyRepository import OntologyRepository, IMPORT_BATCH_SIZE
+from core.settings import DB_URI, DB_USER, DB_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Загружает снимок онтологии из jsonl или N-Triples пакетными UNWIND-транзакциями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Файл снимка ('-' — stdin)")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, default="jsonl")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        ontology = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+        source = sys.stdin if options["input"] == "-" else open(options["input"], encoding="utf-8")
+        try:
+            stats = ontology.import_rows(parse(source, options["format"]), batch_size=options["batch_size"])
+        finally:
+            ontology.close()
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(json.dumps(stats))
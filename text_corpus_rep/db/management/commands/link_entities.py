@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from db.api.entity_linking import link_chunks, refresh_object_index
+from db.api.ontologyRepository import OntologyRepository
+from core.settings import DB_URI, DB_USER, DB_PASSWORD, ENTITY_LINK_THRESHOLD, ENTITY_LINK_TOP_K
+
+
+class Command(BaseCommand):
+    help = "Предлагает связи чанков текстов с объектами онтологии по сходству эмбеддингов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", type=int, default=None, help="Обработать только тексты корпуса")
+        parser.add_argument("--threshold", type=float, default=ENTITY_LINK_THRESHOLD)
+        parser.add_argument("--top-k", type=int, default=ENTITY_LINK_TOP_K)
+        parser.add_argument("--batch-size", type=int, default=512)
+
+    def handle(self, *args, **options):
+        ontology = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+        try:
+            changed, removed = refresh_object_index(ontology)
+        finally:
+            ontology.close()
+        self.stdout.write(f"Objects re-embedded: {len(changed)}, removed: {len(removed)}")
+
+        result = link_chunks(
+            changed,
+            corpus_id=options["corpus"],
+            threshold=options["threshold"],
+            top_k=options["top_k"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(json.dumps(result))
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from db.models import EmbeddingReduction, EmbeddingVersion
+from db.api.reduction import (
+    REDUCTION_METHODS, fit_reduction, recall_report, activate_reduction, deactivate_reductions,
+)
+
+
+class Command(BaseCommand):
+    help = ("Понижение размерности векторов версии эмбеддингов для поиска: обучение (PCA / усечение), "
+            "пересчёт пониженных векторов, отчёт recall@k относительно полного поиска, включение")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--embedding-version", help="Версия эмбеддингов (по умолчанию активная)")
+        parser.add_argument("--method", choices=REDUCTION_METHODS, default="pca")
+        parser.add_argument("--dim", type=int, default=256)
+        parser.add_argument("--sample", type=int, default=20000, help="Векторов в выборке для обучения PCA")
+        parser.add_argument("--queries", type=int, default=200, help="Запросов в отчёте recall@k")
+        parser.add_argument("--activate", action="store_true", help="Сразу включить для поиска")
+        parser.add_argument("--list", action="store_true", help="Показать понижения версии с отчётами")
+        parser.add_argument("--use", type=int, metavar="ID", help="Включить ранее обученное понижение")
+        parser.add_argument("--off", action="store_true", help="Выключить понижение (поиск по полным векторам)")
+
+    def handle(self, *args, **options):
+        try:
+            version = EmbeddingVersion.resolve(options["embedding_version"])
+        except EmbeddingVersion.DoesNotExist:
+            raise CommandError(f"Unknown embedding version: {options['embedding_version']}")
+
+        if options["list"]:
+            rows = [
+                {"id": r.id, "method": r.method, "dimension": r.dimension, "active": r.active, "report": r.report}
+                for r in version.reductions.order_by("created_at")
+            ]
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        if options["off"]:
+            deactivate_reductions(version)
+            self.stdout.write(f"Reduction disabled for {version.name}")
+            return
+        if options["use"]:
+            try:
+                reduction = version.reductions.get(id=options["use"])
+            except EmbeddingReduction.DoesNotExist:
+                raise CommandError(f"Unknown reduction {options['use']} for {version.name}")
+            activate_reduction(reduction)
+            self.stdout.write(f"Reduction {reduction} enabled")
+            return
+
+        try:
+            reduction = fit_reduction(version, options["method"], options["dim"], options["sample"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Reduction {reduction} (id {reduction.id})")
+        self.stdout.write(json.dumps(recall_report(reduction, options["queries"]), indent=2))
+        if options["activate"]:
+            activate_reduction(reduction)
+            self.stdout.write(f"Reduction {reduction} enabled")
+        else:
+            self.stdout.write(f"Enable with: manage.py reduce_embeddings --use {reduction.id}")
@@ -0,0 +1,71 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from db.models import EmbeddingVersion
+from db.api.chunk_utils import get_token_budget
+from db.api.reembedding import text_queryset, iter_text_batches, reembed_batch, read_checkpoint, write_checkpoint
+from core.settings import BASE_DIR, CHUNK_OVERLAP_TOKENS
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает эмбеддинги текстов и чанков в версии эмбеддингов пачками (после смены модели или размера чанков)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--embedding-version", help="Версия эмбеддингов (по умолчанию активная)")
+        parser.add_argument("--missing-only", action="store_true", help="Только тексты без вектора в версии")
+        parser.add_argument("--corpus", type=int, action="append", default=[],
+                            help="Обработать только тексты корпуса (можно указать несколько раз)")
+        parser.add_argument("--batch-size", type=int, default=64, help="Текстов в пачке (чтение и запись)")
+        parser.add_argument("--encode-batch-size", type=int, default=128, help="Чанков в батче инференса")
+        parser.add_argument("--checkpoint", default=os.path.join(BASE_DIR, "reembed.checkpoint.json"))
+        parser.add_argument("--resume", action="store_true", help="Продолжить с последнего обработанного текста")
+
+    def handle(self, *args, **options):
+        try:
+            version = EmbeddingVersion.resolve(options["embedding_version"])
+        except EmbeddingVersion.DoesNotExist:
+            raise CommandError(f"Unknown embedding version: {options['embedding_version']}")
+        checkpoint = options["checkpoint"]
+        # Параметры, при которых checkpoint можно продолжать: выборка текстов, модель и нарезка на чанки
+        # (чанки уже обработанных текстов должны быть нарезаны с тем же бюджетом токенов и перекрытием)
+        run = {
+            "corpus": sorted(options["corpus"]),
+            "version": version.name,
+            "missing_only": options["missing_only"],
+            "model_name": version.model_name,
+            "chunk_max_tokens": version.chunk_max_tokens or get_token_budget(version.model_name),
+            "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        }
+        after_id = 0
+        if options["resume"]:
+            state = read_checkpoint(checkpoint)
+            if state and state.get("run") != run:
+                raise CommandError(f"Checkpoint {checkpoint} was written for another run: {state.get('run')}")
+            after_id = state.get("last_id", 0)
+
+        texts = text_queryset(options["corpus"], after_id, version if options["missing_only"] else None)
+        total = texts.count()
+        self.stdout.write(f"Texts to re-embed in {version.name}: {total}"
+                          + (f" (resuming after id {after_id})" if after_id else ""))
+
+        done = chunks = 0
+        started = time.monotonic()
+        for batch in iter_text_batches(texts, options["batch_size"]):
+            stats = reembed_batch(batch, version, options["encode_batch_size"])
+            done += stats["texts"]
+            chunks += stats["chunks"]
+            write_checkpoint(checkpoint, {"run": run, "last_id": batch[-1].id, "done": done})
+
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            self.stdout.write(
+                f"{done}/{total} texts, {chunks} chunks, {rate:.1f} texts/s, "
+                f"elapsed {elapsed:.0f}s, ETA {eta:.0f}s"
+            )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(f"Done: {done} texts, {chunks} chunks in {time.monotonic() - started:.0f}s")
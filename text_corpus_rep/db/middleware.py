@@ -0,0 +1,84 @@
+import time
+
+from django.utils.deprecation import MiddlewareMixin
+
+from core.settings import SERVER_TIMING_HEADERS
+from db.api.request_metrics import RequestTimings, current_endpoint, current_timings, request_metrics
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Замеряет запрос целиком и по стадиям (encode, orm, neo4j, render) и пишет метрики по эндпоинтам.
+    Должна стоять первой в MIDDLEWARE, чтобы учитывать время остальных middleware.
+    """
+    def process_request(self, request):
+        request.metrics_timings = RequestTimings()
+        current_timings.set(request.metrics_timings)
+        return None
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся (сериализуются) после всех process_template_response
+        request.metrics_render_started = time.perf_counter()
+        return response
+
+    def process_response(self, request, response):
+        timings = getattr(request, "metrics_timings", None)
+        if timings is None:
+            return response
+        render_started = getattr(request, "metrics_render_started", None)
+        if render_started is not None:
+            timings.add("render", time.perf_counter() - render_started)
+
+        if SERVER_TIMING_HEADERS:
+            # для потокового ответа заголовок уходит до тела и содержит только время до начала отдачи
+            response["Server-Timing"] = timings.server_timing(timings.elapsed())
+        # Тело потокового ответа (запросы к Neo4j, ORM) выполняется после process_response, пока сервер
+        # его читает, — такой запрос учитывается целиком при закрытии ответа.
+        if response.streaming:
+            close = response.close
+
+            def close_and_observe():
+                try:
+                    close()
+                finally:
+                    self.observe(request, response, timings)
+
+            response.close = close_and_observe
+        else:
+            self.observe(request, response, timings)
+        return response
+
+    @staticmethod
+    def observe(request, response, timings):
+        current_timings.set(None)
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else "unmatched"
+        request_metrics.observe_request(endpoint, request.method, response.status_code, timings, timings.elapsed())
+
+
+class QueryStatsMiddleware(MiddlewareMixin):
+    """
+    Помечает запросы к Neo4j именем эндпоинта (url name), в рамках которого они выполняются.
+    """
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_endpoint.set(match.url_name if match and match.url_name else view_func.__name__)
+        return None
+
+    def process_response(self, request, response):
+        # В WSGI контекст принадлежит потоку и переживает запрос — сбрасываем явно.
+        # Потоковый ответ выполняет запросы к Neo4j уже после process_response, пока сервер читает его тело,
+        # поэтому для него эндпоинт сбрасывается при закрытии ответа.
+        if response.streaming:
+            close = response.close
+
+            def close_and_reset():
+                try:
+                    close()
+                finally:
+                    current_endpoint.set("-")
+
+            response.close = close_and_reset
+        else:
+            current_endpoint.set("-")
+        return response
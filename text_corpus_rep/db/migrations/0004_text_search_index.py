@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE db_text_fts USING fts5("
+            "title, description, text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO db_text_fts(rowid, title, description, text) "
+            "SELECT id, replace(replace(title, 'ё', 'е'), 'Ё', 'Е'), "
+            "replace(replace(description, 'ё', 'е'), 'Ё', 'Е'), "
+            "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+            "FROM db_text"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE db_text ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(text, '')), 'C')"
+            ") STORED"
+        )
+        schema_editor.execute("CREATE INDEX db_text_search_vector_idx ON db_text USING GIN (search_vector)")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS db_text_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS db_text_search_vector_idx")
+        schema_editor.execute("ALTER TABLE db_text DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0003_text_embedding'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0004_text_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextAnnotation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.PositiveIntegerField()),
+                ('end', models.PositiveIntegerField()),
+                ('fragment', models.TextField()),
+                ('object_uri', models.CharField(db_index=True, max_length=200)),
+                ('object_title', models.TextField(blank=True, default='')),
+                ('class_uri', models.CharField(blank=True, db_index=True, default='', max_length=200)),
+                ('relation_uri', models.CharField(default='http://erlangen-crm.org/current/P165_incorporates', max_length=200)),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annotations', to='db.text')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['object_uri', 'text'], name='db_textanno_object__66857e_idx'), models.Index(fields=['text', 'start'], name='db_textanno_text_id_29dc63_idx')],
+            },
+        ),
+    ]
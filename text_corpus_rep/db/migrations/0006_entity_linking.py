@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0005_text_annotation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OntologyObjectEmbedding',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_uri', models.CharField(max_length=200, unique=True)),
+                ('class_uri', models.CharField(blank=True, default='', max_length=200)),
+                ('title', models.TextField(blank=True, default='')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('embedding', models.JSONField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='textannotation',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='textannotation',
+            name='status',
+            field=models.CharField(choices=[('manual', 'manual'), ('proposed', 'proposed'), ('accepted', 'accepted'), ('rejected', 'rejected')], db_index=True, default='manual', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='TextChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start', models.PositiveIntegerField()),
+                ('end', models.PositiveIntegerField()),
+                ('embedding', models.JSONField()),
+                ('linked', models.BooleanField(db_index=True, default=False)),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='db.text')),
+            ],
+            options={
+                'ordering': ['text', 'index'],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+from core.settings import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, CHUNK_MAX_TOKENS, DEFAULT_EMBEDDING_VERSION
+
+
+def create_default_version(apps, schema_editor):
+    """
+    Существующие векторы посчитаны текущей моделью: оформляем их как активную версию по умолчанию.
+    """
+    EmbeddingVersion = apps.get_model('db', 'EmbeddingVersion')
+    Text = apps.get_model('db', 'Text')
+    TextChunk = apps.get_model('db', 'TextChunk')
+    TextEmbedding = apps.get_model('db', 'TextEmbedding')
+
+    version = EmbeddingVersion.objects.create(
+        name=DEFAULT_EMBEDDING_VERSION,
+        model_name=EMBEDDING_MODEL_NAME,
+        backend=EMBEDDING_BACKEND,
+        chunk_max_tokens=CHUNK_MAX_TOKENS,
+        status='active',
+        activated_at=timezone.now(),
+    )
+    batch = []
+    for text_id, embedding in Text.objects.filter(embedding__isnull=False).values_list('id', 'embedding').iterator(chunk_size=1000):
+        batch.append(TextEmbedding(text_id=text_id, version=version, embedding=embedding))
+        if version.dimension is None:
+            version.dimension = len(embedding)
+        if len(batch) == 1000:
+            TextEmbedding.objects.bulk_create(batch)
+            batch = []
+    TextEmbedding.objects.bulk_create(batch)
+    version.save(update_fields=['dimension'])
+    TextChunk.objects.update(version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0006_entity_linking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(max_length=100, unique=True)),
+                ('model_name', models.CharField(max_length=200)),
+                ('backend', models.CharField(default='torch', max_length=20)),
+                ('chunk_max_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('normalized', models.BooleanField(default=False)),
+                ('dimension', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('building', 'building'), ('active', 'active'), ('retired', 'retired')], db_index=True, default='building', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('status',), name='single_active_embedding_version')],
+            },
+        ),
+        migrations.AddField(
+            model_name='textchunk',
+            name='version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='db.embeddingversion'),
+        ),
+        migrations.CreateModel(
+            name='TextEmbedding',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedding', models.JSONField()),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='db.text')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_embeddings', to='db.embeddingversion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('version', 'text'), name='unique_text_embedding_version')],
+            },
+        ),
+        migrations.RunPython(create_default_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0007_embedding_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textembedding',
+            name='reduced',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='EmbeddingReduction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('pca', 'pca'), ('truncate', 'truncate')], max_length=20)),
+                ('dimension', models.PositiveIntegerField()),
+                ('artifact', models.CharField(blank=True, default='', max_length=500)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reductions', to='db.embeddingversion')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='textembedding',
+            name='reduction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='db.embeddingreduction'),
+        ),
+        migrations.AddConstraint(
+            model_name='embeddingreduction',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('version',), name='single_active_reduction'),
+        ),
+    ]
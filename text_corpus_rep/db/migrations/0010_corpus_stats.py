@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0009_textembedding_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Word',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TextProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=40)),
+                ('tokens', models.PositiveIntegerField()),
+                ('types', models.PositiveIntegerField()),
+                ('sentences', models.PositiveIntegerField()),
+                ('characters', models.PositiveIntegerField()),
+                ('words', models.BinaryField()),
+                ('bigrams', models.BinaryField()),
+                ('trigrams', models.BinaryField()),
+                ('corpus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_profiles', to='db.corpus')),
+                ('text', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='db.text')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CorpusWordCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('texts', models.PositiveIntegerField()),
+                ('corpus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='word_counts', to='db.corpus')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='corpus_counts', to='db.word')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['corpus', '-count'], name='db_corpuswo_corpus__64d177_idx')],
+                'constraints': [models.UniqueConstraint(fields=('corpus', 'word'), name='unique_corpus_word')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def reset_profiles(apps, schema_editor):
+    """
+    Профили, посчитанные до позиционного индекса, помечаются устаревшими:
+    команда corpus_stats (или следующее сохранение текста) построит для них индекс.
+    """
+    TextProfile = apps.get_model('db', 'TextProfile')
+    TextProfile.objects.update(content_hash='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0010_corpus_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textprofile',
+            name='offsets',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.CreateModel(
+            name='WordPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('positions', models.BinaryField()),
+                ('corpus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='db.corpus')),
+                ('text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='db.text')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='db.word')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['word', 'corpus', 'text'], name='db_wordpost_word_id_994f5a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('word', 'text'), name='unique_word_posting')],
+            },
+        ),
+        migrations.RunPython(reset_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    """
+    Хеш содержимого существующих текстов: их векторы уже посчитаны по текущему тексту.
+    """
+    Text = apps.get_model('db', 'Text')
+    batch = []
+    for text in Text.objects.only('id', 'text').iterator(chunk_size=500):
+        text.content_hash = hashlib.sha1((text.text or '').encode('utf-8')).hexdigest()
+        batch.append(text)
+        if len(batch) == 500:
+            Text.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Text.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_positional_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='text',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+import numpy as np
+from django.db import migrations, models
+
+
+def pack_reduced(apps, schema_editor):
+    """
+    Пониженные векторы из JSON -> float32 little-endian (формат EmbeddingReduction.pack).
+    """
+    TextEmbedding = apps.get_model('db', 'TextEmbedding')
+    rows = TextEmbedding.objects.filter(reduced__isnull=False).only('id', 'reduced').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:1000])
+        if not batch:
+            break
+        for row in batch:
+            row.reduced_packed = np.asarray(row.reduced, dtype='<f4').tobytes()
+        TextEmbedding.objects.bulk_update(batch, ['reduced_packed'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0012_text_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textembedding',
+            name='reduced_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_reduced, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='textembedding',
+            name='reduced',
+        ),
+        migrations.RenameField(
+            model_name='textembedding',
+            old_name='reduced_packed',
+            new_name='reduced',
+        ),
+    ]
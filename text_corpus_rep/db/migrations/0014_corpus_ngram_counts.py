@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from db.api.corpus_stats import aggregate_counts, unpack_counts
+
+NGRAM_FIELDS = {2: 'bigrams', 3: 'trigrams'}
+
+
+def fill_ngram_counts(apps, schema_editor):
+    """
+    Частоты n-грамм корпусов из профилей уже посчитанных текстов (дальше поддерживаются TextProfile.update_for).
+    """
+    TextProfile = apps.get_model('db', 'TextProfile')
+    CorpusNgramCount = apps.get_model('db', 'CorpusNgramCount')
+    corpus_ids = TextProfile.objects.values_list('corpus_id', flat=True).distinct()
+    for corpus_id in corpus_ids:
+        for n, field in NGRAM_FIELDS.items():
+            profiles = TextProfile.objects.filter(corpus_id=corpus_id).values_list(field, flat=True)
+            keys, counts = aggregate_counts((unpack_counts(blob, n) for blob in profiles.iterator()), n)
+            CorpusNgramCount.objects.bulk_create([
+                CorpusNgramCount(corpus_id=corpus_id, n=n, key=' '.join(str(int(word)) for word in key),
+                                 word1=int(key[0]), word2=int(key[1]), word3=int(key[2]) if n > 2 else None,
+                                 count=int(count))
+                for key, count in zip(keys, counts)
+            ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0013_packed_reduced_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusNgramCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('n', models.PositiveSmallIntegerField()),
+                ('key', models.CharField(max_length=40)),
+                ('word1', models.PositiveIntegerField()),
+                ('word2', models.PositiveIntegerField()),
+                ('word3', models.PositiveIntegerField(null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('corpus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ngram_counts', to='db.corpus')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['corpus', 'n', '-count'], name='db_corpusng_corpus__84587f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('corpus', 'key'), name='unique_corpus_ngram')],
+            },
+        ),
+        migrations.RunPython(fill_ngram_counts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,26 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
 import numpy as np
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from db_file_storage.model_utils import delete_file, delete_file_if_needed
-from sentence_transformers import SentenceTransformer
 
-from db.api.embedding_utils import get_chunks, get_embeddings
+from db.api.chunk_utils import iter_chunks
+from db.api.corpus_stats import NGRAM_ORDERS, profile_text, pack_counts, unpack_counts
+from db.api.postings import encode_offsets, encode_positions
+from db.api.embedding_utils import get_embeddings, normalize_rows
+from db.api.TextSearchRepository import TextSearchRepository
+from db.onthology_namespace import CORPUS_RELATION
+from core.settings import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, CHUNK_MAX_TOKENS, DEFAULT_EMBEDDING_VERSION
+
+
+def text_hash(value: str) -> str:
+    return hashlib.sha1((value or "").encode("utf-8")).hexdigest()
 
-model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-mpnet-base-v2')
 
 class Test(models.Model):
     name = models.TextField()
@@ -13,6 +28,141 @@ class Test(models.Model):
     def __str__(self):
         return self.name  # Returns the value of the 'name' field
 
+class EmbeddingVersion(models.Model):
+    """
+    Версия эмбеддингов: модель, бэкенд инференса, чанкинг и нормализация векторов.
+    Векторы разных версий несовместимы; поиск и сравнение всегда выполняются в рамках одной версии.
+    Активна ровно одна версия — её используют Text.save и запросы без явной версии.
+    Новая версия строится в фоне (status=building, команда reembed --embedding-version) и включается атомарно (activate).
+    """
+    name = models.SlugField(max_length=100, unique=True)
+    model_name = models.CharField(max_length=200)
+    backend = models.CharField(max_length=20, default="torch")
+    # None — бюджет токенов по длине входа модели (см. chunk_utils.get_token_budget)
+    chunk_max_tokens = models.PositiveIntegerField(null=True, blank=True)
+    # Векторы L2-нормализованы при сохранении (косинус = скалярное произведение)
+    normalized = models.BooleanField(default=False)
+    # Заполняется при первом сохранённом векторе
+    dimension = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=[
+        ("building", "building"),
+        ("active", "active"),
+        ("retired", "retired"),
+    ], default="building", db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["status"], condition=models.Q(status="active"), name="single_active_embedding_version"),
+        ]
+
+    @classmethod
+    def get_active(cls) -> "EmbeddingVersion":
+        """
+        Активная версия; в пустой базе создаётся из текущих настроек модели.
+        """
+        version = cls.objects.filter(status="active").first()
+        if version is None:
+            version, _ = cls.objects.get_or_create(
+                name=DEFAULT_EMBEDDING_VERSION,
+                defaults={"model_name": EMBEDDING_MODEL_NAME, "backend": EMBEDDING_BACKEND, "status": "active",
+                          "chunk_max_tokens": CHUNK_MAX_TOKENS},
+            )
+        return version
+
+    @classmethod
+    def resolve(cls, name: str = None) -> "EmbeddingVersion":
+        """
+        Версия по имени (запрос закрепляет версию) или активная. Неизвестное имя — EmbeddingVersion.DoesNotExist.
+        """
+        return cls.objects.get(name=name) if name else cls.get_active()
+
+    @property
+    def is_active(self) -> bool:
+        return self.status == "active"
+
+    def iter_chunks(self, text):
+        return iter_chunks(text, max_tokens=self.chunk_max_tokens, model_name=self.model_name)
+
+    def record_dimension(self, dimension: int):
+        if self.dimension is None:
+            EmbeddingVersion.objects.filter(id=self.id, dimension__isnull=True).update(dimension=dimension)
+            self.dimension = dimension
+        elif self.dimension != dimension:
+            raise ValueError(f"Embedding version {self.name}: expected dimension {self.dimension}, got {dimension}")
+
+    def get_reduction(self) -> Optional["EmbeddingReduction"]:
+        """
+        Активное понижение размерности версии (None — поиск по полным векторам).
+        """
+        return self.reductions.filter(active=True).first()
+
+    def __str__(self):
+        return self.name
+
+
+class EmbeddingReduction(models.Model):
+    """
+    Понижение размерности векторов версии для поисковых индексов:
+    pca — проекция на главные компоненты, обученная на векторах корпуса (артефакт .npz: mean, components);
+    truncate — первые dimension координат (для моделей, обученных по схеме Matryoshka).
+    Пониженные векторы L2-нормализуются; полные векторы остаются для переранжирования.
+    report — recall@k поиска по пониженным векторам относительно полных (см. api/reduction.py).
+    """
+    version = models.ForeignKey(EmbeddingVersion, on_delete=models.CASCADE, related_name="reductions")
+    method = models.CharField(max_length=20, choices=[("pca", "pca"), ("truncate", "truncate")])
+    dimension = models.PositiveIntegerField()
+    artifact = models.CharField(max_length=500, blank=True, default="")
+    report = models.JSONField(null=True, blank=True)
+    active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["version"], condition=models.Q(active=True), name="single_active_reduction"),
+        ]
+
+    def project(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Проецирует строки матрицы полных векторов в пониженное пространство (строки нормализованы).
+        PCA обучается на нормализованных векторах, поэтому вход нормализуется до проекции.
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = matrix[:, :self.dimension]
+        else:
+            mean, components = _load_reduction_artifact(self.artifact)
+            reduced = (normalize_rows(matrix) - mean) @ components.T
+        return normalize_rows(reduced)
+
+    def pack(self, matrix: np.ndarray) -> List[bytes]:
+        """
+        Пониженные векторы строк матрицы в формате TextEmbedding.reduced (float32 little-endian).
+        """
+        return [row.tobytes() for row in self.project(matrix).astype("<f4")]
+
+    def unpack(self, blobs: Iterable[bytes]) -> np.ndarray:
+        """
+        Значения TextEmbedding.reduced -> матрица [n, dimension] без разбора JSON.
+        """
+        return np.frombuffer(b"".join(bytes(blob) for blob in blobs), dtype="<f4").reshape(-1, self.dimension)
+
+    def __str__(self):
+        return f"{self.version.name}/{self.method}-{self.dimension}"
+
+
+# Артефакты PCA неизменяемы (новое обучение — новый файл), поэтому кешируются по пути
+_reduction_artifacts = {}
+
+
+def _load_reduction_artifact(path: str):
+    if path not in _reduction_artifacts:
+        with np.load(path) as artifact:
+            _reduction_artifacts[path] = (artifact["mean"].astype(np.float32), artifact["components"].astype(np.float32))
+    return _reduction_artifacts[path]
+
+
 class Corpus(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -26,6 +176,8 @@ class Text(models.Model):
     description = models.TextField()
     text = models.TextField()
     embedding = models.JSONField(null=True, blank=True)
+    # sha1 содержимого, по которому посчитаны векторы: при изменении только метаданных они не пересчитываются
+    content_hash = models.CharField(max_length=40, blank=True, default="")
     corpus = models.ForeignKey(Corpus, on_delete=models.CASCADE, related_name="texts")
     has_translation = models.ForeignKey(
         'self',
@@ -37,15 +189,25 @@ class Text(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        При сохранении объекта автоматически вычисляем эмбеддинг текста.
-        Используются функции get_chunks() и get_embeddings().
+        При сохранении объекта автоматически вычисляем эмбеддинг текста активной версией модели.
+        Используются функции iter_chunks() и get_embeddings().
+        Эмбеддинги чанков сохраняются в TextChunk, вектор текста — в TextEmbedding (и в embedding).
+        Если содержимое текста изменилось (content_hash), векторы остальных версий устаревают и удаляются
+        (их досчитает reembed --missing-only). При изменении только метаданных (название, описание, корпус)
+        векторы не пересчитываются; активная версия считается только если её вектора у текста ещё нет.
         """
-        if self.text:
+        chunks = None
+        version = EmbeddingVersion.get_active()
+        content_hash = text_hash(self.text)
+        content_changed = self.pk is None or content_hash != self.content_hash
+        self.content_hash = content_hash
+        if self.text and (content_changed or not TextEmbedding.objects.filter(text_id=self.pk, version=version).exists()):
             # Разбиваем текст на фрагменты
-            chunks = get_chunks(self.text)
+            chunks = list(version.iter_chunks(self.text))
 
             # Получаем эмбеддинги для фрагментов
-            embeddings = get_embeddings(chunks)
+            embeddings = get_embeddings([chunk["text"] for chunk in chunks], version=version,
+                                        tokens=sum(chunk["tokens"] for chunk in chunks))
 
             # Усредняем эмбеддинги, чтобы получить один вектор
             mean_emb = np.mean(embeddings, axis=0)
@@ -53,9 +215,375 @@ class Text(models.Model):
             # Преобразуем в список (для JSONField)
             self.embedding = mean_emb.tolist()
 
-        super().save(*args, **kwargs)
+        # Текст, его векторы, полнотекстовый индекс и статистика корпуса записываются одной транзакцией
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if content_changed:
+                TextEmbedding.objects.filter(text=self).exclude(version=version).delete()
+                TextChunk.objects.filter(text=self).exclude(version=version).delete()
+            if chunks is not None:
+                self.store_chunks(chunks, embeddings, version)
+                reduction = version.get_reduction()
+                TextEmbedding.objects.update_or_create(text=self, version=version, defaults={
+                    "embedding": self.embedding,
+                    "reduced": reduction.pack([self.embedding])[0] if reduction else None,
+                    "reduction": reduction,
+                })
+                version.record_dimension(len(self.embedding))
+
+            # Обновляем полнотекстовый индекс и статистику корпуса
+            TextSearchRepository().index_text(self)
+            TextProfile.update_for(self)
+
+    def store_chunks(self, chunks, embeddings, version):
+        """
+        Заменяет сохранённые чанки текста и их эмбеддинги для версии модели.
+        """
+        TextChunk.objects.filter(text=self, version=version).delete()
+        TextChunk.objects.bulk_create([
+            TextChunk(text=self, version=version, index=i, start=chunk["start"], end=chunk["end"], embedding=emb.tolist())
+            for i, (chunk, emb) in enumerate(zip(chunks, embeddings))
+        ])
 
     def __str__(self):
         return self.title
 
+
+class TextEmbedding(models.Model):
+    """
+    Вектор текста в конкретной версии эмбеддингов (несколько версий хранятся параллельно).
+    """
+    text = models.ForeignKey(Text, on_delete=models.CASCADE, related_name="embeddings")
+    version = models.ForeignKey(EmbeddingVersion, on_delete=models.CASCADE, related_name="text_embeddings")
+    embedding = models.JSONField()
+    # Пониженный вектор для поиска (float32 little-endian, см. EmbeddingReduction.pack) и понижение, которым он получен
+    reduced = models.BinaryField(null=True, blank=True)
+    reduction = models.ForeignKey(EmbeddingReduction, on_delete=models.SET_NULL, null=True, blank=True)
+    # Время записи вектора: векторы новее квантованного хранилища версии ищутся напрямую (см. vector_store)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["version", "text"], name="unique_text_embedding_version"),
+        ]
+
+
+class TextChunk(models.Model):
+    """
+    Чанк текста (символьные смещения) и его эмбеддинг в версии version.
+    linked — чанк уже сопоставлен со всеми объектами онтологии (см. entity_linking).
+    """
+    text = models.ForeignKey(Text, on_delete=models.CASCADE, related_name="chunks")
+    version = models.ForeignKey(EmbeddingVersion, on_delete=models.CASCADE, related_name="chunks", null=True)
+    index = models.PositiveIntegerField()
+    start = models.PositiveIntegerField()
+    end = models.PositiveIntegerField()
+    embedding = models.JSONField()
+    linked = models.BooleanField(default=False, db_index=True)
+
+    class Meta:
+        ordering = ["text", "index"]
+
+
+class OntologyObjectEmbedding(models.Model):
+    """
+    Векторный индекс объектов онтологии: эмбеддинг title + description.
+    content_hash позволяет пересчитывать только изменившиеся объекты.
+    """
+    object_uri = models.CharField(max_length=200, unique=True)
+    class_uri = models.CharField(max_length=200, blank=True, default="")
+    title = models.TextField(blank=True, default="")
+    content_hash = models.CharField(max_length=64)
+    embedding = models.JSONField()
+
+
+class TextAnnotation(models.Model):
+    """
+    Упоминание объекта онтологии (Neo4j) во фрагменте текста [start, end).
+    Название и класс объекта кешируются здесь, чтобы запросы «граф + корпус»
+    не обращались к Neo4j за каждым объектом.
+    """
+    text = models.ForeignKey(Text, on_delete=models.CASCADE, related_name="annotations")
+    start = models.PositiveIntegerField()
+    end = models.PositiveIntegerField()
+    fragment = models.TextField()
+    object_uri = models.CharField(max_length=200, db_index=True)
+    object_title = models.TextField(blank=True, default="")
+    class_uri = models.CharField(max_length=200, blank=True, default="", db_index=True)
+    relation_uri = models.CharField(max_length=200, default=CORPUS_RELATION)
+    # manual — создана вручную; proposed — предложена entity linking и ждёт проверки
+    status = models.CharField(max_length=20, choices=[
+        ("manual", "manual"),
+        ("proposed", "proposed"),
+        ("accepted", "accepted"),
+        ("rejected", "rejected"),
+    ], default="manual", db_index=True)
+    confidence = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["object_uri", "text"]),
+            models.Index(fields=["text", "start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.fragment} -> {self.object_uri}"
+
+
+class Word(models.Model):
+    """
+    Словарь словоформ статистики корпусов: массивы частот в TextProfile ссылаются на id.
+    """
+    form = models.CharField(max_length=100, unique=True)
+
+    # Словоформ в одном запросе (ограничение числа параметров SQLite)
+    LOOKUP_BATCH_SIZE = 500
+
+    @classmethod
+    def ids_for(cls, forms: Iterable[str]) -> Dict[str, int]:
+        """
+        id словоформ; отсутствующие в словаре добавляются.
+        """
+        forms = list(set(forms))
+        ids: Dict[str, int] = {}
+        for i in range(0, len(forms), cls.LOOKUP_BATCH_SIZE):
+            batch = forms[i:i + cls.LOOKUP_BATCH_SIZE]
+            ids.update(cls.objects.filter(form__in=batch).values_list("form", "id"))
+            missing = [form for form in batch if form not in ids]
+            if missing:
+                cls.objects.bulk_create([cls(form=form) for form in missing], ignore_conflicts=True)
+                ids.update(cls.objects.filter(form__in=missing).values_list("form", "id"))
+        return ids
+
+    def __str__(self):
+        return self.form
+
+
+class TextProfile(models.Model):
+    """
+    Статистика текста для корпусных запросов: размеры и частоты n-грамм (см. corpus_stats).
+    content_hash — хеш текста, по которому считан профиль: неизменённый текст не пересчитывается.
+    """
+    text = models.OneToOneField(Text, on_delete=models.CASCADE, related_name="profile")
+    corpus = models.ForeignKey(Corpus, on_delete=models.CASCADE, related_name="text_profiles")
+    content_hash = models.CharField(max_length=40)
+    tokens = models.PositiveIntegerField()
+    types = models.PositiveIntegerField()
+    sentences = models.PositiveIntegerField()
+    characters = models.PositiveIntegerField()
+    # uint32 [k, n + 1]: id слов n-граммы и её частота в тексте
+    words = models.BinaryField()
+    bigrams = models.BinaryField()
+    trigrams = models.BinaryField()
+    # Символьные границы слов текста по порядку (см. postings.encode_offsets)
+    offsets = models.BinaryField(default=b"")
+
+    NGRAM_FIELDS = {1: "words", 2: "bigrams", 3: "trigrams"}
+
+    def counts(self, n: int = 1) -> np.ndarray:
+        return unpack_counts(getattr(self, self.NGRAM_FIELDS[n]), n)
+
+    @classmethod
+    def update_for(cls, text: "Text") -> "TextProfile":
+        """
+        Пересчитывает профиль текста, частоты слов корпуса (вычитая прежний профиль)
+        и позиционный индекс текста.
+        """
+        content_hash = text_hash(text.text)
+        profile = cls.objects.filter(text=text).first()
+        if profile is not None and profile.content_hash == content_hash and profile.corpus_id == text.corpus_id:
+            return profile
+
+        stats = profile_text(text.text or "")
+        word_ids = Word.ids_for(key[0] for key in stats["ngrams"][1])
+        packed = {
+            cls.NGRAM_FIELDS[n]: pack_counts(stats["ngrams"][n], word_ids, n)
+            for n in NGRAM_ORDERS
+        }
+        with transaction.atomic():
+            if profile is not None:
+                profile.apply_to_corpus(-1)
+            else:
+                profile = cls(text=text)
+            profile.corpus_id = text.corpus_id
+            profile.content_hash = content_hash
+            profile.tokens = stats["tokens"]
+            profile.types = stats["types"]
+            profile.sentences = stats["sentences"]
+            profile.characters = stats["characters"]
+            for field, blob in packed.items():
+                setattr(profile, field, blob)
+            profile.offsets = encode_offsets(stats["starts"], stats["ends"])
+            profile.save()
+            profile.apply_to_corpus(1)
+            WordPosting.objects.filter(text_id=text.id).delete()
+            WordPosting.objects.bulk_create([
+                WordPosting(word_id=word_ids[form], text_id=text.id, corpus_id=text.corpus_id,
+                            count=len(positions), positions=encode_positions(positions))
+                for form, positions in stats["positions"].items()
+            ], batch_size=1000)
+        return profile
+
+    @classmethod
+    def remove_for(cls, text_id: int):
+        profile = cls.objects.filter(text_id=text_id).first()
+        if profile is None:
+            return
+        with transaction.atomic():
+            profile.apply_to_corpus(-1)
+            profile.delete()
+
+    def apply_to_corpus(self, sign: int):
+        """
+        Прибавляет (sign=1) или вычитает (sign=-1) частоты слов и n-грамм текста из частот его корпуса.
+        """
+        CorpusWordCount.apply(self.corpus_id, self.counts(1), sign)
+        for n in CorpusNgramCount.ORDERS:
+            CorpusNgramCount.apply(self.corpus_id, n, self.counts(n), sign)
+
+
+class CorpusWordCount(models.Model):
+    """
+    Частота словоформы в корпусе (count) и число текстов корпуса, где она встречается (texts).
+    """
+    corpus = models.ForeignKey(Corpus, on_delete=models.CASCADE, related_name="word_counts")
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name="corpus_counts")
+    count = models.PositiveIntegerField()
+    texts = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["corpus", "word"], name="unique_corpus_word"),
+        ]
+        indexes = [
+            models.Index(fields=["corpus", "-count"]),
+        ]
+
+    @classmethod
+    def apply(cls, corpus_id: int, counts: np.ndarray, sign: int):
+        """
+        Прибавляет (sign=1) или вычитает (sign=-1) частоты слов одного текста [k, 2]; нулевые строки удаляются.
+        Изменения — атомарные UPDATE с F() (одно обновление на каждое различное значение частоты),
+        недостающие строки создаются с ignore_conflicts, поэтому параллельные сохранения текстов
+        с одинаковыми новыми словами не конфликтуют и не теряют приращения.
+        """
+        by_delta: Dict[int, List[int]] = {}
+        for word_id, count in counts:
+            by_delta.setdefault(int(count), []).append(int(word_id))
+        word_ids = sorted(word_id for ids in by_delta.values() for word_id in ids)
+        if sign > 0:
+            for i in range(0, len(word_ids), Word.LOOKUP_BATCH_SIZE):
+                cls.objects.bulk_create([
+                    cls(corpus_id=corpus_id, word_id=word_id, count=0, texts=0)
+                    for word_id in word_ids[i:i + Word.LOOKUP_BATCH_SIZE]
+                ], ignore_conflicts=True)
+        rows = cls.objects.filter(corpus_id=corpus_id)
+        for delta, ids in sorted(by_delta.items()):
+            for i in range(0, len(ids), Word.LOOKUP_BATCH_SIZE):
+                batch = rows.filter(word_id__in=ids[i:i + Word.LOOKUP_BATCH_SIZE])
+                if sign > 0:
+                    batch.update(count=F("count") + delta, texts=F("texts") + 1)
+                else:
+                    batch.update(count=Greatest(F("count") - delta, 0), texts=Greatest(F("texts") - 1, 0))
+        if sign < 0:
+            for i in range(0, len(word_ids), Word.LOOKUP_BATCH_SIZE):
+                rows.filter(word_id__in=word_ids[i:i + Word.LOOKUP_BATCH_SIZE], count=0).delete()
+
+
+class CorpusNgramCount(models.Model):
+    """
+    Частота биграммы или триграммы в корпусе (частоты слов — в CorpusWordCount).
+    key — id слов n-граммы через пробел; word1..word3 — те же id для отбора n-грамм, содержащих слово.
+    """
+    corpus = models.ForeignKey(Corpus, on_delete=models.CASCADE, related_name="ngram_counts")
+    n = models.PositiveSmallIntegerField()
+    key = models.CharField(max_length=40)
+    word1 = models.PositiveIntegerField()
+    word2 = models.PositiveIntegerField()
+    word3 = models.PositiveIntegerField(null=True)
+    count = models.PositiveIntegerField()
+
+    ORDERS = (2, 3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["corpus", "key"], name="unique_corpus_ngram"),
+        ]
+        indexes = [
+            models.Index(fields=["corpus", "n", "-count"]),
+        ]
+
+    @staticmethod
+    def make_key(words) -> str:
+        return " ".join(str(int(word)) for word in words)
+
+    @classmethod
+    def apply(cls, corpus_id: int, n: int, counts: np.ndarray, sign: int):
+        """
+        Прибавляет (sign=1) или вычитает (sign=-1) частоты n-грамм одного текста [k, n + 1]; нулевые строки удаляются.
+        Обновления устроены как в CorpusWordCount.apply.
+        """
+        by_delta: Dict[int, List[str]] = {}
+        words: Dict[str, List[int]] = {}
+        for row in counts:
+            key = cls.make_key(row[:n])
+            words[key] = [int(word) for word in row[:n]]
+            by_delta.setdefault(int(row[n]), []).append(key)
+        keys = sorted(words)
+        if sign > 0:
+            for i in range(0, len(keys), Word.LOOKUP_BATCH_SIZE):
+                cls.objects.bulk_create([
+                    cls(corpus_id=corpus_id, n=n, key=key, word1=words[key][0], word2=words[key][1],
+                        word3=words[key][2] if n > 2 else None, count=0)
+                    for key in keys[i:i + Word.LOOKUP_BATCH_SIZE]
+                ], ignore_conflicts=True)
+        rows = cls.objects.filter(corpus_id=corpus_id)
+        for delta, batch_keys in sorted(by_delta.items()):
+            for i in range(0, len(batch_keys), Word.LOOKUP_BATCH_SIZE):
+                batch = rows.filter(key__in=batch_keys[i:i + Word.LOOKUP_BATCH_SIZE])
+                if sign > 0:
+                    batch.update(count=F("count") + delta)
+                else:
+                    batch.update(count=Greatest(F("count") - delta, 0))
+        if sign < 0:
+            for i in range(0, len(keys), Word.LOOKUP_BATCH_SIZE):
+                rows.filter(key__in=keys[i:i + Word.LOOKUP_BATCH_SIZE], count=0).delete()
+
+
+class WordPosting(models.Model):
+    """
+    Позиционный индекс: номера слов (позиции) словоформы в тексте, разности в varint (см. postings).
+    corpus повторяет корпус текста, чтобы фильтр по корпусу шёл по индексу (word, corpus, text).
+    """
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name="postings")
+    text = models.ForeignKey(Text, on_delete=models.CASCADE, related_name="postings")
+    corpus = models.ForeignKey(Corpus, on_delete=models.CASCADE, related_name="postings")
+    count = models.PositiveIntegerField()
+    positions = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["word", "text"], name="unique_word_posting"),
+        ]
+        indexes = [
+            models.Index(fields=["word", "corpus", "text"]),
+        ]
+
+
+@receiver(pre_delete, sender=Text)
+def remove_text_from_corpus_stats(sender, instance, **kwargs):
+    """
+    Вычитает профиль удаляемого текста из частот корпуса (до каскадного удаления самого профиля).
+    """
+    TextProfile.remove_for(instance.id)
+
+
+@receiver(post_delete, sender=Text)
+def remove_text_from_search_index(sender, instance, **kwargs):
+    """
+    Удаляет текст из полнотекстового индекса (в т.ч. при удалении через QuerySet и каскадно с корпусом).
+    """
+    TextSearchRepository().remove_text(instance.id)
+
     
\ No newline at end of file
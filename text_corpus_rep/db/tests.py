@@ -1,3 +1,844 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, SimpleTestCase, override_settings
+
+from db.api.CorpusStatsRepository import CorpusStatsRepository
+from db.models import (
+    Corpus, CorpusNgramCount, CorpusWordCount, EmbeddingReduction, EmbeddingVersion, Text, TextAnnotation, TextEmbedding, Word,
+)
+from db.middleware import QueryStatsMiddleware, RequestMetricsMiddleware
+from db.api.AnnotationRepository import AnnotationRepository
+from db.api.asyncNeo4jRepository import AsyncNeo4jRepository, close_loop_drivers, share_drivers_in_loop
+from db.api.chunk_utils import iter_chunks
+from db.api.ConcordanceRepository import ConcordanceRepository
+from db.api.embedding_server import DynamicBatcher, EmbeddingServer
+from db.api.ontologyRepository import OntologyRepository
+from db.api.HybridSearchRepository import RRF_K, HybridSearchRepository
+from db.api.TextSearchRepository import TextSearchRepository
+from db.api.vector_store import VectorStore, build_store
+from db.api.postings import (
+    decode_offsets, decode_positions, decode_varints, encode_offsets, encode_positions, encode_varints,
+)
+from db.api.query_stats import query_stats
+from db.api.request_metrics import current_endpoint, current_timings
+from db.benchmarks import DEFAULT_SCALE, BenchmarkContext, Scenario, compare, parse_scale, run_scenario
+from db.benchmarks.runner import percentile
+
+
+def fake_embeddings(texts, batch_size=32, version=None, tokens=None):
+    """
+    Детерминированные эмбеддинги без загрузки модели: вектор зависит только от длины текста.
+    """
+    return np.array([[len(text), 1.0, 0.5, 0.25] for text in texts], dtype=np.float32)
+
+
+def fake_chunks(self, text):
+    yield {"text": text, "start": 0, "end": len(text), "tokens": len(text.split())}
+
+
+class ModelTestCase(TestCase):
+    """
+    Сохранение Text без модели эмбеддингов и токенизатора: чанк — весь текст, эмбеддинг — fake_embeddings.
+    """
+    def setUp(self):
+        for patcher in (
+            mock.patch("db.models.get_embeddings", fake_embeddings),
+            mock.patch("db.models.EmbeddingVersion.iter_chunks", fake_chunks),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.corpus = Corpus.objects.create(title="corpus", description="", genre="")
+
+    def create_text(self, text, corpus=None, title="text"):
+        return Text.objects.create(title=title, description="", text=text, corpus=corpus or self.corpus)
+
+
+class PostingsTests(SimpleTestCase):
+    def test_varints_round_trip(self):
+        values = [0, 1, 127, 128, 255, 16383, 16384, 2 ** 21, 2 ** 35 + 7]
+        blob = encode_varints(values)
+        self.assertEqual(len(encode_varints([127])), 1)
+        self.assertEqual(len(encode_varints([128])), 2)
+        self.assertEqual(decode_varints(blob).tolist(), values)
+        self.assertEqual(decode_varints(encode_varints([])).tolist(), [])
+
+    def test_positions_round_trip(self):
+        positions = [0, 3, 4, 200, 100000]
+        self.assertEqual(decode_positions(encode_positions(positions)).tolist(), positions)
+
+    def test_offsets_round_trip(self):
+        starts, ends = [0, 4, 6, 300], [3, 5, 10, 305]
+        decoded = decode_offsets(encode_offsets(starts, ends))
+        self.assertEqual(decoded[0].tolist(), starts)
+        self.assertEqual(decoded[1].tolist(), ends)
+
+
+
+class WordTokenizer:
+    """
+    Токенизатор для тестов чанкинга: токен — слово или знак препинания.
+    """
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        offsets = [(m.start(), m.end()) for m in re.finditer(r"\w+|[^\w\s]", text)]
+        return {"input_ids": list(range(len(offsets))), "offset_mapping": offsets}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+
+class IterChunksTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("db.api.chunk_utils.get_tokenizer", return_value=WordTokenizer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def chunks(self, text, max_tokens, overlap):
+        return list(iter_chunks(text, max_tokens=max_tokens, overlap=overlap))
+
+    def test_offsets_point_into_source_text(self):
+        text = "Первое предложение. Второе, чуть длиннее!  Третье?\n\nНовый абзац без точки"
+        for chunk in self.chunks(text, max_tokens=6, overlap=0):
+            self.assertEqual(text[chunk["start"]:chunk["end"]], chunk["text"])
+            self.assertLessEqual(chunk["tokens"], 6)
+
+    def test_sentences_are_packed_without_overlap(self):
+        text = "Раз два. Три четыре. Пять шесть."
+        chunks = self.chunks(text, max_tokens=6, overlap=0)
+        self.assertEqual([chunk["text"] for chunk in chunks], ["Раз два. Три четыре.", "Пять шесть."])
+
+    def test_neighbouring_chunks_overlap_by_whole_sentences(self):
+        text = "Раз два. Три четыре. Пять шесть. Семь восемь."
+        chunks = self.chunks(text, max_tokens=6, overlap=3)
+        self.assertEqual([chunk["text"] for chunk in chunks],
+                         ["Раз два. Три четыре.", "Три четыре. Пять шесть.", "Пять шесть. Семь восемь."])
+        for previous, following in zip(chunks, chunks[1:]):
+            self.assertLess(following["start"], previous["end"])
+
+    def test_long_sentence_is_split_into_overlapping_windows(self):
+        text = " ".join(f"w{i}" for i in range(10))
+        chunks = self.chunks(text, max_tokens=4, overlap=1)
+        self.assertEqual([chunk["text"] for chunk in chunks],
+                         ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"])
+        for chunk in chunks:
+            self.assertEqual(text[chunk["start"]:chunk["end"]], chunk["text"])
+
+    def test_max_tokens_is_clamped_to_model_budget(self):
+        text = " ".join(f"w{i}" for i in range(300))
+        chunks = self.chunks(text, max_tokens=10000, overlap=0)
+        self.assertGreater(len(chunks), 1)
+        # EMBEDDING_MAX_SEQ_LENGTH без двух служебных токенов WordTokenizer
+        self.assertTrue(all(chunk["tokens"] <= 126 for chunk in chunks))
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ChunkTextViewTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("db.api.chunk_utils.get_tokenizer", return_value=WordTokenizer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, **data):
+        return self.client.post("/api/embeddings/chunk/", data={"text": "Раз два. Три четыре.", **data},
+                                content_type="application/json")
+
+    def test_chunks(self):
+        response = self.post(max_tokens="3", overlap=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["chunks"], ["Раз два.", "Три четыре."])
+
+    def test_bad_params(self):
+        for params in ({"max_tokens": "many"}, {"max_tokens": -5}, {"max_tokens": 0}, {"overlap": -1},
+                       {"overlap": [1]}):
+            with self.subTest(params=params):
+                self.assertEqual(self.post(**params).status_code, 400)
+
+
+    def stream(self, query="", content_type="text/plain; charset=utf-8"):
+        return self.client.generic("POST", f"/api/embeddings/chunk/stream/{query}", "Раз два. Три четыре.".encode(),
+                                   content_type=content_type)
+
+    def test_stream(self):
+        response = self.stream("?max_tokens=3")
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["text"] for line in lines], ["Раз два.", "Три четыре."])
+
+    def test_stream_bad_params(self):
+        for query in ("?max_tokens=x", "?max_tokens=-5", "?overlap=-1"):
+            with self.subTest(query=query):
+                self.assertEqual(self.stream(query).status_code, 400)
+        self.assertEqual(self.stream(content_type="text/plain; charset=no-such-codec").status_code, 400)
+
+
+
+class BuildFtsQueryTests(SimpleTestCase):
+    def test_word_with_changed_stem_matches_word_or_stem(self):
+        self.assertEqual(TextSearchRepository.build_fts_query("story"), '("story"* OR "stori"*)')
+
+    def test_word_whose_stem_is_prefix_uses_stem(self):
+        self.assertEqual(TextSearchRepository.build_fts_query("Романы"), '"рома"*')
+
+    def test_phrase_is_exact_and_terms_are_joined_with_and(self):
+        self.assertEqual(
+            TextSearchRepository.build_fts_query('"Ёлка стоит" дом'),
+            '"елка стоит" AND "дом"*',
+        )
+
+    def test_no_words(self):
+        self.assertEqual(TextSearchRepository.build_fts_query("..."), "")
+
+
+class TextSearchTests(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 index is SQLite-only")
+
+    def test_english_words_with_changed_stems_are_found(self):
+        text = self.create_text("A short story about the city and happy people")
+        self.create_text("Совсем другой текст")
+        for query in ("story", "city", "happy", "Story"):
+            with self.subTest(query=query):
+                hits = TextSearchRepository().search(query)
+                self.assertEqual([hit["id"] for hit in hits], [text.id])
+
+    def test_russian_word_forms_are_found_by_stem(self):
+        text = self.create_text("Он читал романы по вечерам")
+        hits = TextSearchRepository().search("роман")
+        self.assertEqual([hit["id"] for hit in hits], [text.id])
+
+    @mock.patch("db.api.TextSearchRepository.MAX_LIMIT", 2)
+    def test_limit_is_capped(self):
+        for _ in range(3):
+            self.create_text("Большой город")
+        self.assertEqual(len(TextSearchRepository().search("город", limit=10 ** 6)), 2)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class SearchTextViewTests(SimpleTestCase):
+    def test_bad_limit(self):
+        for limit in ("ten", "0", "-1"):
+            with self.subTest(limit=limit):
+                response = self.client.get("/api/search/text/", {"q": "город", "limit": limit})
+                self.assertEqual(response.status_code, 400)
+
+
+class AnnotationStatusTests(ModelTestCase):
+    def test_only_confirmed_links_are_returned(self):
+        text = self.create_text("Москва и Петербург")
+        for status, start, end in (("manual", 0, 6), ("accepted", 9, 18), ("proposed", 0, 6), ("rejected", 9, 18)):
+            TextAnnotation.objects.create(text=text, start=start, end=end, fragment=text.text[start:end],
+                                          object_uri=f"uri:{status}", status=status)
+        repo = AnnotationRepository()
+        self.assertEqual(sorted(obj["object_uri"] for obj in repo.get_text_objects(text.id)),
+                         ["uri:accepted", "uri:manual"])
+        self.assertEqual(repo.get_object_texts("uri:proposed"), [])
+        self.assertEqual(len(repo.get_object_texts("uri:proposed", statuses=("proposed",))), 1)
+
+
+class OntologyBatchTests(SimpleTestCase):
+    def test_malformed_operations_are_rejected(self):
+        repo = OntologyRepository.__new__(OntologyRepository)
+        tx = mock.Mock()
+        for op in ("create_class", {"op": "create_class", "parent_uri": ["c1"]},
+                   {"op": "add_class_attribute", "class_uri": {"id": "c1"}, "attr_name": "a"},
+                   {"op": "create_class", "id": ["c1"], "title": "A"}):
+            with self.subTest(op=op), self.assertRaises(ValueError):
+                repo._apply_batch_tx(tx, [op])
+        tx.run.assert_not_called()
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class AnnotationViewTests(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("db.views.OntologyRepository")
+        self.ontology = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_create_for_unknown_text(self):
+        response = self.client.post("/api/annotation/create/", data={"text_id": 10 ** 6, "annotations": []},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+        self.ontology.close.assert_called_once()
+        response = self.client.post("/api/annotation/create/", data={"text_id": "abc", "annotations": []},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def review(self, **data):
+        return self.client.post("/api/annotation/review/", data={"status": "accepted", **data},
+                                content_type="application/json")
+
+    def test_review(self):
+        text = self.create_text("Москва и Петербург")
+        annotation = TextAnnotation.objects.create(text=text, start=0, end=3, fragment="Мос", object_uri="uri:msk",
+                                                   status="proposed")
+        self.assertEqual(self.review(id=10 ** 6).status_code, 404)
+        self.assertEqual(self.review(id="abc").status_code, 400)
+        for span in ({"start": "0", "end": 6}, {"start": 0}, {"start": 5, "end": 2}, {"start": 0, "end": 100}):
+            with self.subTest(span=span):
+                self.assertEqual(self.review(id=annotation.id, **span).status_code, 400)
+        annotation.refresh_from_db()
+        self.assertEqual(annotation.status, "proposed")
+        response = self.review(id=annotation.id, start=0, end=6)
+        self.assertEqual(response.status_code, 200)
+        annotation.refresh_from_db()
+        self.assertEqual((annotation.status, annotation.fragment), ("accepted", "Москва"))
+
+
+class HybridRerankTests(ModelTestCase):
+    def test_rerank_uses_stored_chunk_embeddings(self):
+        short = self.create_text("short")
+        long = self.create_text("a much longer text")
+        version = EmbeddingVersion.get_active()
+        query = fake_embeddings(["a much longer text"])[0]
+        with mock.patch("db.api.HybridSearchRepository.get_embeddings") as encode:
+            scores = HybridSearchRepository.rerank(query, [short.id, long.id], version)
+        encode.assert_not_called()
+        self.assertEqual(set(scores), {short.id, long.id})
+        self.assertAlmostEqual(scores[long.id], 1.0, places=5)
+        self.assertLess(scores[short.id], scores[long.id])
+
+
+class FuseTests(SimpleTestCase):
+    lexical = [{"id": 1, "score": 10.0}, {"id": 2, "score": 5.0}]
+    semantic = [{"id": 2, "score": 0.9}, {"id": 3, "score": 0.1}]
+
+    def test_rrf(self):
+        fused = HybridSearchRepository.fuse(self.lexical, self.semantic, "rrf")
+        self.assertAlmostEqual(fused[1], 1 / (RRF_K + 1))
+        self.assertAlmostEqual(fused[2], 1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+        self.assertAlmostEqual(fused[3], 1 / (RRF_K + 2))
+
+    def test_weighted(self):
+        fused = HybridSearchRepository.fuse(self.lexical, self.semantic, "weighted", alpha=0.25)
+        self.assertEqual(fused, {1: 0.75, 2: 0.25, 3: 0.0})
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            HybridSearchRepository.fuse(self.lexical, self.semantic, "max")
+
+
+
+class VectorStoreScoringTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        cls.matrix = rng.normal(size=(300, 16)).astype(np.float32)
+        cls.matrix /= np.linalg.norm(cls.matrix, axis=1, keepdims=True)
+        cls.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.directory.name, "store")
+        build_store(path, "test", np.arange(300) + 1000, cls.matrix, datetime.datetime.now(), subvectors=4)
+        cls.store = VectorStore(path)
+        cls.query = cls.matrix[7]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_sq_scores_equal_dot_product_with_dequantized_vectors(self):
+        decoded = self.store.sq_offset + self.store.sq_scale * (np.asarray(self.store.sq_codes, dtype=np.float32) + 128)
+        np.testing.assert_allclose(self.store.sq_scores(self.query), decoded @ self.query, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(self.store.sq_scores(self.query), self.matrix @ self.query, atol=0.05)
+
+    def test_pq_scores_equal_dot_product_with_reconstructed_vectors(self):
+        codebooks, codes = self.store.pq_codebooks, np.asarray(self.store.pq_codes)
+        reconstructed = np.concatenate([codebooks[m][codes[:, m]] for m in range(codebooks.shape[0])], axis=1)
+        np.testing.assert_allclose(self.store.pq_scores(self.query), reconstructed @ self.query, rtol=1e-4, atol=1e-4)
+
+    def test_rows_subset_scores(self):
+        rows = np.array([3, 7, 11])
+        np.testing.assert_allclose(self.store.sq_scores(self.query, rows), self.store.sq_scores(self.query)[rows])
+        np.testing.assert_allclose(self.store.pq_scores(self.query, rows), self.store.pq_scores(self.query)[rows])
+
+    def test_search_reranks_with_exact_scores(self):
+        exact = self.matrix @ self.query
+        expected = [int(i) + 1000 for i in np.argsort(-exact)[:5]]
+        for method in ("sq", "pq"):
+            with self.subTest(method=method):
+                hits = self.store.search(self.query, 5, method=method, rerank=100)
+                self.assertEqual([text_id for text_id, _ in hits], expected)
+                self.assertAlmostEqual(hits[0][1], 1.0, places=5)
+
+    def test_search_filters_text_ids_and_excluded_ids(self):
+        odd = [1000 + i for i in range(1, 300, 2)]
+        hits = self.store.search(self.query, 10, text_ids=odd, exclude_ids={1007}, method="sq", rerank=50)
+        self.assertTrue(all((text_id - 1000) % 2 == 1 for text_id, _ in hits))
+        self.assertNotIn(1007, [text_id for text_id, _ in hits])
+
+
+class StoreSearchTests(ModelTestCase):
+    def test_text_moved_to_another_corpus_is_found_there(self):
+        other = Corpus.objects.create(title="other", description="", genre="")
+        moved = self.create_text("a" * 10)
+        stays = self.create_text("a" * 12)
+        self.create_text("a" * 30, corpus=other)
+        version = EmbeddingVersion.get_active()
+        rows = TextEmbedding.objects.filter(version=version).order_by("text_id").values_list("text_id", "embedding")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "store")
+        build_store(path, version.name, np.array([row[0] for row in rows]), np.array([row[1] for row in rows]),
+                    datetime.datetime.now(datetime.timezone.utc), subvectors=2)
+        store = VectorStore(path)
+
+        moved.corpus = other
+        moved.save()
+        # перенос не меняет вектор: текст остаётся в снимке хранилища, а не среди свежих векторов
+        self.assertLessEqual(TextEmbedding.objects.get(text=moved, version=version).updated_at, store.built_at)
+
+        query = fake_embeddings(["a" * 10])[0]
+        for corpus, expected in ((other, moved.id), (self.corpus, stays.id)):
+            texts = TextEmbedding.objects.filter(version=version, text__corpus_id=corpus.id)
+            hits = HybridSearchRepository.store_search(query, texts, store, corpus_id=corpus.id, limit=2)
+            with self.subTest(corpus=corpus.title):
+                self.assertEqual(hits[0]["id"], expected)
+                self.assertEqual(len(hits), 2 if corpus == other else 1)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class SearchHybridViewTests(SimpleTestCase):
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"q": "x", "fusion": "max"}, {"q": "x", "limit": "ten"}, {"q": "x", "alpha": "half"},
+                       {"q": "x", "limit": "0"}, {"q": "x", "fusion": "weighted", "alpha": "2"},
+                       {"q": "x", "corpus_id": "abc"}, {"q": "x", "corpus_id": "-1"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/search/hybrid/", params).status_code, 400)
+
+
+class CorpusWordCountTests(ModelTestCase):
+    def word_counts(self, corpus):
+        return {
+            form: (count, texts)
+            for form, count, texts in CorpusWordCount.objects.filter(corpus=corpus)
+            .values_list("word__form", "count", "texts")
+        }
+
+    def test_save_increments_counts(self):
+        self.create_text("кот и кот")
+        self.create_text("кот и пёс")
+        self.assertEqual(self.word_counts(self.corpus), {"кот": (3, 2), "и": (2, 2), "пес": (1, 1)})
+
+    def test_edit_replaces_previous_counts(self):
+        text = self.create_text("кот и кот")
+        self.create_text("кот")
+        text.text = "пёс"
+        text.save()
+        self.assertEqual(self.word_counts(self.corpus), {"кот": (1, 1), "пес": (1, 1)})
+
+    def test_move_to_another_corpus(self):
+        other = Corpus.objects.create(title="other", description="", genre="")
+        text = self.create_text("кот и пёс")
+        self.create_text("кот")
+        text.corpus = other
+        text.save()
+        self.assertEqual(self.word_counts(self.corpus), {"кот": (1, 1)})
+        self.assertEqual(self.word_counts(other), {"кот": (1, 1), "и": (1, 1), "пес": (1, 1)})
+
+    def test_delete_decrements_and_removes_empty_rows(self):
+        text = self.create_text("кот и пёс")
+        self.create_text("кот")
+        text.delete()
+        self.assertEqual(self.word_counts(self.corpus), {"кот": (1, 1)})
+
+    def test_existing_zero_row_is_incremented(self):
+        # Строка, уже созданная параллельной транзакцией, не мешает добавлению
+        word = Word.objects.create(form="кот")
+        CorpusWordCount.objects.create(corpus=self.corpus, word=word, count=0, texts=0)
+        CorpusWordCount.apply(self.corpus.id, np.array([[word.id, 2]]), 1)
+        self.assertEqual(self.word_counts(self.corpus), {"кот": (2, 1)})
+
+
+class CorpusNgramsTests(ModelTestCase):
+    def ngrams(self, corpus, n=2, contains=None):
+        rows = CorpusStatsRepository().ngrams(corpus.id, n=n, contains=contains)["ngrams"]
+        counts = [row["count"] for row in rows]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        return {row["ngram"]: row["count"] for row in rows}
+
+    def test_counts_follow_edits_moves_and_deletes(self):
+        other = Corpus.objects.create(title="other", description="", genre="")
+        first = self.create_text("кот и пёс. кот и пёс")
+        second = self.create_text("кот и кот")
+        self.assertEqual(self.ngrams(self.corpus), {"кот и": 3, "и пес": 2, "и кот": 1})
+        self.assertEqual(self.ngrams(self.corpus, n=3), {"кот и пес": 2, "кот и кот": 1})
+        self.assertEqual(self.ngrams(self.corpus, n=1, contains="пёс"), {"пес": 2})
+        self.assertEqual(self.ngrams(self.corpus, contains="пёс"), {"и пес": 2})
+
+        first.corpus = other
+        first.save()
+        self.assertEqual(self.ngrams(self.corpus), {"кот и": 1, "и кот": 1})
+        self.assertEqual(self.ngrams(other), {"кот и": 2, "и пес": 2})
+
+        second.text = "пёс и кот"
+        second.save()
+        self.assertEqual(self.ngrams(self.corpus), {"пес и": 1, "и кот": 1})
+        second.delete()
+        self.assertEqual(self.ngrams(self.corpus), {})
+        self.assertFalse(CorpusNgramCount.objects.filter(corpus=self.corpus).exists())
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class CorpusStatsViewTests(ModelTestCase):
+    def test_invalid_parameters_are_rejected(self):
+        cases = (
+            ("/api/corpus/stats/", {"bins": "0"}),
+            ("/api/corpus/stats/", {"bins": "x"}),
+            ("/api/corpus/stats/frequency/", {"offset": "-1"}),
+            ("/api/corpus/stats/frequency/", {"limit": "0"}),
+        )
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, {"id": self.corpus.id, **params})
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_parameters(self):
+        self.create_text("кот и пёс")
+        response = self.client.get("/api/corpus/stats/frequency/", {"id": self.corpus.id, "limit": 1, "offset": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["words"]), 1)
+
+
+class TextSaveTests(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.text = self.create_text("кот и пёс")
+        self.other = EmbeddingVersion.objects.create(name="other", model_name="other", status="building")
+        TextEmbedding.objects.create(text=self.text, version=self.other, embedding=[1.0, 0.0])
+
+    def test_metadata_change_keeps_vectors_and_skips_encoding(self):
+        with mock.patch("db.models.get_embeddings", side_effect=fake_embeddings) as encode:
+            self.text.title = "новое название"
+            self.text.save()
+        encode.assert_not_called()
+        self.assertTrue(TextEmbedding.objects.filter(text=self.text, version=self.other).exists())
+
+    def test_content_change_reencodes_and_drops_other_versions(self):
+        with mock.patch("db.models.get_embeddings", side_effect=fake_embeddings) as encode:
+            self.text.text = "совсем другой текст"
+            self.text.save()
+        encode.assert_called_once()
+        self.assertFalse(TextEmbedding.objects.filter(text=self.text, version=self.other).exists())
+        self.assertEqual(self.text.embedding[0], len("совсем другой текст"))
+
+
+class ReducedCandidatesTests(ModelTestCase):
+    def test_packed_reduced_vectors_select_nearest(self):
+        version = EmbeddingVersion.get_active()
+        reduction = EmbeddingReduction.objects.create(version=version, method="truncate", dimension=2, active=True)
+        near = self.create_text("x" * 40)
+        self.create_text("y")
+        row = TextEmbedding.objects.get(text=near, version=version)
+        self.assertEqual(bytes(row.reduced), reduction.pack([row.embedding])[0])
+
+        query = fake_embeddings(["z" * 40])[0]
+        texts = TextEmbedding.objects.filter(version=version)
+        self.assertEqual(HybridSearchRepository.reduced_candidates(query, texts, reduction, 1), [near.id])
+
+
+class ConcordanceTests(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.texts = [
+            self.create_text("Чёрный кот спал. Кот проснулся, и чёрный кот ушёл."),
+            self.create_text("Здесь нет нужного слова."),
+            self.create_text("Черный кот вернулся домой."),
+        ]
+
+    def test_phrase_matches_consecutive_words(self):
+        result = ConcordanceRepository().search("чёрный кот", window=1, limit=10)
+        self.assertEqual(result["terms"], ["черный", "кот"])
+        self.assertEqual([(line["text_id"], line["keyword"]) for line in result["lines"]], [
+            (self.texts[0].id, "Чёрный кот"),
+            (self.texts[0].id, "чёрный кот"),
+            (self.texts[2].id, "Черный кот"),
+        ])
+        self.assertEqual(result["lines"][1]["left"], "и")
+        self.assertEqual(result["lines"][1]["right"], "ушёл")
+        self.assertIsNone(result["next_cursor"])
+
+    def test_words_out_of_order_do_not_match(self):
+        self.assertEqual(ConcordanceRepository().search("кот чёрный")["lines"], [])
+
+    def test_unknown_word(self):
+        result = ConcordanceRepository().search("собака")
+        self.assertEqual((result["lines"], result["total"]), ([], 0))
+
+    def test_single_word_total_and_corpus_filter(self):
+        other = Corpus.objects.create(title="other", description="", genre="")
+        self.create_text("кот", corpus=other)
+        self.assertEqual(ConcordanceRepository().search("кот")["total"], 5)
+        self.assertEqual(ConcordanceRepository().search("кот", corpus_id=other.id)["total"], 1)
+
+    def test_cursor_pagination_returns_every_hit_once(self):
+        repo = ConcordanceRepository()
+        everything = [(line["text_id"], line["position"]) for line in repo.search("кот", limit=100)["lines"]]
+        self.assertEqual(len(everything), 4)
+        pages, cursor = [], None
+        while True:
+            result = repo.search("кот", limit=1, cursor=cursor)
+            pages.extend((line["text_id"], line["position"]) for line in result["lines"])
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(pages, everything)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            ConcordanceRepository().search("кот", cursor="abc")
+
+
+class QueryStatsMiddlewareTests(SimpleTestCase):
+    def test_streaming_response_keeps_endpoint_until_closed(self):
+        middleware = QueryStatsMiddleware(lambda request: None)
+        seen = []
+
+        def body():
+            seen.append(current_endpoint.get())
+            yield b"line\n"
+
+        current_endpoint.set("exportOntology")
+        response = middleware.process_response(RequestFactory().get("/"), StreamingHttpResponse(body()))
+        list(response)
+        self.assertEqual(seen, ["exportOntology"])
+        response.close()
+        self.assertEqual(current_endpoint.get(), "-")
+
+    def test_plain_response_resets_endpoint(self):
+        middleware = QueryStatsMiddleware(lambda request: None)
+        current_endpoint.set("getOntology")
+        middleware.process_response(RequestFactory().get("/"), HttpResponse())
+        self.assertEqual(current_endpoint.get(), "-")
+
+
+class RequestMetricsMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("db.middleware.request_metrics")
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = RequestMetricsMiddleware(lambda request: None)
+        self.request = RequestFactory().get("/")
+
+    def test_streaming_response_is_observed_when_closed(self):
+        seen = []
+
+        def body():
+            current_timings.get().add("neo4j", 0.5)
+            seen.append(current_timings.get())
+            yield b"line\n"
+
+        self.middleware.process_request(self.request)
+        response = self.middleware.process_response(self.request, StreamingHttpResponse(body()))
+        self.metrics.observe_request.assert_not_called()
+        list(response)
+        response.close()
+        self.assertEqual(seen, [self.request.metrics_timings])
+        self.assertIsNone(current_timings.get())
+        self.metrics.observe_request.assert_called_once()
+        endpoint, method, status, timings, total = self.metrics.observe_request.call_args.args
+        self.assertEqual((endpoint, method, status), ("unmatched", "GET", 200))
+        self.assertEqual(timings.stages["neo4j"], [1, 0.5])
+
+    def test_plain_response_is_observed_immediately(self):
+        self.middleware.process_request(self.request)
+        self.middleware.process_response(self.request, HttpResponse())
+        self.metrics.observe_request.assert_called_once()
+        self.assertIsNone(current_timings.get())
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class QueryMetricsViewTests(SimpleTestCase):
+    def setUp(self):
+        query_stats.reset()
+        query_stats.record("MATCH (n) RETURN n", {}, 1.0, 1)
+        self.addCleanup(query_stats.reset)
+
+    def test_get_does_not_reset(self):
+        self.client.get("/api/metrics/queries/", {"reset": "1"})
+        self.assertTrue(query_stats.snapshot()["endpoints"])
+
+    def test_post_resets(self):
+        response = self.client.post("/api/metrics/queries/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["endpoints"])
+        self.assertFalse(query_stats.snapshot()["endpoints"])
+
+
+class FakeEncoder:
+    """
+    Модель для тестов батчера: эмбеддинг текста "t<i>" — [i, 1], размеры батчей запоминаются.
+    """
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(len(texts))
+        return np.array([[float(text[1:]), 1.0] for text in texts])
+
+
+class DynamicBatcherTests(SimpleTestCase):
+    def test_requests_are_coalesced_and_split_back(self):
+        model = FakeEncoder()
+        batcher = DynamicBatcher(model, max_batch_size=4, max_wait_ms=500)
+        requests = [["t1", "t2"], ["t3", "t4"], ["t5"]]
+        results = [None] * len(requests)
+
+        def send(i):
+            results[i] = batcher.encode(requests[i])
+
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(len(requests))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(model.batches, [4, 1])
+        for texts, embeddings in zip(requests, results):
+            self.assertEqual(embeddings[:, 0].tolist(), [float(text[1:]) for text in texts])
+        self.assertEqual(batcher.snapshot()["requests"], 3)
+
+    def test_normalize_per_request(self):
+        batcher = DynamicBatcher(FakeEncoder(), max_batch_size=4, max_wait_ms=1)
+        np.testing.assert_allclose(np.linalg.norm(batcher.encode(["t3"], normalize=True), axis=1), [1.0])
+        self.assertEqual(batcher.encode(["t3"]).tolist(), [[3.0, 1.0]])
+
+
+class EmbeddingServerTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("db.api.embedding_server.get_model", return_value=FakeEncoder())
+        self.get_model = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = EmbeddingServer(("127.0.0.1", 0))
+        self.addCleanup(self.server.server_close)
+
+    def test_only_models_of_embedding_versions_are_loaded(self):
+        with self.assertRaises(ValueError):
+            self.server.get_batcher("someone/arbitrary-model", "torch")
+        self.get_model.assert_not_called()
+        version = EmbeddingVersion.objects.create(name="test-version", model_name="test/model", backend="torch")
+        batcher = self.server.get_batcher(version.model_name, version.backend)
+        self.assertIs(self.server.get_batcher(version.model_name, version.backend), batcher)
+        self.get_model.assert_called_once_with("torch", "test/model")
+
+
+class AsyncDriverTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("db.api.asyncNeo4jRepository.AsyncGraphDatabase.driver",
+                             side_effect=lambda *args, **kwargs: mock.AsyncMock())
+        self.create_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_per_request_driver_in_unregistered_loop(self):
+        async with AsyncNeo4jRepository("bolt://x", "u", "p") as repo:
+            driver = repo.driver
+        driver.close.assert_awaited_once()
+        async with AsyncNeo4jRepository("bolt://x", "u", "p") as repo:
+            self.assertIsNot(repo.driver, driver)
+
+    async def test_shared_driver_in_long_lived_loop(self):
+        share_drivers_in_loop()
+        async with AsyncNeo4jRepository("bolt://x", "u", "p") as first:
+            pass
+        async with AsyncNeo4jRepository("bolt://x", "u", "p") as second:
+            pass
+        self.assertIs(first.driver, second.driver)
+        self.assertEqual(self.create_driver.call_count, 1)
+        first.driver.close.assert_not_awaited()
+        await close_loop_drivers()
+        first.driver.close.assert_awaited_once()
+
+    async def test_asgi_lifespan_closes_shared_drivers(self):
+        from core.asgi import application
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+            if message["type"] == "lifespan.startup.complete":
+                async with AsyncNeo4jRepository("bolt://x", "u", "p") as repo:
+                    self.driver = repo.driver
+
+        await application({"type": "lifespan"}, receive, send)
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.driver.close.assert_awaited_once()
+
+
+class BenchmarkRunnerTests(SimpleTestCase):
+    def results(self, scale=None, **medians):
+        return {
+            "environment": {"scale": scale or {"texts": 200}},
+            "scenarios": {name: {"median": median} for name, median in medians.items()},
+        }
+
+    def test_compare_statuses(self):
+        baseline = self.results(slow=1.0, fast=1.0, same=1.0, zero=0.0)
+        current = self.results(slow=1.5, fast=0.5, same=1.1, zero=0.1, added=1.0)
+        statuses = {row["scenario"]: row["status"] for row in compare(current, baseline, tolerance=0.2)}
+        self.assertEqual(statuses, {"slow": "regression", "fast": "improvement", "same": "ok", "zero": "ok",
+                                    "added": "new"})
+
+    def test_compare_different_scale_is_incomparable(self):
+        rows = compare(self.results({"texts": 400}, a=3.0, b=1.0), self.results({"texts": 200}, a=1.0))
+        self.assertEqual([(row["scenario"], row["status"]) for row in rows], [("a", "incomparable"), ("b", "new")])
+        self.assertAlmostEqual(rows[0]["ratio"], 3.0)
+
+    def test_percentile(self):
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(values, 0.0), 1.0)
+        self.assertEqual(percentile(values, 0.5), 3.0)
+        self.assertEqual(percentile(values, 0.95), 5.0)
+        self.assertEqual(percentile([7.0], 0.95), 7.0)
+
+    def test_setup_and_teardown_per_repeat(self):
+        calls = []
+        scenario = Scenario(
+            "s", "", run=lambda ctx, state: calls.append(("run", state)) or 3,
+            setup=lambda ctx: calls.append("setup") or len(calls),
+            teardown=lambda ctx, state: calls.append(("teardown", state)),
+        )
+        result = run_scenario(scenario, BenchmarkContext(0, {}), repeats=2, warmup=1)
+        self.assertEqual(calls.count("setup"), 3)
+        self.assertEqual([call[1] for call in calls if call[0] == "teardown"],
+                         [call[1] for call in calls if call[0] == "run"])
+        self.assertEqual((result["repeats"], result["ops"], len(result["timings"])), (2, 3, 2))
+
+    def test_shared_state_is_torn_down_once_even_on_failure(self):
+        calls = []
+
+        def run(ctx, state):
+            calls.append("run")
+            raise RuntimeError("boom")
+
+        scenario = Scenario("s", "", run=run, setup=lambda ctx: "state",
+                            teardown=lambda ctx, state: calls.append(("teardown", state)), per_repeat=False)
+        with self.assertRaises(RuntimeError):
+            run_scenario(scenario, BenchmarkContext(0, {}), repeats=3)
+        self.assertEqual(calls, ["run", ("teardown", "state")])
+
+    def test_parse_scale(self):
+        scale = parse_scale(["texts=10", "words=5"])
+        self.assertEqual((scale["texts"], scale["words"], scale["batch"]), (10, 5, DEFAULT_SCALE["batch"]))
+        for item in ("unknown=1", "texts=ten", "texts", "texts=-1"):
+            with self.subTest(item=item), self.assertRaises(ValueError):
+                parse_scale([item])
+
+    def test_command_rejects_bad_set(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark", "--set", "texts=x")
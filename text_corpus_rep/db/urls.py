@@ -1,5 +1,6 @@
 from django.urls import path
 
+from db import async_views
 from db.views import (
     getTest,
     postTest,
@@ -10,12 +11,24 @@ from db.views import (
     getCorpus,
     deleteCorpus,
 
+    getCorpusStats,
+    getCorpusFrequency,
+    getCorpusNgrams,
+    getCorpusConcordance,
+    getConcordance,
+
     createText,
     updateText,
     getText,
     deleteText,
 
+    searchText,
+    searchHybrid,
+
     getOntology,
+    exportOntology,
+    getNodesBatch,
+    applyOntologyBatch,
     getClass,
     createClass,
     deleteClass,
@@ -34,9 +47,20 @@ from db.views import (
     updateObject,
     deleteObject,
 
+    createAnnotations,
+    deleteAnnotation,
+    getAnnotationProposals,
+    reviewAnnotation,
+    getTextObjects,
+    getObjectTexts,
+
     build_embeddings,
     compare_embeddings,
     chunk_text,
+    chunk_text_stream,
+
+    getMetrics,
+    getQueryMetrics,
 )
 
 urlpatterns = [
@@ -50,14 +74,30 @@ urlpatterns = [
     path('corpus/', getCorpus, name='getCorpus'),
     path('corpus/delete/', deleteCorpus, name='deleteCorpus'),
 
+    # Corpus statistics
+    path('corpus/stats/', getCorpusStats, name='getCorpusStats'),
+    path('corpus/stats/frequency/', getCorpusFrequency, name='getCorpusFrequency'),
+    path('corpus/stats/ngrams/', getCorpusNgrams, name='getCorpusNgrams'),
+    path('corpus/stats/concordance/', getCorpusConcordance, name='getCorpusConcordance'),
+
+    # Concordance
+    path('concordance/', getConcordance, name='getConcordance'),
+
     # Text
     path('text/create/', createText, name='createText'),
     path('text/update/', updateText, name='updateText'),
     path('text/', getText, name='getText'),
     path('text/delete/', deleteText, name='deleteText'),
 
+    # Search
+    path('search/text/', searchText, name='searchText'),
+    path('search/hybrid/', searchHybrid, name='searchHybrid'),
+
     # Ontology
     path('ontology/', getOntology, name='getOntology'),
+    path('ontology/export/', exportOntology, name='exportOntology'),
+    path('ontology/nodes/batch/', getNodesBatch, name='getNodesBatch'),
+    path('ontology/batch/', applyOntologyBatch, name='applyOntologyBatch'),
     path('ontology/class/', getClass, name='getClass'),
     path('ontology/class/create/', createClass, name='createClass'),
     path('ontology/class/delete/', deleteClass, name='deleteClass'),
@@ -75,9 +115,33 @@ urlpatterns = [
     path('ontology/object/', getObject, name='getObject'),
     path('ontology/object/update/', updateObject, name='updateObject'),
     path('ontology/object/delete/', deleteObject, name='deleteObject'),
+    path('ontology/object/texts/', getObjectTexts, name='getObjectTexts'),
+
+    # Ontology (async, для ASGI)
+    path('async/ontology/', async_views.getOntology, name='getOntologyAsync'),
+    path('async/ontology/class/', async_views.getClass, name='getClassAsync'),
+    path('async/ontology/class/overview/', async_views.getClassOverview, name='getClassOverviewAsync'),
+    path('async/ontology/signature/', async_views.getSignature, name='getSignatureAsync'),
+    path('async/ontology/class/parents/', async_views.getClassParents, name='getClassParentsAsync'),
+    path('async/ontology/class/children/', async_views.getClassChildren, name='getClassChildrenAsync'),
+    path('async/ontology/class/objects/', async_views.getClassObjects, name='getClassObjectsAsync'),
+    path('async/ontology/object/', async_views.getObject, name='getObjectAsync'),
+    path('async/ontology/nodes/batch/', async_views.getNodesBatch, name='getNodesBatchAsync'),
+
+    # Annotation
+    path('annotation/create/', createAnnotations, name='createAnnotations'),
+    path('annotation/delete/', deleteAnnotation, name='deleteAnnotation'),
+    path('annotation/proposals/', getAnnotationProposals, name='getAnnotationProposals'),
+    path('annotation/review/', reviewAnnotation, name='reviewAnnotation'),
+    path('text/objects/', getTextObjects, name='getTextObjects'),
 
     # Embedding
     path('embeddings/build/', build_embeddings, name='build_embeddings'),
     path('embeddings/compare/', compare_embeddings, name='compare_embeddings'),
     path('embeddings/chunk/', chunk_text, name='chunk_text'),
+    path('embeddings/chunk/stream/', chunk_text_stream, name='chunk_text_stream'),
+
+    # Metrics
+    path('metrics/', getMetrics, name='getMetrics'),
+    path('metrics/queries/', getQueryMetrics, name='getQueryMetrics'),
 ]
\ No newline at end of file
@@ -4,16 +4,27 @@ from django.http import StreamingHttpResponse, HttpResponseRedirect, HttpRespons
 from django.forms.models import model_to_dict
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+import codecs
 import json
 import datetime
 from django.db.models import Q
 
 from .api.CorpusRepository import CorpusRepository
+from .api.CorpusStatsRepository import CorpusStatsRepository
+from .api.ConcordanceRepository import ConcordanceRepository
 from .api.TextRepository import TextRepository
+from .api.TextSearchRepository import TextSearchRepository
+from .api.HybridSearchRepository import FUSION_METHODS, HybridSearchRepository
+from .api.AnnotationRepository import AnnotationRepository
 from .api.embedding_utils import get_embeddings, cos_compare, get_chunks
+from .api.chunk_utils import iter_chunks, iter_decoded
 from .api.ontologyRepository import OntologyRepository
+from .api.ontology_formats import EXPORT_FORMATS, serialize
+from .api.ontology_cache import schema_cache
+from .api.query_stats import query_stats
+from .api.request_metrics import request_metrics
 from.onthology_namespace import *
-from .models import Test
+from .models import Test, Corpus, EmbeddingVersion, Text, TextAnnotation
 from core.settings import *
 
 # API IMPORTS
@@ -90,6 +101,129 @@ def deleteCorpus(request):
     result = repo.delete_corpus(corpus_id)
     return Response(result)
 
+# -----------------------
+#  CORPUS STATISTICS API
+# -----------------------
+
+def _stats_corpus_id(request):
+    """
+    id корпуса из параметра id или None, если параметр не задан или корпуса нет.
+    """
+    corpus_id = request.GET.get("id")
+    if not corpus_id or not corpus_id.isdigit() or not Corpus.objects.filter(id=corpus_id).exists():
+        return None
+    return int(corpus_id)
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getCorpusStats(request):
+    """
+    Сводка корпуса: число текстов, слов, словоформ, type/token ratio, распределение длины текстов.
+    Параметры: id, bins — число интервалов гистограммы длины (по умолчанию 10).
+    """
+    corpus_id = _stats_corpus_id(request)
+    if corpus_id is None:
+        return HttpResponse(status=400)
+    repo = CorpusStatsRepository()
+    try:
+        result = repo.summary(corpus_id, bins=int(request.GET.get("bins", 10)))
+    except ValueError:
+        return HttpResponse(status=400)
+    return Response(result)
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getCorpusFrequency(request):
+    """
+    Частотный словарь корпуса.
+    Параметры: id, words — словоформы через запятую (иначе самые частые), limit, offset.
+    """
+    corpus_id = _stats_corpus_id(request)
+    if corpus_id is None:
+        return HttpResponse(status=400)
+    words = [word.strip() for word in request.GET.get("words", "").split(",") if word.strip()]
+    repo = CorpusStatsRepository()
+    try:
+        result = repo.frequency(
+            corpus_id,
+            words=words or None,
+            limit=int(request.GET.get("limit", 100)),
+            offset=int(request.GET.get("offset", 0)),
+        )
+    except ValueError:
+        return HttpResponse(status=400)
+    return Response(result)
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getCorpusNgrams(request):
+    """
+    Самые частые n-граммы корпуса.
+    Параметры: id, n (1–3, по умолчанию 2), contains — только n-граммы с этим словом, limit.
+    """
+    corpus_id = _stats_corpus_id(request)
+    if corpus_id is None:
+        return HttpResponse(status=400)
+    repo = CorpusStatsRepository()
+    try:
+        result = repo.ngrams(
+            corpus_id,
+            n=int(request.GET.get("n", 2)),
+            contains=request.GET.get("contains"),
+            limit=int(request.GET.get("limit", 100)),
+        )
+    except ValueError:
+        return HttpResponse(status=400)
+    return Response(result)
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getCorpusConcordance(request):
+    """
+    Конкорданс (KWIC) словоформы в корпусе.
+    Параметры: id, word, width — слов контекста с каждой стороны (по умолчанию 5), limit.
+    """
+    corpus_id = _stats_corpus_id(request)
+    word = request.GET.get("word")
+    if corpus_id is None or not word:
+        return HttpResponse(status=400)
+    repo = CorpusStatsRepository()
+    try:
+        result = repo.concordance(
+            corpus_id,
+            word,
+            width=int(request.GET.get("width", 5)),
+            limit=int(request.GET.get("limit", 50)),
+        )
+    except ValueError:
+        return HttpResponse(status=400)
+    return Response(result)
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getConcordance(request):
+    """
+    Конкорданс (KWIC) по позиционному индексу.
+    Параметры: q — слово или фраза, corpus_id, window — слов контекста с каждой стороны (по умолчанию 5),
+    limit — строк на страницу (по умолчанию 50), cursor — next_cursor предыдущей страницы.
+    """
+    query = request.GET.get("q")
+    if not query:
+        return HttpResponse(status=400)
+    corpus_id = request.GET.get("corpus_id")
+    repo = ConcordanceRepository()
+    try:
+        result = repo.search(
+            query,
+            corpus_id=int(corpus_id) if corpus_id else None,
+            window=int(request.GET.get("window", 5)),
+            limit=int(request.GET.get("limit", 50)),
+            cursor=request.GET.get("cursor"),
+        )
+    except ValueError:
+        return HttpResponse(status=400)
+    return Response(result)
+
 # -----------------------
 #  TEXT API
 # -----------------------
@@ -132,6 +266,67 @@ def deleteText(request):
     result = repo.delete_text(text_id)
     return Response(result)
 
+# -----------------------
+#  SEARCH API
+# -----------------------
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def searchText(request):
+    """
+    Полнотекстовый поиск по названию, описанию и тексту.
+    Параметры: q — запрос (слова, "точные фразы"), corpus_id, limit.
+    """
+    query = request.GET.get("q")
+    if not query:
+        return HttpResponse(status=400)
+    corpus_id = request.GET.get("corpus_id")
+    try:
+        limit = int(request.GET.get("limit", 20))
+    except ValueError:
+        return HttpResponse(status=400)
+    if limit < 1:
+        return HttpResponse(status=400)
+    repo = TextSearchRepository()
+    result = repo.search(query, corpus_id=corpus_id, limit=limit)
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def searchHybrid(request):
+    """
+    Гибридный поиск (bm25 + эмбеддинги).
+    Параметры: q, corpus_id, limit, fusion (rrf | weighted), alpha (вес семантики для weighted), rerank (0/1),
+    embedding_version (закреплённая версия эмбеддингов, по умолчанию активная).
+    """
+    query = request.GET.get("q")
+    fusion = request.GET.get("fusion", "rrf")
+    corpus_id = request.GET.get("corpus_id")
+    if not query or fusion not in FUSION_METHODS or (corpus_id and not corpus_id.isdigit()):
+        return HttpResponse(status=400)
+    try:
+        limit = int(request.GET.get("limit", 20))
+        alpha = float(request.GET.get("alpha", 0.5))
+    except ValueError:
+        return HttpResponse(status=400)
+    if limit < 1 or not 0.0 <= alpha <= 1.0:
+        return HttpResponse(status=400)
+    repo = HybridSearchRepository()
+    try:
+        result = repo.search(
+            query,
+            corpus_id=int(corpus_id) if corpus_id else None,
+            limit=limit,
+            fusion=fusion,
+            alpha=alpha,
+            rerank=request.GET.get("rerank") in ("1", "true"),
+            version=request.GET.get("embedding_version"),
+        )
+    except EmbeddingVersion.DoesNotExist:
+        return HttpResponse(status=400)
+    return Response(result)
+
 # -----------------------
 #  ONTOLOGY API
 # -----------------------
@@ -145,6 +340,74 @@ def getOntology(request):
     return Response(data)
 
 
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def exportOntology(request):
+    """
+    Потоковая выгрузка снимка онтологии. Параметр format: jsonl (по умолчанию), ntriples, turtle.
+    """
+    fmt = request.GET.get("format", "jsonl")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponse(status=400)
+    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+
+    def lines():
+        try:
+            yield from serialize(repo.iter_export_rows(), fmt)
+        finally:
+            repo.close()
+
+    content_types = {"jsonl": "application/x-ndjson", "ntriples": "application/n-triples", "turtle": "text/turtle"}
+    return StreamingHttpResponse(lines(), content_type=f"{content_types[fmt]}; charset=utf-8")
+
+
+@api_view(['POST'])
+@permission_classes((AllowAny,))
+def getNodesBatch(request):
+    """
+    Узлы онтологии по списку uri одним запросом.
+    Тело: {uris: [...], labels?: ["Class", "Object", ...]}
+    """
+    data = json.loads(request.body.decode('utf-8'))
+    uris = data.get("uris")
+    if not isinstance(uris, list) or len(uris) > NODES_BATCH_MAX_URIS:
+        return HttpResponse(status=400)
+    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+    result = repo.get_nodes_by_uris(uris, data.get("labels"))
+    repo.close()
+    return Response(result)
+
+
+@api_view(['POST'])
+@permission_classes((AllowAny,))
+def applyOntologyBatch(request):
+    """
+    Пакет изменений онтологии в одной транзакции.
+    Тело: {operations: [{op, id?, ...}, ...]}, например
+    [{"op": "create_class", "id": "c1", "title": ...}, {"op": "add_class_attribute", "class_uri": "c1", "attr_name": ...}]
+    """
+    data = json.loads(request.body.decode('utf-8'))
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return HttpResponse(status=400)
+    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+    try:
+        result = repo.apply_batch(operations)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    finally:
+        repo.close()
+    if result["schema_changed"]:
+        schema_cache.invalidate()
+    annotations = AnnotationRepository()
+    for item in result["results"]:
+        if item["op"] == "update_object":
+            annotations.refresh_object(item["node"]["uri"], item["node"].get("title"))
+        elif item["op"] == "delete_object":
+            annotations.remove_object(item["node"]["uri"])
+    return Response(result)
+
+
 @api_view(['POST'])
 @permission_classes((AllowAny,))
 def createClass(request):
@@ -155,16 +418,15 @@ def createClass(request):
     parent_uri = data.get("parent_uri")
     result = repo.create_class(title, description, parent_uri)
     repo.close()
+    schema_cache.invalidate()
     return Response(result)
 
 
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def getClass(request):
-    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     uri = request.GET.get("uri")
-    result = repo.get_class(uri)
-    repo.close()
+    result = schema_cache.get_class(uri)
     return Response(result)
 
 
@@ -184,10 +446,8 @@ def createObject(request):
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def getSignature(request):
-    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     uri = request.GET.get("uri")
-    result = repo.collect_signature(uri)
-    repo.close()
+    result = schema_cache.collect_signature(uri)
     return Response(result)
 
 
@@ -196,28 +456,28 @@ def getSignature(request):
 def deleteClass(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     uri = request.GET.get("uri")
-    result = repo.delete_class(uri)
+    class_uris = repo.get_class_subtree_uris(uri)
+    result = repo.delete_class(uri, class_uris)
     repo.close()
+    schema_cache.invalidate()
+    if result:
+        AnnotationRepository().remove_classes(class_uris)
     return Response({"deleted": result})
 
 
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def getClassParents(request):
-    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     uri = request.GET.get("uri")
-    result = repo.get_class_parents(uri)
-    repo.close()
+    result = schema_cache.get_class_parents(uri)
     return Response(result)
 
 
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def getClassChildren(request):
-    repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     uri = request.GET.get("uri")
-    result = repo.get_class_children(uri)
-    repo.close()
+    result = schema_cache.get_class_children(uri)
     return Response(result)
 
 
@@ -241,6 +501,7 @@ def updateClass(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.update_class(uri, title, description)
     repo.close()
+    schema_cache.invalidate()
     return Response(result)
 
 
@@ -253,6 +514,7 @@ def addClassAttribute(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.add_class_attribute(class_uri, attr_name)
     repo.close()
+    schema_cache.invalidate()
     return Response(result)
 
 
@@ -263,6 +525,7 @@ def deleteClassAttribute(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.delete_class_attribute(prop_uri)
     repo.close()
+    schema_cache.invalidate()
     return Response({"deleted": result})
 
 
@@ -276,6 +539,7 @@ def addClassObjectAttribute(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.add_class_object_attribute(class_uri, attr_name, range_class_uri)
     repo.close()
+    schema_cache.invalidate()
     return Response(result)
 
 
@@ -286,6 +550,7 @@ def deleteClassObjectAttribute(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.delete_class_object_attribute(prop_uri)
     repo.close()
+    schema_cache.invalidate()
     return Response({"deleted": result})
 
 
@@ -298,6 +563,7 @@ def addClassParent(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     repo.add_class_parent(parent_uri, target_uri)
     repo.close()
+    schema_cache.invalidate()
     return Response({"added": True})
 
 
@@ -321,6 +587,8 @@ def updateObject(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.update_object(object_uri, title, description)
     repo.close()
+    if result:
+        AnnotationRepository().refresh_object(object_uri, title)
     return Response(result)
 
 
@@ -331,8 +599,109 @@ def deleteObject(request):
     repo = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
     result = repo.delete_object(object_uri)
     repo.close()
+    if result:
+        AnnotationRepository().remove_object(object_uri)
     return Response({"deleted": result})
 
+# -----------------------
+#  ANNOTATION API
+# -----------------------
+
+@api_view(['POST'])
+@permission_classes((AllowAny,))
+def createAnnotations(request):
+    """
+    Связывает фрагменты текста с объектами онтологии.
+    Тело: {text_id, annotations: [{start, end, object_uri}, ...]}
+    """
+    data = json.loads(request.body.decode('utf-8'))
+    text_id = data.get("text_id")
+    if text_id is None:
+        return HttpResponse(status=400)
+    ontology = OntologyRepository(DB_URI, DB_USER, DB_PASSWORD)
+    repo = AnnotationRepository()
+    try:
+        result = repo.create_annotations(text_id, data.get("annotations", []), ontology)
+    except Text.DoesNotExist:
+        return HttpResponse(status=404)
+    except (TypeError, ValueError):
+        return HttpResponse(status=400)
+    finally:
+        ontology.close()
+    return Response(result)
+
+
+@api_view(['DELETE'])
+@permission_classes((AllowAny,))
+def deleteAnnotation(request):
+    annotation_id = request.GET.get("id")
+    repo = AnnotationRepository()
+    result = repo.delete_annotation(annotation_id)
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getAnnotationProposals(request):
+    """
+    Связи, предложенные entity linking и ожидающие проверки.
+    """
+    corpus_id = request.GET.get("corpus_id")
+    min_confidence = request.GET.get("min_confidence")
+    repo = AnnotationRepository()
+    result = repo.get_proposals(
+        corpus_id=corpus_id,
+        min_confidence=float(min_confidence) if min_confidence else None,
+        limit=int(request.GET.get("limit", 100)),
+    )
+    return Response(result)
+
+
+@api_view(['POST'])
+@permission_classes((AllowAny,))
+def reviewAnnotation(request):
+    """
+    Принять или отклонить предложенную связь.
+    Тело: {id, status: "accepted" | "rejected", start?, end?}
+    """
+    data = json.loads(request.body.decode('utf-8'))
+    status = data.get("status")
+    if data.get("id") is None or status not in ("accepted", "rejected"):
+        return HttpResponse(status=400)
+    repo = AnnotationRepository()
+    try:
+        result = repo.review_annotation(data["id"], status, data.get("start"), data.get("end"))
+    except TextAnnotation.DoesNotExist:
+        return HttpResponse(status=404)
+    except (TypeError, ValueError):
+        return HttpResponse(status=400)
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getTextObjects(request):
+    """
+    Все объекты онтологии, упомянутые в тексте.
+    """
+    text_id = request.GET.get("id")
+    repo = AnnotationRepository()
+    result = repo.get_text_objects(text_id)
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getObjectTexts(request):
+    """
+    Все тексты, в которых упоминается объект онтологии.
+    """
+    object_uri = request.GET.get("uri")
+    corpus_id = request.GET.get("corpus_id")
+    repo = AnnotationRepository()
+    result = repo.get_object_texts(object_uri, corpus_id)
+    return Response(result)
+
 # -----------------------
 #  EMBEDDING API
 # -----------------------
@@ -341,32 +710,111 @@ def deleteObject(request):
 @permission_classes((AllowAny,))
 def build_embeddings(request):
     """
-    Получает текст(ы), возвращает эмбеддинги.
+    Получает текст(ы), возвращает эмбеддинги и версию, в которой они посчитаны (version — закрепить версию).
     """
     data = json.loads(request.body.decode('utf-8'))
     texts = data.get("texts", [])
-    embeddings = get_embeddings(texts)
-    return Response({"embeddings": embeddings.tolist()})
+    try:
+        version = EmbeddingVersion.resolve(data.get("version"))
+    except EmbeddingVersion.DoesNotExist:
+        return HttpResponse(status=400)
+    embeddings = get_embeddings(texts, version=version)
+    return Response({"embeddings": embeddings.tolist(), "version": version.name})
 
 @api_view(['POST'])
 @permission_classes((AllowAny,))
 def compare_embeddings(request):
     """
     Сравнивает два эмбеддинга по косинусному сходству.
+    Векторы разных версий (version1 / version2) или разной размерности несравнимы — 400.
     """
     data = json.loads(request.body.decode('utf-8'))
+    if data.get("version1") != data.get("version2"):
+        return HttpResponse(status=400)
     emb1 = np.array(data["emb1"])
     emb2 = np.array(data["emb2"])
+    if emb1.shape != emb2.shape:
+        return HttpResponse(status=400)
     similarity = cos_compare(emb1, emb2)
     return Response({"similarity": similarity})
 
+def _chunk_params(max_tokens, overlap):
+    """
+    Разбирает параметры чанкинга: max_tokens > 0, overlap >= 0, None — значение по умолчанию.
+    Некорректное значение — ValueError.
+    """
+    try:
+        max_tokens = int(max_tokens) if max_tokens is not None else None
+        overlap = int(overlap) if overlap is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("max_tokens and overlap must be integers")
+    if (max_tokens is not None and max_tokens < 1) or (overlap is not None and overlap < 0):
+        raise ValueError("max_tokens must be positive and overlap non-negative")
+    return max_tokens, overlap
+
 @api_view(['POST'])
 @permission_classes((AllowAny,))
 def chunk_text(request):
     """
-    Разбивает текст на чанки.
+    Разбивает текст на чанки по границам предложений в пределах бюджета токенов модели.
+    Возвращает тексты чанков, их символьные смещения и длину в токенах.
     """
     data = json.loads(request.body.decode('utf-8'))
     text = data.get("text", "")
-    chunks = get_chunks(text)
-    return Response({"chunks": chunks})
\ No newline at end of file
+    try:
+        max_tokens, overlap = _chunk_params(data.get("max_tokens"), data.get("overlap"))
+    except ValueError:
+        return HttpResponse(status=400)
+    chunks = list(iter_chunks(text, max_tokens=max_tokens, overlap=overlap))
+    return Response({
+        "chunks": [c["text"] for c in chunks],
+        "offsets": [[c["start"], c["end"]] for c in chunks],
+        "tokens": [c["tokens"] for c in chunks],
+    })
+
+@api_view(['POST'])
+@permission_classes((AllowAny,))
+def chunk_text_stream(request):
+    """
+    Потоково разбивает большой текст на чанки.
+    Тело запроса — сырой текст (text/plain), ответ — NDJSON: по строке {text, start, end, tokens} на чанк.
+    В памяти держится только текущий чанк, а не весь документ.
+    """
+    encoding = request.content_params.get("charset", "utf-8")
+    try:
+        max_tokens, overlap = _chunk_params(request.GET.get("max_tokens") or None, request.GET.get("overlap") or None)
+        # после начала потоковой отдачи ответа ошибку кодировки уже не вернуть кодом статуса
+        codecs.lookup(encoding)
+    except (ValueError, LookupError):
+        return HttpResponse(status=400)
+    pieces = iter_decoded(request.stream, encoding) if request.stream else iter(())
+    chunks = iter_chunks(pieces, max_tokens=max_tokens, overlap=overlap)
+    lines = (json.dumps(chunk, ensure_ascii=False) + "\n" for chunk in chunks)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+@api_view(['GET', 'POST'])
+@permission_classes((AllowAny,))
+def getQueryMetrics(request):
+    """
+    Статистика запросов к Neo4j. POST возвращает статистику и сбрасывает её.
+    """
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponse(status=403)
+
+    result = query_stats.snapshot()
+    if request.method == 'POST':
+        query_stats.reset()
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def getMetrics(request):
+    """
+    Метрики запросов в формате Prometheus
+    """
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponse(status=403)
+
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')